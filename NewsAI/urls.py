@@ -17,9 +17,23 @@ urlpatterns = [
 
     path('search_with_context/', quick_views.search_with_context, name='search_with_context'),
 
+    # summarize many URLs in one request
+    path('process-articles/batch/', quick_views.process_articles_batch, name='process_articles_batch'),
+
     # fetch a single article by ID
     path('get-article/<int:article_id>/', quick_views.get_article, name='get_article'),
 
     # delete an article by ID
     path('delete-article/<int:article_id>/', quick_views.delete_article, name='delete_article'),
+
+    # background summarization jobs
+    path('jobs/', quick_views.submit_summary_job, name='submit_summary_job'),
+    path('jobs/<int:job_id>/', quick_views.get_job_status, name='get_job_status'),
+    path('jobs/<int:job_id>/result/', quick_views.get_job_result, name='get_job_result'),
+
+    # Prometheus metrics
+    path('metrics', quick_views.metrics, name='metrics'),
+
+    # Per-domain scrape health (adaptive timeouts, skipped domains)
+    path('domain-health/', quick_views.domain_health, name='domain_health'),
 ]
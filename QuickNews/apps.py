@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class QuicknewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'QuickNews'
+
+    def ready(self):
+        # Keep the local search index and the article response cache in step with ArticleSummary writes.
+        from . import responses, search_index  # noqa: F401
+        from .warmup import WARMUP_ON_START, start_background_warmup
+
+        if WARMUP_ON_START:
+            start_background_warmup()
@@ -0,0 +1,50 @@
+"""
+Helpers for the ASGI (async) views.
+
+- offload() runs blocking or CPU-bound code (newspaper parsing, context
+  packing, file-backed caches) on a bounded thread pool so it never stalls the
+  event loop. Database access should use asgiref's sync_to_async instead, which
+  keeps Django's per-thread connections consistent.
+- LoopLocal holds one object per running event loop, for clients such as
+  httpx.AsyncClient that must not be shared between loops. Their connection
+  pooling therefore assumes an ASGI server, where a worker keeps one loop for
+  its lifetime. Under WSGI every request runs on its own short-lived loop and
+  gets fresh objects (with cold connection pools); objects of closed loops are
+  dropped on the next lookup. Serve QuickNews with ASGI in production.
+"""
+import asyncio
+import concurrent.futures
+import functools
+import os
+import threading
+
+from .telemetry import run_in_context
+
+OFFLOAD_THREADS = int(os.environ.get("QUICKNEWS_OFFLOAD_THREADS", "32"))
+
+_offload_executor = concurrent.futures.ThreadPoolExecutor(max_workers=OFFLOAD_THREADS,
+                                                          thread_name_prefix='quicknews-offload')
+
+
+async def offload(fn, *args, **kwargs):
+    """Runs blocking `fn(*args, **kwargs)` on the offload pool, in the caller's context, and awaits it."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_offload_executor, run_in_context(functools.partial(fn, *args, **kwargs)))
+
+
+class LoopLocal:
+    """One lazily created object per event loop."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for closed in [other for other in self._objects if other.is_closed()]:
+                del self._objects[closed]
+            if loop not in self._objects:
+                self._objects[loop] = self.factory()
+            return self._objects[loop]
@@ -0,0 +1,157 @@
+"""
+Bulk summarization of many article URLs at once.
+
+Compared with one POST to /process-article/ per URL, a batch:
+- resolves every already-summarized URL (or canonical variant of one) with
+  two `__in` queries,
+- downloads the misses concurrently on the async fetch engine and summarizes
+  them on the shared, spawned NLP pool (the NLP steps are CPU bound, so its
+  worker processes sidestep the GIL),
+- serves near-duplicate stories from one shared summary,
+- writes all new rows with one bulk_create (and their enrichment with one more),
+- returns a result per input URL, in input order.
+"""
+import asyncio
+import os
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from .dedup import (SIMHASH_MAX_DISTANCE, build_fingerprint, canonicalize_url, find_by_url, find_near_duplicate,
+                    hamming_distance, record_fingerprints, url_hash)
+from .enrichment import store_enrichments
+from .models import ArticleEnrichment, ArticleFingerprint, ArticleSummary
+from .pipeline import PipelineError, aextract_article, article_data, split_features, split_fingerprint
+from .search_index import index_articles
+from .telemetry import span
+
+BATCH_MAX_URLS = int(os.environ.get("QUICKNEWS_BATCH_MAX_URLS", "500"))
+# Articles downloaded at once; the NLP pool's own limit bounds the CPU work behind them.
+BATCH_CONCURRENCY = int(os.environ.get("QUICKNEWS_BATCH_CONCURRENCY", "8"))
+
+
+async def _aextract(url, slots):
+    """Extracts one article for the batch. Never touches the database."""
+    async with slots:
+        try:
+            return url, await aextract_article(url), None
+        except PipelineError as e:
+            return url, None, str(e)
+        except Exception as e:
+            print(f"Skipping URL {url} due to error: {e}")
+            return url, None, f'An unexpected error occurred: {str(e)}'
+
+
+def _unique_urls(urls):
+    seen = dict.fromkeys(url.strip() for url in urls if url and url.strip())
+    return list(seen)
+
+
+def _resolve_batch(urls):
+    """
+    Answers the batch's already summarized URLs from the database.
+
+    Returns:
+        tuple: (results by url, canonical url of every miss, valid urls still to extract).
+    """
+    import validators
+
+    results = {}
+    valid_urls = []
+    for url in urls:
+        if validators.url(url):
+            valid_urls.append(url)
+        else:
+            results[url] = {'url': url, 'success': False, 'error': 'Not a valid URL.'}
+
+    # One query resolves every URL that is already summarized, one more its canonical variants.
+    for article in ArticleSummary.objects.filter(url__in=valid_urls):
+        results[article.url] = _success(article.url, article, True)
+    canonical = {url: canonicalize_url(url) for url in valid_urls if url not in results}
+    by_hash = {url_hash(c): url for url, c in canonical.items()}
+    for fingerprint in ArticleFingerprint.objects.filter(url_hash__in=by_hash).select_related('article'):
+        url = by_hash[fingerprint.url_hash]
+        results[url] = _success(url, fingerprint.article, True)
+
+    return results, canonical, [url for url in valid_urls if url not in results]
+
+
+async def asummarize_batch(urls, concurrency=BATCH_CONCURRENCY):
+    """
+    Summarizes a list of URLs.
+
+    Args:
+        urls (list): Article URLs; duplicates and blank entries are ignored.
+        concurrency (int): Uncached URLs extracted at once.
+
+    Returns:
+        list: One dict per unique URL with 'url', 'success' and either
+        'from_cache' + 'data' or 'error'.
+    """
+    urls = _unique_urls(urls)
+    results, canonical, misses = await sync_to_async(_resolve_batch)(urls)
+    slots = asyncio.Semaphore(max(1, concurrency))
+    outcomes = await asyncio.gather(*(_aextract(url, slots) for url in misses))
+    return await sync_to_async(_store_batch)(urls, results, canonical, outcomes)
+
+
+def summarize_batch(urls, concurrency=BATCH_CONCURRENCY):
+    """asummarize_batch() for synchronous callers such as management commands."""
+    return async_to_sync(asummarize_batch)(urls, concurrency)
+
+
+def _store_batch(urls, results, canonical, outcomes):
+    """Stores the extracted articles of a batch and returns its results in input order."""
+    # Near-duplicates of stored articles, or of earlier URLs in this batch, reuse one summary.
+    new_rows = {}  # url -> (fields, fingerprint urls, simhash)
+    features_of = {}  # url -> text features of a new row
+    duplicates_of = {}  # url -> earlier batch url it duplicates
+    for url, fields, error in outcomes:
+        if fields is None:
+            results[url] = {'url': url, 'success': False, 'error': error}
+            continue
+        fields, features = split_features(fields)
+        fields, page_canonical, fingerprint = split_fingerprint(fields)
+        fingerprint_urls = [canonical[url], page_canonical]
+        if (duplicate := find_by_url([page_canonical]) or find_near_duplicate(fingerprint)):
+            record_fingerprints(duplicate, fingerprint_urls, fingerprint)
+            results[url] = _success(url, duplicate, True)
+            continue
+        earlier = next((other for other, (_, other_urls, other_hash) in new_rows.items()
+                        if page_canonical in other_urls or (fingerprint is not None and other_hash is not None
+                                                            and hamming_distance(fingerprint, other_hash) <= SIMHASH_MAX_DISTANCE)),
+                       None)
+        if earlier is not None:
+            duplicates_of[url] = earlier
+            new_rows[earlier][1].extend(fingerprint_urls)
+            continue
+        new_rows[url] = (fields, fingerprint_urls, fingerprint)
+        features_of[url] = features
+
+    if new_rows:
+        new_articles = [ArticleSummary(**fields) for fields, _, _ in new_rows.values()]
+        for article in new_articles:
+            article.fill_short_title()  # bulk_create bypasses save()
+        # ignore_conflicts keeps a concurrent writer of the same URL from failing the batch.
+        with span('db_write', rows=len(new_articles)):
+            ArticleSummary.objects.bulk_create(new_articles, ignore_conflicts=True)
+        saved = ArticleSummary.objects.in_bulk(list(new_rows), field_name='url')
+        index_articles(saved.values())  # bulk_create sends no post_save signals
+        ArticleFingerprint.objects.bulk_create(
+            [build_fingerprint(saved[url], fingerprint_url, fingerprint)
+             for url, (_, fingerprint_urls, fingerprint) in new_rows.items() if url in saved
+             for fingerprint_url in dict.fromkeys(u for u in fingerprint_urls if u)],
+            ignore_conflicts=True)
+        store_enrichments([(saved[url].id, features_of[url], new_rows[url][2], ArticleEnrichment.FULL_TEXT)
+                           for url in saved if features_of[url] is not None])
+        for url, article in saved.items():
+            results[url] = _success(url, article, False)
+        for url, earlier in duplicates_of.items():
+            if earlier in saved:
+                results[url] = _success(url, saved[earlier], True)
+
+    unsaved = {'success': False, 'error': 'The article could not be stored.'}
+    return [results.get(url, {'url': url, **unsaved}) for url in urls]
+
+
+def _success(url, article, from_cache):
+    return {'url': url, 'success': True, 'from_cache': from_cache, 'data': article_data(article)}
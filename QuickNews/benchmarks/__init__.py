@@ -0,0 +1,5 @@
+"""
+Offline benchmark suite and golden-output harness for the summarization pipeline.
+
+Run it with `python manage.py bench_summarizer`; see that command for options.
+"""
@@ -0,0 +1,58 @@
+"""
+Fixed, offline corpora for benchmarking and golden checks.
+
+Single articles live in corpora/*.txt (first line "Title: ..."). Multi-page
+contexts are assembled from them exactly the way views.join_pages() joins
+scraped pages, so the benchmarks exercise the same shape of input the Globe
+search produces.
+"""
+from pathlib import Path
+
+CORPORA_DIR = Path(__file__).resolve().parent / 'corpora'
+GOLDEN_PATH = Path(__file__).resolve().parent / 'golden.json'
+
+# Roughly 50k words: the size of a large 5-page Globe search context.
+LARGE_CONTEXT_REPEAT = 30
+
+
+def load_articles():
+    """Returns the single-article corpora as dicts with name, title and text."""
+    articles = []
+    for path in sorted(CORPORA_DIR.glob('*.txt')):
+        first_line, _, body = path.read_text(encoding='utf-8').partition('\n')
+        articles.append({
+            'name': path.stem,
+            'title': first_line.removeprefix('Title:').strip(),
+            'text': body.strip(),
+        })
+    return articles
+
+
+def build_context(articles, repeat=1):
+    """Joins article texts into one scraped context, one page marker per article."""
+    texts = []
+    for round_number in range(repeat):
+        for article in articles:
+            url = f"https://news.example.com/{round_number}/{article['name']}"
+            texts.append(f"\n\n--- Content from {url} ---\n" + article['text'])
+    return "".join(texts).strip()
+
+
+def load_cases():
+    """
+    Returns every benchmark case: each single article, a 4-page context and a
+    large repeated context. Each case has a name, kind, title (used as the
+    summarize title / query) and text.
+    """
+    articles = load_articles()
+    cases = [dict(article, kind='article') for article in articles]
+    cases.append({
+        'name': 'context_4_pages', 'kind': 'context',
+        'title': 'flood levees river rain', 'text': build_context(articles),
+    })
+    cases.append({
+        'name': 'context_large', 'kind': 'context',
+        'title': 'battery charging electric cars',
+        'text': build_context(articles, repeat=LARGE_CONTEXT_REPEAT),
+    })
+    return cases
@@ -0,0 +1,142 @@
+"""
+Benchmark runner and golden-output checks for the summarization pipeline.
+
+Every stage is timed per case over several repetitions (latency percentiles and
+throughput) and run once more under tracemalloc to record its peak memory.
+"""
+import hashlib
+import json
+import time
+import tracemalloc
+
+from textblob import TextBlob
+
+from ..context_builder import build_context
+from ..summarizer import keywords, split_sentences, split_words, summarize, summarize_reference, summarize_stream
+from .corpus import GOLDEN_PATH
+
+MAX_SENTS = 7
+# Odd chunk size, so summarize_stream() is checked across arbitrary chunk boundaries.
+STREAM_CHUNK_CHARS = 997
+
+
+def text_chunks(text, size=STREAM_CHUNK_CHARS):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+STAGES = {
+    'split_sentences': lambda case: split_sentences(case['text']),
+    'keywords': lambda case: keywords(case['text']),
+    'summarize_reference': lambda case: summarize_reference(title=case['title'], text=case['text'], max_sents=MAX_SENTS),
+    'summarize': lambda case: summarize(title=case['title'], text=case['text'], max_sents=MAX_SENTS),
+    'summarize_stream': lambda case: summarize_stream(case['title'], text_chunks(case['text']), max_sents=MAX_SENTS),
+    'sentiment': lambda case: TextBlob(case['text']).sentiment,
+    'build_context': lambda case: build_context(case['title'], case['text']),
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100.0 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def measure(fn, case, repeat=5, warmup=1):
+    """Times `fn(case)` and returns latency percentiles (ms), throughput and peak memory (KiB)."""
+    for _ in range(warmup):
+        fn(case)
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(case)
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn(case)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(latencies)
+    words = len(case['text'].split())
+    return {
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'docs_per_s': repeat / total if total else float('inf'),
+        'words_per_s': words * repeat / total if total else float('inf'),
+        'peak_kib': peak / 1024,
+    }
+
+
+def run_benchmarks(cases, stages=None, repeat=5):
+    """Runs the selected stages over every case and returns one result dict per pair."""
+    results = []
+    for case in cases:
+        for stage in stages or STAGES:
+            result = {'case': case['name'], 'stage': stage, 'words': len(case['text'].split())}
+            result.update(measure(STAGES[stage], case, repeat=repeat))
+            results.append(result)
+    return results
+
+
+def sentences_digest(sentences):
+    """Fingerprint of a sentence split; golden summaries are only comparable when it matches."""
+    return hashlib.sha256(json.dumps(sentences).encode('utf-8')).hexdigest()
+
+
+def golden_outputs(cases):
+    """Computes the golden record for each case with the reference implementation."""
+    golden = {}
+    for case in cases:
+        golden[case['name']] = {
+            'sentences_digest': sentences_digest(split_sentences(case['text'])),
+            'keywords': keywords(case['text']),
+            'title_words': split_words(case['title']),
+            'summary': summarize_reference(title=case['title'], text=case['text'], max_sents=MAX_SENTS),
+        }
+    return golden
+
+
+def load_golden(path=GOLDEN_PATH):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_golden(golden, path=GOLDEN_PATH):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(golden, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def check_golden(cases, golden):
+    """
+    Verifies the fast pipeline against the golden file and the reference.
+
+    Returns:
+        tuple: (failures, skipped) lists of human-readable messages. Golden
+        summaries are skipped (not failed) when the installed NLTK sentence
+        model splits the corpus differently from the one that recorded them; the
+        live comparison against summarize_reference still runs in that case.
+    """
+    failures, skipped = [], []
+    for case in cases:
+        name = case['name']
+        fast = summarize(title=case['title'], text=case['text'], max_sents=MAX_SENTS)
+        reference = summarize_reference(title=case['title'], text=case['text'], max_sents=MAX_SENTS)
+        if fast != reference:
+            failures.append(f"{name}: summarize differs from summarize_reference")
+        if summarize_stream(case['title'], text_chunks(case['text']), max_sents=MAX_SENTS) != fast:
+            failures.append(f"{name}: summarize_stream differs from summarize")
+
+        if (expected := golden.get(name)) is None:
+            failures.append(f"{name}: no golden record (run with --update-golden)")
+            continue
+        if keywords(case['text']) != expected['keywords']:
+            failures.append(f"{name}: keywords differ from golden")
+        if sentences_digest(split_sentences(case['text'])) != expected['sentences_digest']:
+            skipped.append(f"{name}: sentence split differs from the golden run; summary not compared")
+        elif fast != expected['summary']:
+            failures.append(f"{name}: summary differs from golden")
+    return failures, skipped
@@ -0,0 +1,55 @@
+"""
+Search-result extraction benchmark.
+
+Times the BeautifulSoup (html.parser) and lxml extractors of search_results on
+the DuckDuckGo result pages saved in benchmarks/search_pages and checks that
+both return the same links.
+"""
+import time
+from pathlib import Path
+
+from ..search_results import extract_result_hrefs, extract_result_hrefs_bs4, ranked_result_urls
+from .runner import percentile
+
+SEARCH_PAGES_DIR = Path(__file__).resolve().parent / 'search_pages'
+
+EXTRACTORS = {
+    'bs4': extract_result_hrefs_bs4,
+    'lxml': extract_result_hrefs,
+}
+
+
+def load_search_pages(directory=SEARCH_PAGES_DIR):
+    """{page name: html} for every saved result page."""
+    return {path.stem: path.read_text(encoding='utf-8') for path in sorted(Path(directory).glob('*.html'))}
+
+
+def bench_search_pages(pages, repeat=20, warmup=2):
+    """
+    Times every extractor on every page.
+
+    Returns:
+        dict: Per page, the size, link count, whether the extractors agree, the
+        ranked URL count and per-extractor p50 / p95 latency (ms).
+    """
+    results = {}
+    for name, html in pages.items():
+        outputs = {label: fn(html) for label, fn in EXTRACTORS.items()}
+        timings = {}
+        for label, fn in EXTRACTORS.items():
+            for _ in range(warmup):
+                fn(html)
+            latencies = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                fn(html)
+                latencies.append((time.perf_counter() - started) * 1000)
+            timings[label] = {'p50_ms': percentile(latencies, 50), 'p95_ms': percentile(latencies, 95)}
+        results[name] = {
+            'bytes': len(html.encode('utf-8')),
+            'links': len(outputs['bs4']),
+            'identical': outputs['lxml'] == outputs['bs4'],
+            'ranked_urls': len(ranked_result_urls(html)),
+            'timings': timings,
+        }
+    return results
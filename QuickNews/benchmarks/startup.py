@@ -0,0 +1,57 @@
+"""
+Worker start-up benchmark.
+
+Imports the URLconf (and with it every view module) in a fresh interpreter under
+`python -X importtime` and reports the total import time, the costliest
+top-level packages and whether any of the lazily imported heavy modules was
+loaded anyway.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from ..warmup import HEAVY_MODULES
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+STARTUP_SNIPPET = "import django; django.setup(); import NewsAI.urls"
+
+
+def parse_importtime(stderr):
+    """
+    Parses `-X importtime` output.
+
+    Returns:
+        tuple: (total microseconds of all top-level imports, {top-level package: self microseconds}).
+    """
+    total, packages = 0, {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not name[1:].startswith(' '):  # imported directly by the snippet, not nested
+            total += int(cumulative_us)
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+    return total, packages
+
+
+def measure_startup(settings_module='NewsAI.settings', snippet=STARTUP_SNIPPET):
+    """
+    Runs `snippet` in a fresh interpreter and measures its imports.
+
+    Returns:
+        dict: 'import_ms' (total), 'packages_ms' (self time per top-level package)
+        and 'heavy_loaded' (HEAVY_MODULES present after start-up).
+    """
+    check = f"import sys; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module, 'QUICKNEWS_WARMUP': '0'}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"{snippet}; {check}"],
+                            cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True)
+    total, packages = parse_importtime(result.stderr)
+    heavy = result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ''
+    return {
+        'import_ms': total / 1000,
+        'packages_ms': {name: us / 1000 for name, us in sorted(packages.items(), key=lambda p: -p[1])},
+        'heavy_loaded': [name for name in heavy.split(',') if name],
+    }
@@ -0,0 +1,183 @@
+"""
+Relevance-ranked, budgeted context for Gemini.
+
+Scraped pages used to be concatenated whole and shipped in one prompt, however
+long. build_context() instead:
+
+1. splits each page into passages of roughly PASSAGE_WORDS words,
+2. scores the passages against the question with BM25,
+3. drops passages that repeat one already chosen (syndicated copies, boilerplate),
+4. packs the best passages into a token budget,
+
+and reassembles them per source, in their original order, in the same
+"--- Content from <url> ---" layout the prompt already uses. Cumulative trim
+counters are available from context_metrics().
+"""
+import math
+import os
+import re
+import threading
+
+from .search_index import BM25Index
+
+# --- Context Configuration ---
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("QUICKNEWS_CONTEXT_TOKEN_BUDGET", "6000"))
+PASSAGE_WORDS = int(os.environ.get("QUICKNEWS_CONTEXT_PASSAGE_WORDS", "120"))
+DUPLICATE_SIMILARITY = 0.5
+# A rough, model-agnostic estimate; Gemini averages about four characters per token on English prose.
+CHARS_PER_TOKEN = 4
+
+_HEADER_RE = re.compile(r'^--- (.+?) ---$', re.MULTILINE)
+_WORD_RE = re.compile(r'\w+')
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_sources(context):
+    """
+    Splits a consolidated context into (header, text) pairs using its
+    "--- ... ---" separator lines. Text before the first header gets header None.
+    """
+    sources = []
+    matches = list(_HEADER_RE.finditer(context))
+    if not matches or matches[0].start() > 0:
+        end = matches[0].start() if matches else len(context)
+        if context[:end].strip():
+            sources.append((None, context[:end].strip()))
+    for match, following in zip(matches, matches[1:] + [None]):
+        text = context[match.end():following.start() if following else len(context)].strip()
+        if text:
+            sources.append((match.group(1), text))
+    return sources
+
+
+def split_passages(text, passage_words=PASSAGE_WORDS):
+    """Groups paragraphs into passages of about `passage_words` words, splitting long paragraphs."""
+    passages, current, current_words = [], [], 0
+    for paragraph in (p.strip() for p in text.split('\n')):
+        if not paragraph:
+            continue
+        words = paragraph.split()
+        while len(words) > passage_words:
+            if current:
+                passages.append(' '.join(current))
+                current, current_words = [], 0
+            passages.append(' '.join(words[:passage_words]))
+            words = words[passage_words:]
+        if current_words + len(words) > passage_words and current:
+            passages.append('\n'.join(current))
+            current, current_words = [], 0
+        current.append(' '.join(words))
+        current_words += len(words)
+    if current:
+        passages.append('\n'.join(current))
+    return passages
+
+
+def _shingles(text):
+    words = _WORD_RE.findall(text.lower())
+    return {tuple(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+
+
+def _similarity(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+class _Metrics:
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.duplicates_dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, stats):
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += stats['input_tokens']
+            self.output_tokens += stats['output_tokens']
+            self.duplicates_dropped += stats['duplicates_dropped']
+
+    def snapshot(self):
+        with self._lock:
+            trimmed = self.input_tokens - self.output_tokens
+            return {
+                'calls': self.calls,
+                'input_tokens': self.input_tokens,
+                'output_tokens': self.output_tokens,
+                'trimmed_tokens': trimmed,
+                'trim_ratio': (trimmed / self.input_tokens) if self.input_tokens else 0.0,
+                'duplicates_dropped': self.duplicates_dropped,
+            }
+
+
+_metrics = _Metrics()
+
+
+def context_metrics():
+    """Cumulative trimming counters for this process."""
+    return _metrics.snapshot()
+
+
+def build_context(query, context, token_budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Selects the passages of `context` most relevant to `query` that fit in
+    `token_budget` tokens.
+
+    Returns:
+        tuple: (packed context string, stats dict with passage counts and
+        input/output/trimmed token estimates).
+    """
+    sources = split_sources(context)
+    passages = []  # (source index, position in source, text)
+    for source_index, (_, text) in enumerate(sources):
+        passages.extend((source_index, position, passage) for position, passage in enumerate(split_passages(text)))
+
+    index = BM25Index()
+    for passage_id, (_, _, text) in enumerate(passages):
+        index.add(passage_id, text)
+    scores = {passage_id: score for passage_id, score, _ in index.search(query, limit=len(passages))}
+    # Best first; unscored passages keep document order, interleaving sources so each gets a share.
+    ranked = sorted(range(len(passages)), key=lambda i: (-scores.get(i, 0.0), passages[i][1], passages[i][0]))
+
+    chosen, chosen_shingles, used_sources, used_tokens, duplicates = [], [], set(), 0, 0
+    for passage_id in ranked:
+        source_index, _, text = passages[passage_id]
+        tokens = estimate_tokens(text) + 1  # + the blank line separating passages
+        if source_index not in used_sources and sources[source_index][0]:
+            tokens += estimate_tokens(f"--- {sources[source_index][0]} ---\n")
+        if used_tokens + tokens > token_budget:
+            continue
+        shingles = _shingles(text)
+        if any(_similarity(shingles, other) >= DUPLICATE_SIMILARITY for other in chosen_shingles):
+            duplicates += 1
+            continue
+        chosen.append(passage_id)
+        chosen_shingles.append(shingles)
+        used_sources.add(source_index)
+        used_tokens += tokens
+
+    by_source = {}
+    for passage_id in sorted(chosen, key=lambda i: passages[i][:2]):
+        by_source.setdefault(passages[passage_id][0], []).append(passages[passage_id][2])
+    blocks = []
+    for source_index, texts in by_source.items():
+        header = sources[source_index][0]
+        body = '\n\n'.join(texts)
+        blocks.append(f"--- {header} ---\n{body}" if header else body)
+    packed = '\n\n'.join(blocks)
+
+    input_tokens, output_tokens = estimate_tokens(context), estimate_tokens(packed)
+    stats = {
+        'sources': len(sources),
+        'passages': len(passages),
+        'selected': len(chosen),
+        'duplicates_dropped': duplicates,
+        'input_tokens': input_tokens,
+        'output_tokens': output_tokens,
+        'trimmed_tokens': max(0, input_tokens - output_tokens),
+    }
+    _metrics.record(stats)
+    return packed, stats
@@ -0,0 +1,173 @@
+"""
+Duplicate detection for article URLs.
+
+Two complementary checks keep the same story from being scraped and
+summarized twice:
+
+- URL canonicalization: tracking parameters, AMP variants and mobile hosts are
+  stripped, and the page's own rel=canonical link is honoured, so spelling
+  variants of one article resolve to the same key before anything is fetched.
+- Text fingerprints: a 64-bit SimHash of the article's word shingles. Copies of
+  a story syndicated under unrelated URLs differ by only a few bits, unrelated
+  stories by ~30. The hash is stored as eight 8-bit bands; any two fingerprints
+  within 7 bits of each other share at least one band exactly, so candidates
+  come from indexed lookups.
+
+Both are stored in the ArticleFingerprint side table.
+"""
+import functools
+import hashlib
+import operator
+import os
+import re
+from urllib.parse import urlsplit
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import ArticleFingerprint, ArticleSummary
+from .page_cache import normalize_url
+
+# --- Dedup Configuration ---
+SIMHASH_MAX_DISTANCE = int(os.environ.get("QUICKNEWS_SIMHASH_MAX_DISTANCE", "7"))
+SIMHASH_SHINGLE_SIZE = 3
+# Texts shorter than this many words are too small to fingerprint reliably.
+SIMHASH_MIN_WORDS = 50
+SIMHASH_BANDS = 8
+
+# Only keys known to be analytics or ad-click tags. Generic names such as `ref`,
+# `src` or `share` select the content on some sites, so they are kept.
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid', 'ref_src', 'ref_url',
+    'cmpid', 'ocid', 'smid', 'smtyp', 'spm', '_ga', '_gl', 'amp', 'outputtype',
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'hsa_', 'itm_', 'at_')
+MOBILE_HOST_PREFIXES = ('m.', 'mobile.', 'amp.')
+_AMP_PATH_RE = re.compile(r'(/amp/?|\.amp)$')
+_WORD_RE = re.compile(r'\w+')
+
+
+def canonicalize_url(url):
+    """
+    Reduces an article URL to its canonical form: normalize_url() plus no
+    tracking parameters, no AMP suffix, no mobile host prefix and no trailing
+    slash.
+    """
+    normalized = normalize_url(url)
+    scheme, rest = normalized.split('://', 1)
+    host, _, path_query = rest.partition('/')
+    path, _, query = path_query.partition('?')
+
+    for prefix in MOBILE_HOST_PREFIXES:
+        if host.startswith(prefix) and host.count('.') >= 2:
+            host = host[len(prefix):]
+            break
+
+    path = _AMP_PATH_RE.sub('', '/' + path)
+    if path.startswith('/amp/'):
+        path = path[4:]
+    path = path.rstrip('/') or '/'
+
+    params = [p for p in query.split('&') if p]
+    params = [p for p in params
+              if (name := p.split('=', 1)[0].lower()) not in TRACKING_PARAMS and not name.startswith(TRACKING_PREFIXES)]
+    return f"{scheme}://{host}{path}" + (f"?{'&'.join(params)}" if params else '')
+
+
+def page_canonical_url(url, canonical_link):
+    """
+    The canonical URL for a fetched page: its rel=canonical / og:url when that
+    points at an actual article, otherwise the canonical form of `url`.
+    """
+    if canonical_link and canonical_link.startswith(('http://', 'https://')):
+        candidate = canonicalize_url(canonical_link)
+        # Some sites point every page's canonical at the home page; that is not this article.
+        if urlsplit(candidate).path != '/':
+            return candidate
+    return canonicalize_url(url)
+
+
+def url_hash(canonical_url):
+    return hashlib.sha256(canonical_url.encode('utf-8')).hexdigest()
+
+
+def simhash(text):
+    """
+    64-bit SimHash over overlapping word shingles of `text`.
+
+    Returns:
+        int or None: The unsigned fingerprint, or None if the text is too short.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SIMHASH_MIN_WORDS:
+        return None
+    shingles = {' '.join(words[i:i + SIMHASH_SHINGLE_SIZE]) for i in range(len(words) - SIMHASH_SHINGLE_SIZE + 1)}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little') for s in shingles),
+        dtype=np.uint64, count=len(shingles))
+    # One row of 64 bits per shingle; each output bit is the majority vote of its column.
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(votes, bitorder='little').tobytes(), 'little')
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def to_signed(value):
+    """Maps an unsigned 64-bit fingerprint onto BigIntegerField's signed range."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def simhash_bands(value):
+    return [(value >> (8 * i)) & 0xFF for i in range(SIMHASH_BANDS)]
+
+
+def find_by_url(urls):
+    """Returns the article already stored under any canonical form of `urls`, or None."""
+    urls = [url for url in urls if url]
+    hashes = {url_hash(canonicalize_url(url)) for url in urls}
+    if (fingerprint := ArticleFingerprint.objects.filter(url_hash__in=hashes).select_related('article').first()):
+        return fingerprint.article
+    return ArticleSummary.objects.filter(url__in=urls).first()
+
+
+def find_near_duplicate(fingerprint, max_distance=SIMHASH_MAX_DISTANCE):
+    """Returns a stored article whose text fingerprint is within `max_distance` bits, or None."""
+    if fingerprint is None:
+        return None
+    bands = simhash_bands(fingerprint)
+    any_band = functools.reduce(operator.or_, (Q(**{f'band{i}': band}) for i, band in enumerate(bands)))
+    candidates = ArticleFingerprint.objects.filter(any_band).values_list('article_id', 'simhash')
+    best = None
+    for article_id, stored in candidates:
+        distance = hamming_distance(fingerprint, to_unsigned(stored))
+        if distance <= max_distance and (best is None or distance < best[0]):
+            best = (distance, article_id)
+    return ArticleSummary.objects.filter(id=best[1]).first() if best else None
+
+
+def build_fingerprint(article, canonical_url, fingerprint):
+    """An unsaved ArticleFingerprint row (for bulk_create)."""
+    bands = simhash_bands(fingerprint) if fingerprint is not None else [None] * SIMHASH_BANDS
+    return ArticleFingerprint(
+        article=article, url_hash=url_hash(canonical_url), canonical_url=canonical_url,
+        simhash=to_signed(fingerprint) if fingerprint is not None else None,
+        **{f'band{i}': band for i, band in enumerate(bands)},
+    )
+
+
+def record_fingerprints(article, canonical_urls, fingerprint):
+    """Stores `article` under each of `canonical_urls`; URLs already known are left alone."""
+    for canonical_url in dict.fromkeys(u for u in canonical_urls if u):
+        try:
+            with transaction.atomic():
+                build_fingerprint(article, canonical_url, fingerprint).save()
+        except IntegrityError:
+            pass
@@ -0,0 +1,225 @@
+"""
+Per-domain health of scrape targets: rolling success rate, response latency
+percentiles and paywall / empty-page detection.
+
+- The fetch engines record how long every response took per domain; the
+  search scrapers record what each page yielded ('ok', 'empty', 'paywall',
+  'error' or 'timeout'). Both are kept over a rolling window per domain.
+- timeout_for() adapts a domain's fetch timeout to a multiple of its p95
+  response time, within [DOMAIN_TIMEOUT_MIN, QUICKNEWS_SCRAPE_TIMEOUT], so a
+  known-fast site that hangs no longer holds a slot for the full timeout.
+- select_urls() drops links to chronically bad domains (success rate below
+  DOMAIN_SKIP_BELOW) and scrapes degraded ones only when healthier links run
+  out. A bad domain may be probed once every DOMAIN_SKIP_COOLDOWN seconds
+  when links are short; a successful probe clears its record.
+- State is per process, like the other in-memory caches. It is served at
+  /domain-health/ and summarized in /metrics.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+from .telemetry import registry
+
+# --- Domain Health Configuration ---
+DOMAIN_HEALTH_ENABLED = os.environ.get("QUICKNEWS_DOMAIN_HEALTH_ENABLED", "1") == "1"
+DOMAIN_HEALTH_WINDOW = int(os.environ.get("QUICKNEWS_DOMAIN_HEALTH_WINDOW", "20"))
+DOMAIN_HEALTH_MIN_SAMPLES = int(os.environ.get("QUICKNEWS_DOMAIN_HEALTH_MIN_SAMPLES", "4"))
+DOMAIN_HEALTH_MAX_DOMAINS = int(os.environ.get("QUICKNEWS_DOMAIN_HEALTH_MAX_DOMAINS", "2048"))
+DOMAIN_SKIP_BELOW = float(os.environ.get("QUICKNEWS_DOMAIN_SKIP_BELOW", "0.25"))
+DOMAIN_DEGRADED_BELOW = float(os.environ.get("QUICKNEWS_DOMAIN_DEGRADED_BELOW", "0.6"))
+DOMAIN_SKIP_COOLDOWN = float(os.environ.get("QUICKNEWS_DOMAIN_SKIP_COOLDOWN", "600"))
+DOMAIN_TIMEOUT_MIN = float(os.environ.get("QUICKNEWS_DOMAIN_TIMEOUT_MIN", "3"))
+DOMAIN_TIMEOUT_FACTOR = float(os.environ.get("QUICKNEWS_DOMAIN_TIMEOUT_FACTOR", "3"))
+SCRAPE_TIMEOUT = float(os.environ.get("QUICKNEWS_SCRAPE_TIMEOUT", "10"))
+# Pages with markers of a paywall and less text than this count as paywalled.
+PAYWALL_MAX_TEXT_CHARS = int(os.environ.get("QUICKNEWS_PAYWALL_MAX_TEXT_CHARS", "1500"))
+
+OK, EMPTY, PAYWALL, ERROR, TIMEOUT = 'ok', 'empty', 'paywall', 'error', 'timeout'
+UNKNOWN, HEALTHY, DEGRADED, BAD = 'unknown', 'healthy', 'degraded', 'bad'
+
+_PAYWALL_RE = re.compile(
+    r'"isaccessibleforfree"\s*:\s*"?false|paywall|subscriber-only|subscribers only|'
+    r'subscribe to (?:continue|read)|to continue reading|already a subscriber',
+    re.IGNORECASE)
+
+
+def classify_page(html, text):
+    """The outcome of a downloaded page: OK, EMPTY, or PAYWALL for a teaser behind a paywall."""
+    if len(text or '') < PAYWALL_MAX_TEXT_CHARS and _PAYWALL_RE.search(html or ''):
+        return PAYWALL
+    return OK if text else EMPTY
+
+
+def _percentile(ordered, pct):
+    return ordered[max(0, min(len(ordered) - 1, round(pct / 100.0 * len(ordered) + 0.5) - 1))]
+
+
+class DomainStats:
+    """Rolling outcomes and response times of one domain. Guarded by the registry's lock."""
+
+    def __init__(self, window=DOMAIN_HEALTH_WINDOW):
+        self.outcomes = deque(maxlen=window)
+        self.latencies = deque(maxlen=window * 2)
+        self.last_attempt = 0.0
+
+    def success_rate(self):
+        return sum(outcome == OK for outcome in self.outcomes) / len(self.outcomes) if self.outcomes else None
+
+    def status(self, min_samples=DOMAIN_HEALTH_MIN_SAMPLES):
+        if len(self.outcomes) < min_samples:
+            return UNKNOWN
+        rate = self.success_rate()
+        if rate < DOMAIN_SKIP_BELOW:
+            return BAD
+        return DEGRADED if rate < DOMAIN_DEGRADED_BELOW else HEALTHY
+
+    def latency(self, pct):
+        return _percentile(sorted(self.latencies), pct) if self.latencies else None
+
+
+class DomainHealthRegistry:
+    """Thread-safe LRU of DomainStats by domain."""
+
+    def __init__(self, window=DOMAIN_HEALTH_WINDOW, min_samples=DOMAIN_HEALTH_MIN_SAMPLES,
+                 cooldown=DOMAIN_SKIP_COOLDOWN, max_domains=DOMAIN_HEALTH_MAX_DOMAINS):
+        self.window = window
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.max_domains = max_domains
+        self._domains = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _stats(self, domain):
+        stats = self._domains.get(domain)
+        if stats is None:
+            stats = self._domains[domain] = DomainStats(self.window)
+            while len(self._domains) > self.max_domains:
+                self._domains.popitem(last=False)
+        self._domains.move_to_end(domain)
+        return stats
+
+    def record_latency(self, domain, seconds):
+        """Records the time one response from `domain` took (any status)."""
+        with self._lock:
+            self._stats(domain).latencies.append(seconds)
+
+    def record(self, domain, outcome):
+        """Records what one page from `domain` yielded."""
+        with self._lock:
+            stats = self._stats(domain)
+            if outcome == OK and stats.status(self.min_samples) == BAD:
+                # A successful probe of a skipped domain gives it a fresh start.
+                stats.outcomes.clear()
+            stats.outcomes.append(outcome)
+            stats.last_attempt = time.monotonic()
+
+    def status(self, domain):
+        with self._lock:
+            stats = self._domains.get(domain)
+            return stats.status(self.min_samples) if stats else UNKNOWN
+
+    def timeout_for(self, domain, default=SCRAPE_TIMEOUT):
+        """`default` shortened to DOMAIN_TIMEOUT_FACTOR times the domain's p95 response time."""
+        with self._lock:
+            stats = self._domains.get(domain)
+            if stats is None or len(stats.latencies) < self.min_samples:
+                return default
+            p95 = stats.latency(95)
+        return min(default, max(DOMAIN_TIMEOUT_MIN, p95 * DOMAIN_TIMEOUT_FACTOR))
+
+    def select_urls(self, urls, count, domain_of):
+        """
+        Picks up to `count` of the ranked `urls` to scrape, keeping their order.
+
+        Links to degraded domains, and one probe link per bad domain whose
+        cooldown has passed, are used only when there are too few others; other
+        links to bad domains are dropped.
+        """
+        now = time.monotonic()
+        candidates, probing = [], set()
+        with self._lock:
+            for url in urls:
+                domain = domain_of(url)
+                stats = self._domains.get(domain)
+                status = stats.status(self.min_samples) if stats else UNKNOWN
+                if status == BAD:
+                    if domain in probing or now - stats.last_attempt < self.cooldown:
+                        continue
+                    probing.add(domain)
+                candidates.append((url, domain, status))
+            preferred = [c for c in candidates if c[2] not in (DEGRADED, BAD)][:count]
+            fallback = [c for c in candidates if c[2] in (DEGRADED, BAD)][:count - len(preferred)]
+            for _, domain, status in fallback:
+                if status == BAD:
+                    # Reserve the probe so concurrent searches do not all try the domain.
+                    self._domains[domain].last_attempt = now
+        chosen = {url for url, _, _ in preferred + fallback}
+        return [url for url, _, _ in candidates if url in chosen]
+
+    def snapshot(self, domain=None):
+        """
+        The tracked domains, worst success rate first.
+
+        Returns:
+            list: One dict per domain with its status, success rate, sample count,
+            outcome counts, p50 / p95 response time (ms) and adaptive timeout.
+        """
+        with self._lock:
+            items = [(name, stats) for name, stats in self._domains.items() if domain in (None, name)]
+            rows = []
+            for name, stats in items:
+                p50, p95 = stats.latency(50), stats.latency(95)
+                counts = {}
+                for outcome in stats.outcomes:
+                    counts[outcome] = counts.get(outcome, 0) + 1
+                rate = stats.success_rate()
+                rows.append({
+                    'domain': name,
+                    'status': stats.status(self.min_samples),
+                    'success_rate': round(rate, 3) if rate is not None else None,
+                    'samples': len(stats.outcomes),
+                    'outcomes': counts,
+                    'p50_ms': round(p50 * 1000) if p50 is not None else None,
+                    'p95_ms': round(p95 * 1000) if p95 is not None else None,
+                })
+        for row in rows:
+            row['timeout'] = round(self.timeout_for(row['domain']), 2)
+        return sorted(rows, key=lambda row: (row['success_rate'] is None, row['success_rate'] or 0, row['domain']))
+
+    def clear(self):
+        with self._lock:
+            self._domains.clear()
+
+
+_domain_health = None
+_domain_health_lock = threading.Lock()
+
+
+def get_domain_health():
+    """Returns the process-wide DomainHealthRegistry, or None when disabled."""
+    global _domain_health
+    if not DOMAIN_HEALTH_ENABLED:
+        return None
+    if _domain_health is None:
+        with _domain_health_lock:
+            if _domain_health is None:
+                _domain_health = DomainHealthRegistry()
+    return _domain_health
+
+
+DOMAIN_STATUS = registry.gauge('quicknews_scrape_domains', 'Tracked scrape domains by health status.', ['status'])
+
+
+def _collect_domain_metrics():
+    counts = dict.fromkeys((UNKNOWN, HEALTHY, DEGRADED, BAD), 0)
+    if _domain_health is not None:
+        for row in _domain_health.snapshot():
+            counts[row['status']] += 1
+    for status, count in counts.items():
+        DOMAIN_STATUS.set(count, status=status)
+
+
+registry.add_collector(_collect_domain_metrics)
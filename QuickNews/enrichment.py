@@ -0,0 +1,154 @@
+"""
+Stored NLP features of articles: sentiment scores, top keywords, word counts
+and text fingerprints (the ArticleEnrichment and ArticleKeyword side tables).
+
+New articles get them from the NLP pool together with their summary
+(nlp_pool.text_features reuses the TextBlob pass that scores sentiment), so
+storing them costs the request path only the insert. backfill_enrichment()
+fills in older rows in keyset-paginated batches across worker processes, from
+the stored summary or, with `refetch`, from the re-downloaded page.
+"""
+import concurrent.futures
+import os
+
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .dedup import simhash, to_signed
+from .models import ArticleEnrichment, ArticleKeyword, ArticleSummary
+from .nlp_pool import text_features
+from .telemetry import span
+
+# --- Enrichment Configuration ---
+# Bump when text_features() changes; backfill_enrichment() then recomputes older rows.
+ENRICHMENT_VERSION = 1
+ENRICH_BATCH_SIZE = int(os.environ.get("QUICKNEWS_ENRICH_BATCH_SIZE", "200"))
+ENRICH_PROCESSES = int(os.environ.get("QUICKNEWS_ENRICH_PROCESSES", str(min(4, os.cpu_count() or 1))))
+
+_ENRICHMENT_FIELDS = ['polarity', 'subjectivity', 'word_count', 'text_hash', 'simhash', 'source', 'version', 'computed_at']
+_KEYWORD_MAX_LENGTH = ArticleKeyword._meta.get_field('keyword').max_length
+
+
+def build_enrichment(article_id, features, fingerprint=None, source=ArticleEnrichment.FULL_TEXT):
+    """
+    Unsaved rows (for bulk_create) for one article's text_features().
+
+    Returns:
+        tuple: (ArticleEnrichment, list of ArticleKeyword).
+    """
+    enrichment = ArticleEnrichment(
+        article_id=article_id, polarity=features['polarity'], subjectivity=features['subjectivity'],
+        word_count=features['word_count'], text_hash=features['text_hash'],
+        simhash=to_signed(fingerprint) if fingerprint is not None else None,
+        source=source, version=ENRICHMENT_VERSION, computed_at=timezone.now(),
+    )
+    keywords = [ArticleKeyword(article_id=article_id, keyword=word[:_KEYWORD_MAX_LENGTH], weight=weight)
+                for word, weight in features['keywords'].items()]
+    return enrichment, keywords
+
+
+def store_enrichments(items):
+    """
+    Inserts or replaces the enrichment of several articles in one transaction.
+
+    Args:
+        items: (article_id, features, fingerprint or None, source) tuples.
+    """
+    enrichments, keywords = [], []
+    for article_id, features, fingerprint, source in items:
+        enrichment, article_keywords = build_enrichment(article_id, features, fingerprint, source)
+        enrichments.append(enrichment)
+        keywords.extend(article_keywords)
+    if not enrichments:
+        return
+    with span('db_write', rows=len(enrichments)), transaction.atomic():
+        ArticleEnrichment.objects.bulk_create(enrichments, update_conflicts=True, unique_fields=['article'],
+                                              update_fields=_ENRICHMENT_FIELDS)
+        ArticleKeyword.objects.filter(article_id__in=[e.article_id for e in enrichments]).delete()
+        # Keywords truncated to the column length can collide; the first one wins.
+        ArticleKeyword.objects.bulk_create(keywords, ignore_conflicts=True)
+
+
+def pending_enrichment(force=False):
+    """Articles without a current enrichment (every article with `force`), oldest first."""
+    rows = ArticleSummary.objects.order_by('id')
+    if not force:
+        rows = rows.filter(Q(enrichment__isnull=True) | Q(enrichment__version__lt=ENRICHMENT_VERSION))
+    return rows
+
+
+def _init_worker():
+    # Needed when processes are spawned rather than forked; a no-op otherwise.
+    import django
+    django.setup()
+
+
+def _enrich_in_worker(task):
+    """
+    Process-pool entry point. Never touches the database.
+
+    Returns:
+        tuple: (article_id, features, fingerprint, source, note) where note says
+        why a requested refetch fell back to the summary.
+    """
+    article_id, url, summary, refetch = task
+    note = None
+    if refetch:
+        from .fetcher import get_fetch_engine
+        from .pipeline import parse_article
+        try:
+            text = parse_article(url, get_fetch_engine().fetch_html(url, timeout=7)).text
+            return article_id, text_features(text), simhash(text), ArticleEnrichment.FULL_TEXT, None
+        except Exception as e:
+            note = f"refetch failed ({e}); used the summary"
+    return article_id, text_features(summary), simhash(summary), ArticleEnrichment.SUMMARY, note
+
+
+def backfill_enrichment(batch_size=ENRICH_BATCH_SIZE, processes=ENRICH_PROCESSES, refetch=False, force=False,
+                        limit=None, progress=None):
+    """
+    Computes and stores the enrichment of every article that lacks a current one.
+
+    Args:
+        batch_size (int): Articles read, computed and written per round.
+        processes (int): Worker processes computing the features (0 runs inline).
+        refetch (bool): Download each page again to use its full text instead of the summary.
+        force (bool): Recompute articles that are already enriched.
+        limit (int): Stop after this many articles.
+        progress (callable): Called as progress(done, notes) after each batch.
+
+    Returns:
+        tuple: (articles enriched, list of (article_id, note) for refetches that fell back).
+    """
+    done, notes, last_id = 0, [], 0
+    executor = None
+    if processes > 0:
+        # Forked children must not inherit open database connections.
+        connections.close_all()
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=processes, initializer=_init_worker)
+    try:
+        while limit is None or done < limit:
+            size = batch_size if limit is None else min(batch_size, limit - done)
+            rows = list(pending_enrichment(force).filter(id__gt=last_id).values_list('id', 'url', 'summary')[:size])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            tasks = [(article_id, url, summary, refetch) for article_id, url, summary in rows]
+            if executor is not None:
+                outcomes = list(executor.map(_enrich_in_worker, tasks, chunksize=max(1, len(tasks) // (processes * 4))))
+            else:
+                outcomes = [_enrich_in_worker(task) for task in tasks]
+
+            # Rows deleted while their features were computed are skipped.
+            existing = set(ArticleSummary.objects.filter(id__in=[o[0] for o in outcomes]).values_list('id', flat=True))
+            store_enrichments([(article_id, features, fingerprint, source)
+                               for article_id, features, fingerprint, source, _ in outcomes if article_id in existing])
+            notes.extend((article_id, note) for article_id, _, _, _, note in outcomes if note)
+            done += len(rows)
+            if progress:
+                progress(done, notes)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return done, notes
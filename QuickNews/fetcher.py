@@ -0,0 +1,448 @@
+"""
+Process-wide HTTP fetch engines used by every scraping path in QuickNews.
+
+Instead of fresh TCP/TLS connections for every request, all downloads go
+through shared engines with:
+
+- a keep-alive connection pool per host,
+- a global concurrency limit plus a per-domain limit so one slow publisher
+  cannot monopolise the connections,
+- an overall Deadline that every fetch made on behalf of one user request
+  respects.
+
+AsyncFetchEngine serves the async views: the page cache, limits and deadlines
+on top of a pooled httpx.AsyncClient, so a request waiting on a slow publisher
+holds no thread. There is one per event loop, so its pooling needs an ASGI
+server (one long-lived loop per worker); under WSGI each request gets its own
+loop and therefore a new client and no connection reuse. FetchEngine is the
+requests.Session-based engine for synchronous callers: the job workers,
+management commands and the enrichment backfill.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .async_utils import LoopLocal, offload
+from .domain_health import get_domain_health
+from .page_cache import CacheEntry, get_page_cache
+
+# --- Engine Configuration ---
+# All limits can be tuned per deployment through environment variables.
+FETCH_GLOBAL_LIMIT = int(os.environ.get("QUICKNEWS_FETCH_GLOBAL_LIMIT", "32"))
+FETCH_PER_DOMAIN_LIMIT = int(os.environ.get("QUICKNEWS_FETCH_PER_DOMAIN_LIMIT", "4"))
+FETCH_POOL_MAXSIZE = int(os.environ.get("QUICKNEWS_FETCH_POOL_MAXSIZE", "10"))
+# Per-domain semaphores kept per engine; only idle ones are evicted.
+FETCH_MAX_DOMAINS = int(os.environ.get("QUICKNEWS_FETCH_MAX_DOMAINS", "1024"))
+SCRAPE_DEADLINE = float(os.environ.get("QUICKNEWS_SCRAPE_DEADLINE", "20"))
+# Downloads in flight on one event loop; they hold sockets, not threads, so this can be high.
+ASYNC_FETCH_GLOBAL_LIMIT = int(os.environ.get("QUICKNEWS_ASYNC_FETCH_GLOBAL_LIMIT", "256"))
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Same fallback newspaper uses when a server does not declare a charset.
+FAIL_ENCODING = 'ISO-8859-1'
+
+
+class DeadlineExceeded(requests.Timeout):
+    """Raised when a fetch cannot start or finish before its request deadline."""
+
+
+class Deadline:
+    """An absolute point in time shared by all fetches of one user request."""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def cancel(self):
+        """Expires the deadline now, so fetches still holding it stop at their next check."""
+        self.expires_at = time.monotonic()
+
+    def clamp(self, timeout):
+        """Returns the smaller of `timeout` and the time left, raising if none is left."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("Request deadline exceeded")
+        return min(timeout, remaining) if timeout else remaining
+
+
+def get_domain(url):
+    """Returns the lower-cased host of a URL, used as the key for per-domain limits."""
+    return (urlparse(url).hostname or '').lower()
+
+
+def decode_html(response):
+    """
+    Decodes a response body the same way newspaper's downloader does, so HTML
+    handed to Article.download(input_html=...) is identical to what it would
+    have fetched itself.
+    """
+    if response.encoding != FAIL_ENCODING:
+        return response.text or ''
+    html = response.content
+    if 'charset' not in response.headers.get('content-type', ''):
+        encodings = requests.utils.get_encodings_from_content(response.text)
+        if encodings:
+            response.encoding = encodings[0]
+            html = response.text
+    return html or ''
+
+
+def _decode(content, encoding):
+    try:
+        return str(content, encoding, errors='replace')
+    except LookupError:
+        return str(content, errors='replace')
+
+
+def decode_html_body(content, headers):
+    """decode_html() for a raw body and its headers (used with httpx responses)."""
+    encoding = requests.utils.get_encoding_from_headers(headers)
+    if encoding != FAIL_ENCODING:
+        return _decode(content, encoding or 'utf-8') if content else ''
+    html = content
+    if 'charset' not in headers.get('content-type', ''):
+        encodings = requests.utils.get_encodings_from_content(_decode(content, FAIL_ENCODING))
+        if encodings:
+            html = _decode(content, encodings[0])
+    return html or ''
+
+
+def _record_latency(domain, started):
+    """Feeds a response time into the domain health registry (which adapts scrape timeouts)."""
+    if (health := get_domain_health()) is not None:
+        health.record_latency(domain, time.perf_counter() - started)
+
+
+def _claim_domain_slot(slots, domain, max_domains, make_semaphore):
+    """
+    The semaphore of `domain` from the LRU `slots` (domain -> [semaphore, users]),
+    counted as in use until _release_domain_slot(). Least recently used idle
+    semaphores beyond `max_domains` are dropped; ones in use are kept so a
+    domain never has two.
+    """
+    slot = slots.get(domain)
+    if slot is None:
+        slot = slots[domain] = [make_semaphore(), 0]
+    slots.move_to_end(domain)
+    slot[1] += 1
+    excess = len(slots) - max_domains
+    if excess > 0:
+        for idle in [name for name, (_, users) in slots.items() if not users][:excess]:
+            del slots[idle]
+    return slot[0]
+
+
+def _release_domain_slot(slots, domain):
+    slots[domain][1] -= 1
+
+
+class FetchEngine:
+    """
+    Shared, thread-safe downloader. One instance lives per process; use
+    get_fetch_engine() rather than constructing it directly.
+    """
+
+    def __init__(self, global_limit=FETCH_GLOBAL_LIMIT, per_domain_limit=FETCH_PER_DOMAIN_LIMIT,
+                 pool_maxsize=FETCH_POOL_MAXSIZE, max_domains=FETCH_MAX_DOMAINS):
+        self.per_domain_limit = per_domain_limit
+        self.max_domains = max_domains
+        self._global_slots = threading.BoundedSemaphore(global_limit)
+        self._domain_slots = OrderedDict()
+        self._lock = threading.Lock()
+
+        # A single Session keeps connections alive between requests; the adapter
+        # holds one pool per host, so repeat visits to a publisher skip the handshake.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max(global_limit, 10), pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(DEFAULT_HEADERS)
+
+    def _claim_domain(self, domain):
+        with self._lock:
+            return _claim_domain_slot(self._domain_slots, domain, self.max_domains,
+                                      lambda: threading.BoundedSemaphore(self.per_domain_limit))
+
+    def _release_domain(self, domain):
+        with self._lock:
+            _release_domain_slot(self._domain_slots, domain)
+
+    def _acquire(self, semaphore, deadline):
+        if deadline is None:
+            semaphore.acquire()
+        elif not semaphore.acquire(timeout=deadline.remaining()):
+            raise DeadlineExceeded("Timed out waiting for a free connection slot")
+
+    def get(self, url, timeout=10, headers=None, deadline=None):
+        """
+        Performs a GET through the pooled session, honouring the global and
+        per-domain concurrency limits and the optional request deadline.
+
+        Returns:
+            requests.Response: The response (status is NOT checked here).
+        """
+        domain = get_domain(url)
+        domain_slot = self._claim_domain(domain)
+        try:
+            self._acquire(self._global_slots, deadline)
+            try:
+                self._acquire(domain_slot, deadline)
+                try:
+                    if deadline is not None:
+                        timeout = deadline.clamp(timeout)
+                    started = time.perf_counter()
+                    response = self.session.get(url, headers=headers, timeout=timeout, allow_redirects=True)
+                    _record_latency(domain, started)
+                    return response
+                finally:
+                    domain_slot.release()
+            finally:
+                self._global_slots.release()
+        finally:
+            self._release_domain(domain)
+
+    def fetch_html(self, url, timeout=10, headers=None, deadline=None, use_cache=True):
+        """
+        Downloads a page and returns its decoded HTML, raising on non-2XX responses.
+
+        Pages are served from the shared page cache while fresh. Stale entries
+        that carry an ETag or Last-Modified validator are revalidated with a
+        conditional request, so an unchanged page costs a 304 instead of a body.
+        """
+        cache = get_page_cache() if use_cache else None
+        entry = cache.get(url) if cache else None
+        if entry is not None and cache.is_fresh(entry):
+            return entry.body
+
+        request_headers = dict(headers or {})
+        if entry is not None and entry.can_revalidate():
+            request_headers.update(entry.conditional_headers())
+
+        response = self.get(url, timeout=timeout, headers=request_headers or None, deadline=deadline)
+        if response.status_code == 304 and entry is not None:
+            entry.fetched_at = time.time()
+            cache.set(url, entry)
+            return entry.body
+
+        response.raise_for_status()
+        html = decode_html(response)
+        if cache is not None and response.status_code == 200 and html:
+            cache.set(url, CacheEntry(
+                url, html,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+            ))
+        return html
+
+
+class Quorum:
+    """
+    Early-exit policy for AsyncFetchEngine.map_as_completed: stop waiting once `min_results`
+    usable results (or `min_size` in total, as measured by `size`) have arrived,
+    or once `soft_deadline` seconds have passed with at least one usable result.
+    Records which items contributed.
+    """
+
+    def __init__(self, min_results, min_size=None, soft_deadline=None, size=len):
+        self.min_results = min_results
+        self.min_size = min_size
+        self.soft_deadline = Deadline(soft_deadline) if soft_deadline is not None else None
+        self.size = size
+        self.started = time.monotonic()
+        self.contributors = []
+        self.failed = []
+        self.total_size = 0
+        self.reason = None
+
+    def record(self, item, result):
+        if result:
+            self.contributors.append(item)
+            self.total_size += self.size(result)
+        else:
+            self.failed.append(item)
+
+    def satisfied(self):
+        if len(self.contributors) >= self.min_results:
+            self.reason = f"{len(self.contributors)} results"
+        elif self.min_size is not None and self.total_size >= self.min_size:
+            self.reason = f"{self.total_size} characters"
+        elif self.contributors and self.soft_deadline is not None and self.soft_deadline.expired():
+            self.reason = "soft deadline"
+        return self.reason is not None
+
+    def wait_timeout(self, deadline=None):
+        """How long to block for the next result: until the soft deadline while it is pending, else the hard one."""
+        hard = deadline.remaining() if deadline is not None else None
+        if self.soft_deadline is None or self.soft_deadline.expired():
+            return hard
+        soft = self.soft_deadline.remaining()
+        return soft if hard is None else min(soft, hard)
+
+    def report(self):
+        return {
+            'contributors': list(self.contributors),
+            'failed': list(self.failed),
+            'characters': self.total_size,
+            'elapsed': round(time.monotonic() - self.started, 3),
+            'reason': self.reason or 'all pages finished',
+        }
+
+
+class AsyncFetchEngine:
+    """
+    asyncio counterpart of FetchEngine, bound to the event loop it was created
+    on; use get_async_fetch_engine(). Errors are raised as requests exceptions,
+    so callers handle both engines alike.
+    """
+
+    def __init__(self, global_limit=ASYNC_FETCH_GLOBAL_LIMIT, per_domain_limit=FETCH_PER_DOMAIN_LIMIT,
+                 pool_maxsize=FETCH_POOL_MAXSIZE, max_domains=FETCH_MAX_DOMAINS):
+        import httpx  # deferred: only ASGI workers need it
+
+        self.per_domain_limit = per_domain_limit
+        self.max_domains = max_domains
+        self._global_slots = asyncio.Semaphore(global_limit)
+        self._domain_slots = OrderedDict()
+        self.client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS, follow_redirects=True,
+            limits=httpx.Limits(max_connections=global_limit, max_keepalive_connections=pool_maxsize * 4))
+
+    def _claim_domain(self, domain):
+        # No lock: the engine is only used from its own event loop.
+        return _claim_domain_slot(self._domain_slots, domain, self.max_domains,
+                                  lambda: asyncio.Semaphore(self.per_domain_limit))
+
+    async def _acquire(self, semaphore, deadline):
+        if deadline is None:
+            await semaphore.acquire()
+            return
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("Timed out waiting for a free connection slot") from None
+
+    async def get(self, url, timeout=10, headers=None, deadline=None):
+        """
+        Performs a GET through the pooled client, honouring the global and
+        per-domain concurrency limits and the optional request deadline.
+
+        Returns:
+            httpx.Response: The response (status is NOT checked here).
+        """
+        import httpx
+
+        domain = get_domain(url)
+        domain_slot = self._claim_domain(domain)
+        try:
+            await self._acquire(self._global_slots, deadline)
+            try:
+                await self._acquire(domain_slot, deadline)
+                try:
+                    if deadline is not None:
+                        timeout = deadline.clamp(timeout)
+                    started = time.perf_counter()
+                    response = await self.client.get(url, headers=headers, timeout=timeout)
+                    _record_latency(domain, started)
+                    return response
+                except httpx.TimeoutException as e:
+                    raise requests.Timeout(f"Timed out fetching {url}: {e}") from e
+                except httpx.HTTPError as e:
+                    raise requests.ConnectionError(f"Could not fetch {url}: {e}") from e
+                finally:
+                    domain_slot.release()
+            finally:
+                self._global_slots.release()
+        finally:
+            _release_domain_slot(self._domain_slots, domain)
+
+    async def fetch_html(self, url, timeout=10, headers=None, deadline=None, use_cache=True):
+        """Async FetchEngine.fetch_html(): same page cache, revalidation and decoding."""
+        cache = get_page_cache() if use_cache else None
+        # The cache's disk tier is SQLite, so lookups and writes are offloaded.
+        entry = await offload(cache.get, url) if cache else None
+        if entry is not None and cache.is_fresh(entry):
+            return entry.body
+
+        request_headers = dict(headers or {})
+        if entry is not None and entry.can_revalidate():
+            request_headers.update(entry.conditional_headers())
+
+        response = await self.get(url, timeout=timeout, headers=request_headers or None, deadline=deadline)
+        if response.status_code == 304 and entry is not None:
+            entry.fetched_at = time.time()
+            await offload(cache.set, url, entry)
+            return entry.body
+
+        if response.is_error:
+            raise requests.HTTPError(f"{response.status_code} error fetching {url}")
+        html = decode_html_body(response.content, response.headers)
+        if cache is not None and response.status_code == 200 and html:
+            await offload(cache.set, url, CacheEntry(
+                url, html,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+            ))
+        return html
+
+    async def map_as_completed(self, fn, items, deadline=None, quorum=None):
+        """
+        Runs the coroutine function `fn(item)` for every item concurrently and
+        yields (item, result) pairs as they finish. When the deadline passes, or
+        the optional Quorum is satisfied, the unfinished calls are cancelled.
+        """
+        task_to_item = {asyncio.ensure_future(fn(item)): item for item in items}
+        pending = set(task_to_item)
+        try:
+            while pending:
+                timeout = quorum.wait_timeout(deadline) if quorum is not None else (
+                    deadline.remaining() if deadline is not None else None)
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    item, result = task_to_item[task], task.result()
+                    if quorum is not None:
+                        quorum.record(item, result)
+                    yield item, result
+                if quorum is not None and quorum.satisfied():
+                    if pending:
+                        print(f"Quorum reached ({quorum.reason}); cancelling {len(pending)} slower page(s).")
+                    break
+                if deadline is not None and deadline.expired():
+                    print(f"Fetch deadline reached; cancelling {len(pending)} unfinished page(s).")
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+_async_engines = LoopLocal(AsyncFetchEngine)
+
+
+def get_fetch_engine():
+    """Returns the process-wide FetchEngine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = FetchEngine()
+    return _engine
+
+
+def get_async_fetch_engine():
+    """Returns the AsyncFetchEngine of the running event loop, creating it on first use."""
+    return _async_engines.get()
@@ -0,0 +1,224 @@
+"""
+Background job subsystem for URL summarization.
+
+Requests enqueue a SummaryJob row and get its id back immediately; worker
+threads started by `manage.py run_summary_workers` (or, optionally, inside the
+web process) claim queued jobs from the database and run the shared URL
+pipeline. No external broker is needed: the jobs table is the queue.
+
+- Claiming is a conditional UPDATE, so several worker processes can poll the
+  same table without running a job twice.
+- Transient failures (downloads) are retried with exponential backoff up to
+  the job's max_attempts; unreadable pages fail immediately.
+- A per-domain rate limiter spaces out requests to the same publisher.
+- Jobs left "running" by a crashed worker are re-queued after a timeout.
+"""
+import concurrent.futures
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .fetcher import get_domain
+from .models import SummaryJob
+from .pipeline import PipelineError, summarize_url
+
+# --- Job Configuration ---
+JOB_MAX_ATTEMPTS = int(os.environ.get("QUICKNEWS_JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF = float(os.environ.get("QUICKNEWS_JOB_RETRY_BACKOFF", "15"))
+JOB_DOMAIN_INTERVAL = float(os.environ.get("QUICKNEWS_JOB_DOMAIN_INTERVAL", "2"))
+JOB_STALE_AFTER = float(os.environ.get("QUICKNEWS_JOB_STALE_AFTER", "300"))
+JOB_WORKERS = int(os.environ.get("QUICKNEWS_JOB_WORKERS", "4"))
+# Starts a worker pool inside the web process on first enqueue (handy for runserver).
+JOBS_INPROCESS = os.environ.get("QUICKNEWS_JOBS_INPROCESS", "0") == "1"
+
+
+class DomainRateLimiter:
+    """Allows at most one job start per domain every `min_interval` seconds."""
+
+    def __init__(self, min_interval=JOB_DOMAIN_INTERVAL):
+        self.min_interval = min_interval
+        self._next_allowed = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, domain):
+        now = time.monotonic()
+        with self._lock:
+            if self._next_allowed.get(domain, 0) > now:
+                return False
+            self._next_allowed[domain] = now + self.min_interval
+            return True
+
+    def release(self, domain):
+        """Gives back a start taken with try_acquire() that was not used."""
+        with self._lock:
+            self._next_allowed.pop(domain, None)
+
+
+def enqueue_summary_job(url, max_attempts=JOB_MAX_ATTEMPTS):
+    """
+    Queues `url` for background summarization. A URL that already has an
+    unfinished job reuses it instead of being queued twice.
+
+    Returns:
+        SummaryJob: The queued (or existing) job.
+    """
+    existing = SummaryJob.objects.filter(url=url, status__in=[SummaryJob.QUEUED, SummaryJob.RUNNING]).first()
+    if existing:
+        return existing
+    job = SummaryJob.objects.create(url=url, domain=get_domain(url), max_attempts=max_attempts)
+    if JOBS_INPROCESS:
+        ensure_inprocess_workers()
+    return job
+
+
+def job_status(job):
+    """Builds the JSON payload describing a job."""
+    return {
+        'job_id': job.id,
+        'url': job.url,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'error': job.error,
+        'article_id': job.article_id,
+        'created_at': job.created_at.isoformat(),
+        'updated_at': job.updated_at.isoformat(),
+    }
+
+
+def requeue_stale_jobs(stale_after=JOB_STALE_AFTER):
+    """Puts jobs whose worker vanished mid-run back on the queue. Returns how many."""
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return SummaryJob.objects.filter(status=SummaryJob.RUNNING, locked_at__lt=cutoff).update(
+        status=SummaryJob.QUEUED, locked_by='', locked_at=None)
+
+
+def claim_next_job(worker_id, rate_limiter=None, scan_limit=50):
+    """
+    Atomically claims the oldest runnable job whose domain is not rate limited.
+
+    Returns:
+        SummaryJob or None.
+    """
+    now = timezone.now()
+    candidates = SummaryJob.objects.filter(status=SummaryJob.QUEUED, run_after__lte=now).order_by('run_after', 'id')
+    for job_id, domain in candidates.values_list('id', 'domain')[:scan_limit]:
+        if rate_limiter is not None and not rate_limiter.try_acquire(domain):
+            continue
+        claimed = SummaryJob.objects.filter(id=job_id, status=SummaryJob.QUEUED).update(
+            status=SummaryJob.RUNNING, locked_by=worker_id, locked_at=now, updated_at=now,
+            attempts=F('attempts') + 1)
+        if claimed:
+            return SummaryJob.objects.get(id=job_id)
+        if rate_limiter is not None:
+            # Another worker claimed it first; the domain has not been hit.
+            rate_limiter.release(domain)
+    return None
+
+
+def run_job(job):
+    """Runs one claimed job to completion, recording success, retry or failure."""
+    try:
+        article, from_cache = summarize_url(job.url)
+    except Exception as e:
+        retryable = not isinstance(e, PipelineError) or e.retryable
+        job.error = str(e)
+        job.locked_by, job.locked_at = '', None
+        if retryable and job.attempts < job.max_attempts:
+            job.status = SummaryJob.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1))
+            print(f"Job {job.id} for {job.url} failed (attempt {job.attempts}); retrying: {e}")
+        else:
+            job.status = SummaryJob.FAILED
+            print(f"Job {job.id} for {job.url} failed permanently: {e}")
+        job.save(update_fields=['status', 'error', 'run_after', 'locked_by', 'locked_at', 'updated_at'])
+        return job
+
+    job.status = SummaryJob.SUCCEEDED
+    job.article = article
+    job.from_cache = from_cache
+    job.error = ''
+    job.locked_by, job.locked_at = '', None
+    job.save(update_fields=['status', 'article', 'from_cache', 'error', 'locked_by', 'locked_at', 'updated_at'])
+    return job
+
+
+def _run_job_in_thread(job):
+    try:
+        return run_job(job)
+    finally:
+        # Worker threads hold their own DB connections; don't leak them.
+        close_old_connections()
+
+
+class JobWorkerPool:
+    """
+    Polls the jobs table and runs claimed jobs on a pool of threads.
+    Summarization is mostly network bound, so threads keep many jobs in flight.
+    """
+
+    def __init__(self, concurrency=JOB_WORKERS, poll_interval=1.0, rate_limiter=None):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.rate_limiter = rate_limiter or DomainRateLimiter()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stop_event = threading.Event()
+
+    def run(self, once=False):
+        """
+        Processes jobs until stopped. With once=True, returns as soon as no
+        runnable job is left (useful for cron-style runs and tests).
+
+        Returns:
+            int: Number of jobs processed.
+        """
+        processed = 0
+        in_flight = set()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency,
+                                                   thread_name_prefix='quicknews-job') as executor:
+            requeue_stale_jobs()
+            while not self.stop_event.is_set():
+                while len(in_flight) < self.concurrency and (job := claim_next_job(self.worker_id, self.rate_limiter)):
+                    in_flight.add(executor.submit(_run_job_in_thread, job))
+
+                if not in_flight:
+                    if once and not self._has_pending_jobs():
+                        break
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+
+                done, in_flight = concurrent.futures.wait(
+                    in_flight, timeout=self.poll_interval, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    if (error := future.exception()) is not None:
+                        # The job stays "running" and is re-queued by requeue_stale_jobs later.
+                        print(f"Job worker crashed: {error}")
+                processed += len(done)
+        return processed
+
+    def _has_pending_jobs(self):
+        # In --once mode, keep going while rate-limited jobs are waiting, but not for delayed retries.
+        return SummaryJob.objects.filter(status=SummaryJob.QUEUED, run_after__lte=timezone.now()).exists()
+
+    def stop(self):
+        self.stop_event.set()
+
+
+_inprocess_pool = None
+_inprocess_lock = threading.Lock()
+
+
+def ensure_inprocess_workers():
+    """Starts one background JobWorkerPool inside this process if none is running."""
+    global _inprocess_pool
+    with _inprocess_lock:
+        if _inprocess_pool is None:
+            _inprocess_pool = JobWorkerPool()
+            threading.Thread(target=_inprocess_pool.run, name='quicknews-job-poller', daemon=True).start()
+    return _inprocess_pool
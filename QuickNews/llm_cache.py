@@ -0,0 +1,172 @@
+"""
+Memoized answers for Gemini calls.
+
+Answers are keyed on a hash of (model name, framed prompt, context), so an exact
+repeat of a trending question is answered without another round trip to the
+API. Entries expire after a configurable TTL and the cache is size bounded.
+
+Two interchangeable backends are provided:
+- MemoryBackend: a per-process LRU (the default).
+- FileBackend: one JSON file per answer in a directory, useful as a local
+  stand-in that survives restarts and lets tests run fully offline.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# --- Cache Configuration ---
+LLM_CACHE_ENABLED = os.environ.get("QUICKNEWS_LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_TTL = float(os.environ.get("QUICKNEWS_LLM_CACHE_TTL", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("QUICKNEWS_LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_BACKEND = os.environ.get("QUICKNEWS_LLM_CACHE_BACKEND", "memory")
+LLM_CACHE_DIR = os.environ.get(
+    "QUICKNEWS_LLM_CACHE_DIR",
+    str(Path(__file__).resolve().parent.parent / 'llm_cache'),
+)
+
+
+def make_cache_key(model, prompt, context=None):
+    """Returns a stable SHA-256 key for one (model, framed prompt, context) triple."""
+    digest = hashlib.sha256()
+    for part in (model, prompt, context or ''):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU of (answer, stored_at) pairs."""
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                self._entries.move_to_end(key)
+            return item
+
+    def set(self, key, answer, stored_at):
+        with self._lock:
+            self._entries[key] = (answer, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FileBackend:
+    """
+    Stores each answer as `<key>.json` inside `directory`. Reads refresh the
+    file's mtime, and the least recently used files are removed once the
+    directory holds more than `max_entries` answers.
+    """
+
+    def __init__(self, directory=LLM_CACHE_DIR, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.directory / f"{key}.json"
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                item = json.load(f)
+            os.utime(path)
+            return item['answer'], item['stored_at']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set(self, key, answer, stored_at):
+        path = self._path(key)
+        tmp_path = path.with_suffix('.tmp')
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'answer': answer, 'stored_at': stored_at}, f)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def _evict(self):
+        files = sorted(self.directory.glob('*.json'), key=lambda p: p.stat().st_mtime)
+        for stale in files[:max(0, len(files) - self.max_entries)]:
+            stale.unlink(missing_ok=True)
+
+    def delete(self, key):
+        self._path(key).unlink(missing_ok=True)
+
+    def clear(self):
+        for path in self.directory.glob('*.json'):
+            path.unlink(missing_ok=True)
+
+
+class AnswerCache:
+    """TTL cache in front of a backend, with hit/miss counters."""
+
+    def __init__(self, backend, ttl=LLM_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        item = self.backend.get(key)
+        if item is not None and (time.time() - item[1]) >= self.ttl:
+            self.backend.delete(key)
+            item = None
+        self._count(item is not None)
+        return item[0] if item is not None else None
+
+    def set(self, key, answer):
+        self.backend.set(key, answer, time.time())
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total) if total else 0.0,
+            }
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """Returns the process-wide AnswerCache, or None when caching is disabled."""
+    global _answer_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                backend = FileBackend() if LLM_CACHE_BACKEND == 'file' else MemoryBackend()
+                _answer_cache = AnswerCache(backend)
+    return _answer_cache
@@ -0,0 +1,407 @@
+"""
+The gateway every Gemini call goes through.
+
+Instead of one bare requests.post per question, calls share:
+- a pooled httpx.AsyncClient per event loop (keep-alive, no TLS handshake per
+  call; see async_utils.LoopLocal for why that needs an ASGI server),
+- a token bucket that smooths bursts to the API's rate limit,
+- retries with full-jitter exponential backoff on 429/5xx and connection
+  errors, honouring Retry-After,
+- a circuit breaker that fails fast while the API is down, so callers go
+  straight to their fallbacks instead of queueing behind timeouts,
+- hedged requests: if a non-streaming call is still running after
+  QUICKNEWS_LLM_HEDGE_AFTER seconds, a second identical call is raced against it.
+
+agenerate() and astream() serve the async views; every call on every loop
+shares the same rate limiter and circuit breaker.
+
+QUICKNEWS_GEMINI_BASE_URL points the gateway at another server, e.g. the local
+stand-in in llm_stub.py used by the tests.
+"""
+import asyncio
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+
+from .async_utils import LoopLocal
+from .telemetry import registry
+
+# --- Gateway Configuration ---
+GEMINI_BASE_URL = os.environ.get("QUICKNEWS_GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+LLM_TIMEOUT = float(os.environ.get("QUICKNEWS_LLM_TIMEOUT", "60"))
+LLM_POOL_SIZE = int(os.environ.get("QUICKNEWS_LLM_POOL_SIZE", "10"))
+LLM_RATE = float(os.environ.get("QUICKNEWS_LLM_RATE", "5"))  # requests per second
+LLM_BURST = int(os.environ.get("QUICKNEWS_LLM_BURST", "10"))
+LLM_RATE_WAIT = float(os.environ.get("QUICKNEWS_LLM_RATE_WAIT", "10"))  # longest wait for a token
+LLM_MAX_RETRIES = int(os.environ.get("QUICKNEWS_LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.environ.get("QUICKNEWS_LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.environ.get("QUICKNEWS_LLM_BACKOFF_MAX", "8"))
+LLM_BREAKER_THRESHOLD = int(os.environ.get("QUICKNEWS_LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET = float(os.environ.get("QUICKNEWS_LLM_BREAKER_RESET", "30"))
+# 0 disables hedging.
+LLM_HEDGE_AFTER = float(os.environ.get("QUICKNEWS_LLM_HEDGE_AFTER", "10"))
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+LLM_RETRIES = registry.counter('quicknews_llm_retries_total', 'Retried Gemini attempts by cause.', ['status'])
+LLM_HEDGES = registry.counter('quicknews_llm_hedges_total', 'Hedged Gemini requests sent.')
+LLM_BREAKER_OPEN = registry.gauge('quicknews_llm_circuit_open', '1 while the Gemini circuit breaker rejects calls.')
+
+
+class LLMError(Exception):
+    """A Gemini call failed for good (after any retries)."""
+
+
+class CircuitOpenError(LLMError):
+    """The circuit breaker is open; the call was not attempted."""
+
+
+class RateLimitExceeded(LLMError):
+    """No rate-limit token became available in time."""
+
+
+class RetryableError(LLMError):
+    """One attempt failed in a way that is worth retrying."""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate=LLM_RATE, capacity=LLM_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _take(self):
+        """Takes a token if one is available; otherwise returns the seconds until one will be."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def try_acquire(self):
+        return self._take() == 0
+
+    async def aacquire(self, timeout=LLM_RATE_WAIT):
+        """Waits (with asyncio.sleep) until a token is available. Returns False if that would take longer than `timeout`."""
+        give_up_at = time.monotonic() + timeout
+        while (wait := self._take()):
+            if time.monotonic() + wait > give_up_at:
+                return False
+            await asyncio.sleep(wait)
+        return True
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failed calls (a call counts once,
+    however many attempts it made) and rejects calls for `reset_after` seconds;
+    then lets a single trial call through (half-open) and closes again if it succeeds.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, reset_after=LLM_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.reset_after:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self):
+        return self.admit()[0]
+
+    def admit(self):
+        """
+        allow() that also tells the caller whether it was given the half-open trial.
+
+        Returns:
+            tuple: (allowed, trial). A trial must be ended with record_success(),
+            record_failure() or release_trial(), or no further call is ever let through.
+        """
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True, False
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True, True
+            return False, False
+
+    def release_trial(self, reopen=False):
+        """Ends a trial that said nothing about the API's health. With `reopen`, stays open for another `reset_after`."""
+        with self._lock:
+            if self._trial_running and reopen:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.threshold:
+                if self.opened_at is None or self._trial_running:
+                    print(f"LLM circuit breaker opened after {self.failures} consecutive failed call(s).")
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class GeminiGateway:
+    """Pooled, rate-limited, retrying and hedging client for the Gemini REST API."""
+
+    def __init__(self, api_key=None, model=None, base_url=GEMINI_BASE_URL, timeout=LLM_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, hedge_after=LLM_HEDGE_AFTER, bucket=None, breaker=None,
+                 pool_size=LLM_POOL_SIZE):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.hedge_after = hedge_after
+        self.bucket = bucket or TokenBucket()
+        self.breaker = breaker or CircuitBreaker()
+        self._async_clients = LoopLocal(self._make_async_client)
+        self._pool_size = pool_size
+
+    def _make_async_client(self):
+        import httpx  # deferred: only ASGI workers need it
+
+        return httpx.AsyncClient(timeout=self.timeout, headers={'Content-Type': 'application/json'},
+                                 limits=httpx.Limits(max_connections=self._pool_size * 10,
+                                                     max_keepalive_connections=self._pool_size))
+
+    @property
+    def enabled(self):
+        return bool(self.api_key)
+
+    def _url(self, method, stream=False):
+        url = f"{self.base_url}/models/{self.model}:{method}?key={self.api_key}"
+        return url + '&alt=sse' if stream else url
+
+    async def _apost(self, method, payload, stream=False):
+        """One HTTP attempt on the event loop's AsyncClient. Raises RetryableError for failures worth retrying."""
+        import httpx
+
+        client = self._async_clients.get()
+        try:
+            request = client.build_request('POST', self._url(method, stream), json=payload)
+            response = await client.send(request, stream=stream)
+        except httpx.TransportError as e:
+            raise RetryableError(f"Connection to the LLM API failed: {e}") from e
+        if response.status_code in RETRYABLE_STATUSES:
+            await response.aclose()
+            raise RetryableError(f"LLM API returned HTTP {response.status_code}", status=response.status_code,
+                                 retry_after=parse_retry_after(response.headers.get('Retry-After')))
+        if response.is_error:
+            await response.aclose()
+            raise LLMError(f"LLM API rejected the request: HTTP {response.status_code}")
+        return response
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return retry_after
+        # "Full jitter": spreads simultaneous retries out instead of synchronizing them.
+        return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+    def _before_attempt(self, attempt, have_token):
+        """
+        Fails fast while the breaker is open.
+
+        Returns:
+            tuple: (trial, needs_token) — whether this attempt is the breaker's half-open
+            trial, and whether it still needs a rate-limit token.
+        """
+        allowed, trial = self.breaker.admit()
+        if not allowed:
+            raise CircuitOpenError("LLM API circuit breaker is open")
+        return trial, not (have_token and attempt == 0)
+
+    def _retry_delay(self, error, attempt, trial=False, unhealthy=False):
+        """
+        Returns how long to wait before retrying a failed attempt, or raises to give up.
+        `unhealthy` says whether any attempt of the call failed for a reason other than throttling.
+        """
+        delay = self._backoff(attempt, error.retry_after)
+        # A failed trial gives up at once: a retry would only meet the reopened breaker.
+        # Waiting out a long Retry-After would only delay the caller's own fallback.
+        if trial or attempt == self.max_retries or delay > LLM_BACKOFF_MAX:
+            # The call counts as one failure. Being throttled says nothing about the API's health;
+            # a throttled trial is released with the breaker still open, so a later call can try again.
+            if unhealthy:
+                self.breaker.record_failure()
+            elif trial:
+                self.breaker.release_trial(reopen=True)
+            raise LLMError(f"{error} (gave up after {attempt + 1} attempt(s))") from error
+        print(f"{error}; retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries}).")
+        LLM_RETRIES.inc(status=error.status or 'connection')
+        return delay
+
+    def _end_trial(self, trial):
+        if trial:
+            self.breaker.release_trial()
+
+    async def _acall(self, method, payload, stream=False, have_token=False):
+        """
+        Runs one logical call with rate limiting, retries and the circuit breaker,
+        waiting for tokens and backoff without blocking the event loop.
+        `have_token` means the caller already took a rate-limit token for the first attempt.
+        """
+        unhealthy = False
+        for attempt in range(self.max_retries + 1):
+            trial, needs_token = self._before_attempt(attempt, have_token)
+            try:
+                if needs_token and not await self.bucket.aacquire():
+                    raise RateLimitExceeded("Timed out waiting for the LLM rate limiter")
+                response = await self._apost(method, payload, stream=stream)
+            except RetryableError as e:
+                unhealthy = unhealthy or e.status != 429
+                await asyncio.sleep(self._retry_delay(e, attempt, trial, unhealthy))
+                continue
+            except RateLimitExceeded:
+                self._end_trial(trial)
+                raise
+            except LLMError:
+                self.breaker.record_success()  # The API answered; the request itself was bad.
+                raise
+            except BaseException:
+                # Cancelled (client gone, hedge lost) or an unexpected error: no verdict on the API.
+                self._end_trial(trial)
+                raise
+            self.breaker.record_success()
+            return response
+        raise LLMError("LLM call failed")
+
+    async def _agenerate_once(self, payload, have_token=False):
+        response = await self._acall('generateContent', payload, have_token=have_token)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise LLMError(f"LLM API returned invalid JSON: {e}") from e
+
+    async def agenerate(self, payload):
+        """
+        Calls generateContent and returns the decoded JSON response. A slow call
+        is hedged with a second identical one; the first to succeed wins and
+        the other is cancelled.
+
+        Raises:
+            LLMError: If the call failed (including CircuitOpenError / RateLimitExceeded).
+        """
+        primary = asyncio.ensure_future(self._agenerate_once(payload))
+        if not self.hedge_after:
+            return await primary
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        except BaseException:
+            # Unlike awaiting the task, wait() does not pass the caller's cancellation on.
+            primary.cancel()
+            raise
+        if done:
+            return primary.result()
+        # Only hedge with spare capacity; a hedge must never wait for the rate limiter.
+        if self.breaker.state != CircuitBreaker.CLOSED or not self.bucket.try_acquire():
+            return await primary
+        print(f"LLM call still running after {self.hedge_after}s; sending a hedged request.")
+        LLM_HEDGES.inc()
+        tasks = {primary, asyncio.ensure_future(self._agenerate_once(payload, True))}
+        error = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    return await next_done
+                except LLMError as e:
+                    error = e
+        finally:
+            for task in tasks:
+                task.cancel()
+        raise error
+
+    async def astream(self, payload):
+        """
+        Calls streamGenerateContent and yields each decoded SSE chunk. Retries
+        only happen before the first byte arrives, so no chunk is ever repeated.
+
+        Raises:
+            LLMError: If the call failed.
+        """
+        import httpx
+
+        response = await self._acall('streamGenerateContent', payload, stream=True)
+        try:
+            async for line in response.aiter_lines():
+                if line and line.startswith('data:'):
+                    yield json.loads(line[len('data:'):])
+        except (httpx.HTTPError, ValueError) as e:
+            raise LLMError(f"LLM stream was interrupted: {e}") from e
+        finally:
+            await response.aclose()
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def _collect_breaker_state():
+    if _gateway is not None:
+        LLM_BREAKER_OPEN.set(int(_gateway.breaker.state == CircuitBreaker.OPEN))
+
+
+registry.add_collector(_collect_breaker_state)
+
+
+def get_llm_gateway(api_key=None, model=None):
+    """Returns the process-wide GeminiGateway, creating it on first use."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = GeminiGateway(api_key=api_key, model=model)
+    return _gateway
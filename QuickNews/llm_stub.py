@@ -0,0 +1,143 @@
+"""
+A local stand-in for the Gemini REST API.
+
+StubGeminiServer answers generateContent and streamGenerateContent (SSE)
+requests on 127.0.0.1 so the gateway's retries, rate limiting, circuit breaker
+and hedging can be exercised offline. Point the app at it with
+QUICKNEWS_GEMINI_BASE_URL=http://127.0.0.1:<port>/v1beta, or run it with
+`manage.py run_gemini_stub`.
+
+By default every request is answered with `answer` after `delay` seconds
+(simulated model latency, e.g. for load tests). Tests can queue scripted
+replies with `enqueue(status=..., delay=..., headers=..., answer=...)`; each
+request consumes the next one. `requests` records every prompt received.
+"""
+import json
+import re
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PATH_RE = re.compile(r'^/v1beta/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        match = _PATH_RE.match(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not match:
+            return self._send_json(404, {'error': {'code': 404, 'message': 'Not found'}})
+
+        try:
+            prompt = json.loads(body)['contents'][0]['parts'][0]['text']
+        except (ValueError, KeyError, IndexError):
+            return self._send_json(400, {'error': {'code': 400, 'message': 'Invalid payload'}})
+        reply = stub.next_reply()
+        stub.record(prompt)
+
+        if (delay := reply.get('delay', stub.delay)):
+            time.sleep(delay)
+        status = reply.get('status', 200)
+        if status != 200:
+            return self._send_json(status, {'error': {'code': status, 'message': 'Scripted failure'}},
+                                   reply.get('headers'))
+
+        answer = reply.get('answer', stub.answer)
+        if match.group('method') == 'streamGenerateContent':
+            return self._send_stream(answer)
+        self._send_json(200, {'candidates': [{'content': {'parts': [{'text': answer}], 'role': 'model'}}]})
+
+    def _send_json(self, status, data, headers=None):
+        payload = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_stream(self, answer):
+        words = answer.split(' ')
+        chunks = [' '.join(words[i:i + 3]) + (' ' if i + 3 < len(words) else '') for i in range(0, len(words), 3)]
+        payload = b''.join(
+            b'data: ' + json.dumps({'candidates': [{'content': {'parts': [{'text': chunk}]}}]}).encode('utf-8') + b'\r\n\r\n'
+            for chunk in chunks)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open many connections at once; the default backlog of 5 would reset them.
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Hedge losers and cancelled calls hang up before their reply is written.
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class StubGeminiServer:
+    """A threaded HTTP server imitating the Gemini API. Use as a context manager or call start()/stop()."""
+
+    def __init__(self, host='127.0.0.1', port=0, answer='Stub answer.', delay=0):
+        self.answer = answer
+        self.delay = delay
+        self.requests = []
+        self._replies = deque()
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1beta"
+
+    def enqueue(self, status=200, delay=0, headers=None, answer=None):
+        """Scripts the reply to the next unanswered request."""
+        reply = {'status': status, 'delay': delay, 'headers': headers}
+        if answer is not None:
+            reply['answer'] = answer
+        with self._lock:
+            self._replies.append(reply)
+
+    def next_reply(self):
+        with self._lock:
+            return self._replies.popleft() if self._replies else {}
+
+    def record(self, prompt):
+        with self._lock:
+            self.requests.append(prompt)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='gemini-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
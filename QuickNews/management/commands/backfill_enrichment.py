@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from QuickNews.enrichment import ENRICH_BATCH_SIZE, ENRICH_PROCESSES, backfill_enrichment, pending_enrichment
+
+
+class Command(BaseCommand):
+    help = "Computes sentiment, keyword, word-count and fingerprint enrichment for stored articles that lack it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=ENRICH_BATCH_SIZE, help="Articles per batch.")
+        parser.add_argument('--processes', type=int, default=ENRICH_PROCESSES,
+                            help="Worker processes computing the features (0 runs inline).")
+        parser.add_argument('--refetch', action='store_true',
+                            help="Download each page again and use its full text instead of the stored summary.")
+        parser.add_argument('--force', action='store_true', help="Recompute articles that are already enriched.")
+        parser.add_argument('--limit', type=int, help="Stop after this many articles.")
+
+    def handle(self, *args, **options):
+        total = pending_enrichment(options['force']).count()
+        if options['limit'] is not None:
+            total = min(total, options['limit'])
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Every article is already enriched."))
+            return
+
+        def progress(done, notes):
+            self.stdout.write(f"Enriched {done}/{total} article(s).")
+
+        done, notes = backfill_enrichment(batch_size=options['batch_size'], processes=options['processes'],
+                                          refetch=options['refetch'], force=options['force'],
+                                          limit=options['limit'], progress=progress)
+        for article_id, note in notes:
+            self.stdout.write(self.style.WARNING(f"Article {article_id}: {note}"))
+        self.stdout.write(self.style.SUCCESS(f"Enriched {done} article(s)."))
@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from QuickNews.benchmarks.search import SEARCH_PAGES_DIR, bench_search_pages, load_search_pages
+
+
+class Command(BaseCommand):
+    help = "Benchmarks DuckDuckGo result-link extraction (bs4 vs lxml) on saved result pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', default=str(SEARCH_PAGES_DIR), help="Directory of saved result pages (*.html).")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per extractor and page.")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        pages = load_search_pages(options['pages'])
+        if not pages:
+            raise CommandError(f"No result pages (*.html) in {options['pages']}.")
+        results = bench_search_pages(pages, repeat=max(1, options['repeat']))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.stdout.write(f"{'page':<32} {'links':>5} {'bs4 p50':>9} {'lxml p50':>9} {'speedup':>8}")
+            for name, result in results.items():
+                bs4_ms, lxml_ms = result['timings']['bs4']['p50_ms'], result['timings']['lxml']['p50_ms']
+                self.stdout.write(f"{name:<32} {result['links']:>5} {bs4_ms:>8.2f}ms {lxml_ms:>8.2f}ms "
+                                  f"{bs4_ms / max(lxml_ms, 1e-6):>7.1f}x")
+
+        mismatched = [name for name, result in results.items() if not result['identical']]
+        if mismatched:
+            raise CommandError(f"lxml and bs4 extracted different links on: {', '.join(mismatched)}.")
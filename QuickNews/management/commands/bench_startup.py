@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from QuickNews.benchmarks.runner import percentile
+from QuickNews.benchmarks.startup import measure_startup
+
+
+class Command(BaseCommand):
+    help = "Measures worker start-up import time in fresh interpreters and flags eagerly loaded heavy modules."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters to measure.")
+        parser.add_argument('--top', type=int, default=10, help="Costliest packages to list.")
+        parser.add_argument('--budget-ms', type=float, help="Fail when the median import time exceeds this.")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        runs = [measure_startup() for _ in range(max(1, options['repeat']))]
+        median = percentile([run['import_ms'] for run in runs], 50)
+        fastest = min(runs, key=lambda run: run['import_ms'])
+        heavy = sorted({name for run in runs for name in run['heavy_loaded']})
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'runs': len(runs),
+                'median_import_ms': median,
+                'min_import_ms': fastest['import_ms'],
+                'heavy_loaded': heavy,
+                'packages_ms': dict(list(fastest['packages_ms'].items())[:options['top']]),
+            }, indent=2))
+        else:
+            self.stdout.write(f"import time over {len(runs)} run(s): median {median:.1f} ms, "
+                              f"min {fastest['import_ms']:.1f} ms")
+            self.stdout.write(f"{'package':<24} {'self ms':>9}")
+            for name, ms in list(fastest['packages_ms'].items())[:options['top']]:
+                self.stdout.write(f"{name:<24} {ms:>9.1f}")
+            if heavy:
+                self.stdout.write(self.style.WARNING(f"Loaded at start-up: {', '.join(heavy)}"))
+
+        if heavy:
+            raise CommandError(f"Heavy modules imported at start-up: {', '.join(heavy)}.")
+        if options['budget_ms'] is not None and median > options['budget_ms']:
+            raise CommandError(f"Median import time {median:.1f} ms exceeds the {options['budget_ms']:.0f} ms budget.")
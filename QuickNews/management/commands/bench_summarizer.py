@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from QuickNews.benchmarks.corpus import load_cases
+from QuickNews.benchmarks.runner import (
+    STAGES, check_golden, golden_outputs, load_golden, run_benchmarks, save_golden,
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the summarization pipeline on the offline corpora and checks golden outputs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stage', action='append', choices=sorted(STAGES),
+                            help="Stage to benchmark (repeatable). Defaults to all stages.")
+        parser.add_argument('--case', action='append', help="Corpus case to run (repeatable). Defaults to all.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed repetitions per stage and case.")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+        parser.add_argument('--check-golden', action='store_true', help="Only verify outputs against golden.json.")
+        parser.add_argument('--update-golden', action='store_true', help="Regenerate golden.json from the reference.")
+
+    def handle(self, *args, **options):
+        cases = load_cases()
+        if options['case']:
+            cases = [case for case in cases if case['name'] in options['case']]
+            if not cases:
+                raise CommandError("No matching corpus cases.")
+
+        if options['update_golden']:
+            save_golden(golden_outputs(load_cases()))
+            self.stdout.write(self.style.SUCCESS("golden.json updated."))
+            return
+
+        if options['check_golden']:
+            failures, skipped = check_golden(cases, load_golden())
+            for message in skipped:
+                self.stdout.write(self.style.WARNING(f"SKIP {message}"))
+            if failures:
+                raise CommandError("Golden check failed:\n" + "\n".join(failures))
+            self.stdout.write(self.style.SUCCESS(f"Golden check passed for {len(cases)} case(s)."))
+            return
+
+        results = run_benchmarks(cases, stages=options['stage'], repeat=options['repeat'])
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        header = f"{'case':<18} {'stage':<20} {'words':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'docs/s':>9} {'peak KiB':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for r in results:
+            self.stdout.write(
+                f"{r['case']:<18} {r['stage']:<20} {r['words']:>7} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+                f"{r['p99_ms']:>9.2f} {r['docs_per_s']:>9.1f} {r['peak_kib']:>10.1f}"
+            )
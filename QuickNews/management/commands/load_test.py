@@ -0,0 +1,116 @@
+"""
+Load-tests running QuickNews servers, e.g. the WSGI deployment against the ASGI one.
+
+Typical comparison, one worker process each, with Gemini replaced by the local
+stub answering after two seconds:
+
+    python manage.py run_gemini_stub --delay 2
+    export QUICKNEWS_GEMINI_BASE_URL=http://127.0.0.1:8787/v1beta GEMINI_API_KEY=stub \
+           QUICKNEWS_LLM_CACHE_ENABLED=0 QUICKNEWS_LOCAL_SEARCH_ENABLED=0 \
+           QUICKNEWS_LLM_RATE=1000 QUICKNEWS_LLM_BURST=1000 QUICKNEWS_LLM_HEDGE_AFTER=0
+    gunicorn NewsAI.wsgi -b 127.0.0.1:8000 -w 1 --threads 8
+    uvicorn NewsAI.asgi:application --port 8001 --workers 1
+    python manage.py load_test --target wsgi=http://127.0.0.1:8000 \
+        --target asgi=http://127.0.0.1:8001 --concurrency 200 --requests 1000
+
+"{i}" in --body is replaced by the request number so queries are distinct and
+are not coalesced or answered from a cache. Without the rate settings above, the
+Gemini token bucket (5 requests/s by default) caps both servers alike.
+"""
+import asyncio
+import json
+import time
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+
+from QuickNews.benchmarks.runner import percentile
+
+
+async def run_load(base_url, path, method, body, requests, concurrency, timeout):
+    """Sends `requests` requests with at most `concurrency` in flight and returns latency statistics."""
+    latencies, statuses, errors = [], {}, 0
+    next_request, in_flight, peak = 0, 0, 0
+
+    async def worker(client):
+        nonlocal next_request, in_flight, peak, errors
+        while next_request < requests:
+            i, next_request = next_request, next_request + 1
+            content = body.replace('{i}', str(i)) if body else None
+            in_flight += 1
+            peak = max(peak, in_flight)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, content=content,
+                                                headers={'Content-Type': 'application/json'} if content else None)
+                await response.aread()
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                latencies.append(time.perf_counter() - started)
+            except httpx.HTTPError:
+                errors += 1
+            finally:
+                in_flight -= 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        'requests': requests,
+        'completed': len(latencies),
+        'errors': errors,
+        'statuses': statuses,
+        'peak_in_flight': peak,
+        'elapsed_s': elapsed,
+        'requests_per_s': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+        'p95_ms': percentile(latencies, 95) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 99) * 1000 if latencies else None,
+        'max_ms': max(latencies) * 1000 if latencies else None,
+    }
+
+
+class Command(BaseCommand):
+    help = "Load-tests one or more running deployments (e.g. WSGI vs ASGI) with concurrent requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True,
+                            help="NAME=BASE_URL of a running server (repeatable).")
+        parser.add_argument('--path', default='/process-article/', help="Endpoint to load.")
+        parser.add_argument('--method', default='POST')
+        parser.add_argument('--body', default='{"query": "load test question {i}"}',
+                            help="Request body; '{i}' becomes the request number. Empty for none.")
+        parser.add_argument('--requests', type=int, default=500, help="Requests per target.")
+        parser.add_argument('--concurrency', type=int, default=100, help="Requests in flight at once.")
+        parser.add_argument('--timeout', type=float, default=120)
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep or not url:
+                raise CommandError(f"Expected NAME=BASE_URL, got {target!r}.")
+            targets.append((name, url))
+
+        results = {}
+        for name, url in targets:
+            self.stdout.write(f"Loading {name} ({url}{options['path']}): {options['requests']} requests, "
+                              f"{options['concurrency']} concurrent...")
+            results[name] = asyncio.run(run_load(
+                url, options['path'], options['method'].upper(), options['body'],
+                options['requests'], options['concurrency'], options['timeout']))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        header = f"{'target':<10}{'ok':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak':>7}"
+        self.stdout.write(header)
+        for name, result in results.items():
+            p50, p95, p99 = (f"{result[key]:.0f}" if result[key] is not None else '-' for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+            ok = sum(count for status, count in result['statuses'].items() if status < 400)
+            self.stdout.write(f"{name:<10}{ok:>7}{result['errors'] + result['completed'] - ok:>8}"
+                              f"{result['requests_per_s']:>9.1f}{p50:>10}{p95:>10}{p99:>10}{result['peak_in_flight']:>7}")
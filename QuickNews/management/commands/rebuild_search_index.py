@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from QuickNews.search_index import SEARCH_INDEX_PATH, ArticleSearchIndex
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the local BM25 search index over stored summaries and saves a snapshot for fast start-up."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=SEARCH_INDEX_PATH, help="Snapshot file to write.")
+        parser.add_argument('--query', help="Run a test search against the rebuilt index.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = ArticleSearchIndex(snapshot_path=options['output'])
+        index.rebuild()
+        index.save_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(index.bm25)} article(s), {len(index.bm25.postings)} term(s) in "
+            f"{time.perf_counter() - started:.2f}s -> {options['output']}"))
+
+        if options['query']:
+            for article, score, coverage in index.search(options['query']):
+                self.stdout.write(f"{score:7.3f}  {coverage:4.0%}  [{article.id}] {article.title}")
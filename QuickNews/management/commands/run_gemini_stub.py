@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from QuickNews.llm_stub import StubGeminiServer
+
+
+class Command(BaseCommand):
+    help = "Runs a local stand-in for the Gemini API (point QUICKNEWS_GEMINI_BASE_URL at it)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8787)
+        parser.add_argument('--answer', default='Stub answer.', help="Text returned for every prompt.")
+        parser.add_argument('--delay', type=float, default=0, help="Seconds to wait before answering (model latency).")
+
+    def handle(self, *args, **options):
+        server = StubGeminiServer(port=options['port'], answer=options['answer'], delay=options['delay'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Gemini stub listening; run the app with QUICKNEWS_GEMINI_BASE_URL={server.base_url} "
+            f"and any GEMINI_API_KEY."))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from QuickNews.prefetch import (
+    PREFETCH_CONCURRENCY, PREFETCH_CONFIG, PREFETCH_DOMAIN_DELAY, PREFETCH_INTERVAL, PREFETCH_MAX_PER_SOURCE,
+    Prefetcher, load_prefetch_config,
+)
+
+
+class Command(BaseCommand):
+    help = "Summarizes new articles from feeds and seed queries ahead of demand, every --interval seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--config', default=PREFETCH_CONFIG, help="JSON file with 'feeds' and 'queries' lists.")
+        parser.add_argument('--feed', action='append', default=[],
+                            help="RSS/Atom feed URL, file:// URL or path (repeatable, added to the config).")
+        parser.add_argument('--query', action='append', default=[], help="Seed search query (repeatable).")
+        parser.add_argument('--interval', type=float, default=PREFETCH_INTERVAL, help="Seconds between passes.")
+        parser.add_argument('--concurrency', type=int, default=PREFETCH_CONCURRENCY, help="Articles in flight at once.")
+        parser.add_argument('--domain-delay', type=float, default=PREFETCH_DOMAIN_DELAY,
+                            help="Minimum seconds between two downloads from the same site.")
+        parser.add_argument('--max-per-source', type=int, default=PREFETCH_MAX_PER_SOURCE,
+                            help="Links taken from each feed or query per pass.")
+        parser.add_argument('--once', action='store_true', help="Run a single pass and exit.")
+
+    def handle(self, *args, **options):
+        config = load_prefetch_config(options['config'])
+        feeds = config['feeds'] + options['feed']
+        queries = config['queries'] + options['query']
+        if not feeds and not queries:
+            raise CommandError(f"Nothing to prefetch: add feeds or queries to {options['config']} or pass --feed/--query.")
+
+        prefetcher = Prefetcher(feeds, queries, concurrency=options['concurrency'],
+                                domain_delay=options['domain_delay'], max_per_source=options['max_per_source'])
+        self.stdout.write(f"Prefetching {len(feeds)} feed(s) and {len(queries)} query(ies)...")
+        try:
+            while True:
+                run = asyncio.run(prefetcher.run_once())
+                self.stdout.write(self.style.SUCCESS(
+                    f"Run {run.id}: {run.discovered} new link(s), {run.summarized} summarized, "
+                    f"{run.cached} already stored, {run.failed} failed."))
+                for error in filter(None, run.errors.splitlines()):
+                    self.stdout.write(self.style.WARNING(f"Could not read {error}"))
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping prefetch.")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from QuickNews.jobs import DomainRateLimiter, JOB_DOMAIN_INTERVAL, JOB_WORKERS, JobWorkerPool
+
+
+class Command(BaseCommand):
+    help = "Runs background summarization workers against the database job queue (no broker needed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=JOB_WORKERS, help="Jobs to run at the same time.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds between queue polls when idle.")
+        parser.add_argument('--domain-interval', type=float, default=JOB_DOMAIN_INTERVAL,
+                            help="Minimum seconds between jobs for the same domain.")
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is drained.")
+
+    def handle(self, *args, **options):
+        pool = JobWorkerPool(
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+            rate_limiter=DomainRateLimiter(options['domain_interval']),
+        )
+        self.stdout.write(f"Starting {options['concurrency']} summarization worker(s) as {pool.worker_id}...")
+        try:
+            processed = pool.run(once=options['once'])
+        except KeyboardInterrupt:
+            pool.stop()
+            self.stdout.write("Stopping workers.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)."))
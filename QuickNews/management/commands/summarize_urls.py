@@ -0,0 +1,40 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from QuickNews.batch import BATCH_CONCURRENCY, summarize_batch
+
+
+class Command(BaseCommand):
+    help = "Summarizes many article URLs in one batch (cache lookups in one query, misses in parallel)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', help="Article URLs. Use --file or stdin for long lists.")
+        parser.add_argument('--file', help="Read URLs from this file, one per line ('-' for stdin).")
+        parser.add_argument('--concurrency', type=int, default=BATCH_CONCURRENCY,
+                            help="Uncached URLs downloaded at once (the NLP pool runs their summaries).")
+        parser.add_argument('--json', action='store_true', help="Print per-URL results as JSON.")
+
+    def handle(self, *args, **options):
+        urls = list(options['urls'])
+        if options['file']:
+            stream = sys.stdin if options['file'] == '-' else open(options['file'], encoding='utf-8')
+            with stream:
+                urls.extend(line.strip() for line in stream if line.strip() and not line.startswith('#'))
+        if not urls:
+            raise CommandError("No URLs given.")
+
+        results = summarize_batch(urls, concurrency=options['concurrency'])
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2, ensure_ascii=False))
+            return
+
+        for result in results:
+            if result['success']:
+                status = 'cached' if result['from_cache'] else 'new'
+                self.stdout.write(f"[{status}] {result['url']} -> {result['data']['title']}")
+            else:
+                self.stdout.write(self.style.WARNING(f"[error] {result['url']}: {result['error']}"))
+        succeeded = sum(result['success'] for result in results)
+        self.stdout.write(self.style.SUCCESS(f"{succeeded}/{len(results)} URL(s) summarized."))
@@ -0,0 +1,47 @@
+"""
+Verifies the local NLP data and warms the NLP models, offline: the heavy
+modules are imported and the NLP pool's workers are started, which proves the
+models load in a spawned worker.
+
+Run it once when building a deployment image (and add --download there if the
+image may fetch the punkt data); the web workers themselves never download.
+Exits with an error when a resource is missing so a broken image fails early.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from QuickNews.warmup import check_nlp_data, warm_up
+
+
+class Command(BaseCommand):
+    help = "Checks the local NLTK data and pre-loads the NLP modules and models, without network access."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--download', action='store_true',
+                            help="Download missing NLTK packages (the only step that uses the network).")
+        parser.add_argument('--check-only', action='store_true', help="Only check the data, do not load the models.")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        resources = check_nlp_data(download=options['download'])
+        missing = [r for r in resources if not r['found']]
+        timings = None
+        if not missing and not options['check_only']:
+            timings = warm_up()
+
+        if options['json']:
+            self.stdout.write(json.dumps({'resources': resources, 'timings': timings}, indent=2))
+        else:
+            for r in resources:
+                status = self.style.SUCCESS('ok') if r['found'] else self.style.ERROR('MISSING')
+                self.stdout.write(f"{r['resource']:<36} {status}  {r['detail']}")
+            if timings:
+                for name, seconds in timings['imports'].items():
+                    self.stdout.write(f"import {name:<24} {seconds * 1000:>8.1f} ms")
+                self.stdout.write(f"{'start NLP pool':<31} {timings['models'] * 1000:>8.1f} ms")
+
+        if missing:
+            packages = ' '.join(sorted({r['package'] for r in missing}))
+            raise CommandError(f"Missing NLTK data; run `python manage.py warm_nlp --download` "
+                               f"or `python -m nltk.downloader {packages}`.")
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('QuickNews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('owner', models.CharField(max_length=200)),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='articlesummary',
+            name='url',
+            field=models.URLField(unique=True),
+        ),
+    ]
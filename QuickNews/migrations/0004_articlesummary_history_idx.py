@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('QuickNews', '0003_summaryjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='articlesummary',
+            index=models.Index(fields=['-created_at', '-id'], name='articlesummary_history_idx'),
+        ),
+    ]
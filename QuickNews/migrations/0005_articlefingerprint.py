@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('QuickNews', '0004_articlesummary_history_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_hash', models.CharField(max_length=64, unique=True)),
+                ('canonical_url', models.URLField(max_length=2000)),
+                ('simhash', models.BigIntegerField(blank=True, null=True)),
+                ('band0', models.PositiveSmallIntegerField(blank=True, db_index=True, null=True)),
+                ('band1', models.PositiveSmallIntegerField(blank=True, db_index=True, null=True)),
+                ('band2', models.PositiveSmallIntegerField(blank=True, db_index=True, null=True)),
+                ('band3', models.PositiveSmallIntegerField(blank=True, db_index=True, null=True)),
+                ('band4', models.PositiveSmallIntegerField(blank=True, db_index=True, null=True)),
+                ('band5', models.PositiveSmallIntegerField(blank=True, db_index=True, null=True)),
+                ('band6', models.PositiveSmallIntegerField(blank=True, db_index=True, null=True)),
+                ('band7', models.PositiveSmallIntegerField(blank=True, db_index=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprints', to='QuickNews.articlesummary')),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('QuickNews', '0005_articlefingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleEnrichment',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='enrichment', serialize=False, to='QuickNews.articlesummary')),
+                ('polarity', models.FloatField(db_index=True)),
+                ('subjectivity', models.FloatField(db_index=True)),
+                ('word_count', models.PositiveIntegerField(db_index=True)),
+                ('text_hash', models.CharField(db_index=True, max_length=64)),
+                ('simhash', models.BigIntegerField(blank=True, null=True)),
+                ('source', models.CharField(choices=[('text', 'Full text'), ('summary', 'Summary')], default='text', max_length=10)),
+                ('version', models.PositiveSmallIntegerField(default=1)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArticleKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(max_length=100)),
+                ('weight', models.FloatField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keywords', to='QuickNews.articlesummary')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['keyword', '-weight'], name='articlekeyword_lookup_idx')],
+                'constraints': [models.UniqueConstraint(fields=('article', 'keyword'), name='articlekeyword_unique')],
+            },
+        ),
+    ]
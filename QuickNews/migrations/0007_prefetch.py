@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('QuickNews', '0006_articleenrichment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrefetchRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('sources', models.PositiveIntegerField(default=0)),
+                ('discovered', models.PositiveIntegerField(default=0)),
+                ('summarized', models.PositiveIntegerField(default=0)),
+                ('cached', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('errors', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PrefetchItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=2000)),
+                ('url', models.URLField(max_length=2000)),
+                ('url_hash', models.CharField(db_index=True, max_length=64)),
+                ('outcome', models.CharField(choices=[('summarized', 'Summarized'), ('cached', 'Cached'), ('failed', 'Failed')], max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('article', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='QuickNews.articlesummary')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='QuickNews.prefetchrun')),
+            ],
+        ),
+    ]
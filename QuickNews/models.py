@@ -14,8 +14,10 @@ class ArticleSummary(models.Model):
     
     class Meta:
         ordering = ['-created_at']
-        
-    def save(self, *args, **kwargs):
+        # Serves the history sidebar's newest-first, cursor-paginated scans.
+        indexes = [models.Index(fields=['-created_at', '-id'], name='articlesummary_history_idx')]
+
+    def fill_short_title(self):
         # Generate short title for history display (max 4 words)
         if self.title and not self.short_title:
             words = self.title.split()
@@ -23,7 +25,152 @@ class ArticleSummary(models.Model):
                 self.short_title = ' '.join(words[:4]) + '...'
             else:
                 self.short_title = self.title
+
+    def save(self, *args, **kwargs):
+        self.fill_short_title()
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+class WorkLease(models.Model):
+    """Short-lived cross-worker lock used by single-flight request coalescing."""
+    key = models.CharField(max_length=64, unique=True)  # SHA-256 of the coalescing key
+    owner = models.CharField(max_length=200)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.key} ({self.owner})"
+
+
+class SummaryJob(models.Model):
+    """A queued request to summarize a URL in the background."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+
+    url = models.URLField(max_length=2000)
+    domain = models.CharField(max_length=255, blank=True)  # Used for per-domain rate limiting
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)  # Retries are scheduled with a backoff
+    locked_by = models.CharField(max_length=200, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    article = models.ForeignKey(ArticleSummary, null=True, blank=True, on_delete=models.SET_NULL, related_name='jobs')
+    from_cache = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"{self.url} ({self.status})"
+
+
+class ArticleFingerprint(models.Model):
+    """
+    A URL under which an article is known (its canonical form), plus a SimHash
+    of the article text. Several rows can point at one article: tracking-param,
+    AMP and mobile variants and syndicated copies all resolve to it.
+    """
+    article = models.ForeignKey(ArticleSummary, on_delete=models.CASCADE, related_name='fingerprints')
+    url_hash = models.CharField(max_length=64, unique=True)  # SHA-256 of canonical_url, indexable at any URL length
+    canonical_url = models.URLField(max_length=2000)
+    simhash = models.BigIntegerField(null=True, blank=True)  # Signed 64-bit form of the fingerprint
+    # The fingerprint split into eight 8-bit bands; near-duplicates share at least one.
+    band0 = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True)
+    band1 = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True)
+    band2 = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True)
+    band3 = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True)
+    band4 = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True)
+    band5 = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True)
+    band6 = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True)
+    band7 = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.canonical_url} -> {self.article_id}"
+
+
+class ArticleEnrichment(models.Model):
+    """
+    Numeric NLP features of an article, kept so analytics and re-ranking never
+    need the page again. Computed from the full text when the article is
+    summarized; rows stored before that (or without their text) are filled from
+    the summary by `manage.py backfill_enrichment`.
+    """
+    FULL_TEXT = 'text'
+    SUMMARY = 'summary'
+    SOURCE_CHOICES = [(FULL_TEXT, 'Full text'), (SUMMARY, 'Summary')]
+
+    article = models.OneToOneField(ArticleSummary, on_delete=models.CASCADE, primary_key=True, related_name='enrichment')
+    polarity = models.FloatField(db_index=True)  # TextBlob, -1.0 .. 1.0
+    subjectivity = models.FloatField(db_index=True)  # TextBlob, 0.0 .. 1.0
+    word_count = models.PositiveIntegerField(db_index=True)
+    text_hash = models.CharField(max_length=64, db_index=True)  # SHA-256 of the normalized words
+    simhash = models.BigIntegerField(null=True, blank=True)  # Signed 64-bit SimHash, as in ArticleFingerprint
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default=FULL_TEXT)
+    version = models.PositiveSmallIntegerField(default=1)  # Rows below ENRICHMENT_VERSION are recomputed
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.article_id} ({self.source}, polarity {self.polarity:.2f})"
+
+
+class ArticleKeyword(models.Model):
+    """One of an article's top keywords with its summarizer weight; indexed for keyword lookups."""
+    article = models.ForeignKey(ArticleSummary, on_delete=models.CASCADE, related_name='keywords')
+    keyword = models.CharField(max_length=100)
+    weight = models.FloatField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['article', 'keyword'], name='articlekeyword_unique')]
+        indexes = [models.Index(fields=['keyword', '-weight'], name='articlekeyword_lookup_idx')]
+
+    def __str__(self):
+        return f"{self.keyword} ({self.weight:.3f}) -> {self.article_id}"
+
+
+class PrefetchRun(models.Model):
+    """One pass of the prefetch crawler (`manage.py run_prefetch`) over its feeds and seed queries."""
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    sources = models.PositiveIntegerField(default=0)
+    discovered = models.PositiveIntegerField(default=0)  # New article URLs found in the sources
+    summarized = models.PositiveIntegerField(default=0)
+    cached = models.PositiveIntegerField(default=0)  # Already stored (or a variant of a stored article)
+    failed = models.PositiveIntegerField(default=0)
+    errors = models.TextField(blank=True)  # Sources that could not be read, one per line
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Prefetch run {self.id} at {self.started_at:%Y-%m-%d %H:%M} ({self.summarized} summarized)"
+
+
+class PrefetchItem(models.Model):
+    """An article URL the prefetch crawler warmed, and how that went."""
+    SUMMARIZED = 'summarized'
+    CACHED = 'cached'
+    FAILED = 'failed'
+    OUTCOME_CHOICES = [(SUMMARIZED, 'Summarized'), (CACHED, 'Cached'), (FAILED, 'Failed')]
+
+    run = models.ForeignKey(PrefetchRun, on_delete=models.CASCADE, related_name='items')
+    source = models.CharField(max_length=2000)  # Feed URL or path, or "query:<text>"
+    url = models.URLField(max_length=2000)
+    url_hash = models.CharField(max_length=64, db_index=True)  # SHA-256 of url, indexable at any URL length
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES)
+    article = models.ForeignKey(ArticleSummary, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    error = models.TextField(blank=True)
+    duration_ms = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.url} ({self.outcome})"
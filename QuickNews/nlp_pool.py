@@ -0,0 +1,225 @@
+"""
+A process pool for the CPU-bound NLP stages, pre-warmed by warmup.warm_up().
+
+newspaper's keyword/summary pass, TextBlob sentiment and NLTK sentence
+tokenization are pure Python, so under a threaded server they serialize on the
+GIL and tie up request threads. They run here instead, in worker processes that
+load punkt, the stopword lists and TextBlob's lexicon once at start-up.
+
+The pool accepts at most QUICKNEWS_NLP_MAX_PENDING tasks at a time. When it is
+full, callers wait up to QUICKNEWS_NLP_QUEUE_TIMEOUT seconds for a slot and then
+get NLPPoolBusy, so overload surfaces as a clear error instead of an unbounded
+backlog. QUICKNEWS_NLP_WORKERS=0 runs everything inline in the caller.
+
+Async callers use arun()/asummarize_in_pool(), which await the worker without
+holding a thread or blocking the event loop.
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+
+from .summarizer import keywords, split_words, summarize, summarize_text
+
+# --- Pool Configuration ---
+NLP_WORKERS = int(os.environ.get("QUICKNEWS_NLP_WORKERS", str(min(2, os.cpu_count() or 1))))
+NLP_MAX_PENDING = int(os.environ.get("QUICKNEWS_NLP_MAX_PENDING", str(max(1, NLP_WORKERS) * 4)))
+NLP_QUEUE_TIMEOUT = float(os.environ.get("QUICKNEWS_NLP_QUEUE_TIMEOUT", "10"))
+# Web servers are multi-threaded, and forking a threaded process is unsafe, so workers are spawned.
+NLP_START_METHOD = os.environ.get("QUICKNEWS_NLP_START_METHOD", "spawn")
+
+
+class NLPPoolBusy(Exception):
+    """Every slot in the NLP pool stayed taken for the whole queue timeout."""
+
+
+def warm_worker():
+    """Pool initializer: loads the NLP models once so the first task is not slow."""
+    import nltk
+    from newspaper import nlp
+    from textblob import TextBlob
+
+    nlp.load_stopwords('en')
+    try:
+        nltk.sent_tokenize("Warm up the tokenizer. It is loaded once per worker.")
+    except LookupError:
+        pass
+    TextBlob("warm up").sentiment
+
+
+def _ping():
+    """No-op task used to start a worker (and run its warm_worker initializer)."""
+    return os.getpid()
+
+
+def text_features(text, sentiment=None):
+    """
+    The numeric features stored as ArticleEnrichment. Safe to run inside a pool worker.
+
+    Args:
+        sentiment: TextBlob's sentiment of `text` when already computed.
+
+    Returns:
+        dict: 'polarity', 'subjectivity', 'word_count', 'keywords' (word -> weight,
+        best first) and 'text_hash'.
+    """
+    from textblob import TextBlob
+
+    if sentiment is None:
+        sentiment = TextBlob(text).sentiment
+    words = split_words(text)
+    return {
+        'polarity': sentiment.polarity,
+        'subjectivity': sentiment.subjectivity,
+        'word_count': len(words),
+        'keywords': keywords(text),
+        'text_hash': hashlib.sha256(' '.join(words).encode('utf-8')).hexdigest(),
+    }
+
+
+def analyze_article(title, text, max_sents=5, language='en'):
+    """
+    Summarizes an article, scores its sentiment and computes its text_features().
+    Runs inside a pool worker.
+
+    Returns:
+        dict: 'summary' (str), 'polarity' (float), 'features' (dict) and
+        per-step 'timings' (seconds).
+    """
+    from newspaper import nlp
+    from textblob import TextBlob
+
+    timings = {}
+    started = time.perf_counter()
+    # Same steps as newspaper's Article.nlp(), minus the unused keywords.
+    nlp.load_stopwords(language)
+    summary = '\n'.join(nlp.summarize(title=title, text=text, max_sents=max_sents))
+    timings['nlp'] = time.perf_counter() - started
+
+    # FIX: Fallback to custom summarizer if newspaper3k fails
+    if not summary or len(summary) < 50:
+        print("Newspaper3k summary was insufficient. Falling back to custom summarizer.")
+        started = time.perf_counter()
+        summary = " ".join(summarize(title=title, text=text, max_sents=7))
+        timings['summarize'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sentiment = TextBlob(text).sentiment
+    timings['sentiment'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    features = text_features(text, sentiment)
+    timings['features'] = time.perf_counter() - started
+    return {'summary': summary, 'polarity': sentiment.polarity, 'features': features, 'timings': timings}
+
+
+class NLPPool:
+    """ProcessPoolExecutor with bounded in-flight work and an inline mode (workers=0)."""
+
+    def __init__(self, workers=NLP_WORKERS, max_pending=NLP_MAX_PENDING, queue_timeout=NLP_QUEUE_TIMEOUT,
+                 start_method=NLP_START_METHOD):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        if workers > 0:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context(start_method), initializer=warm_worker)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queues `fn(*args, **kwargs)` on a worker. `fn` must be a picklable,
+        module-level function.
+
+        Raises:
+            NLPPoolBusy: If no slot frees up within the queue timeout.
+        """
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise NLPPoolBusy('The NLP workers are overloaded; please try again shortly.')
+        try:
+            if self._executor is None:
+                future = concurrent.futures.Future()
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+            else:
+                future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """Submits `fn` and waits for its result."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def arun(self, fn, *args, **kwargs):
+        """Async run(). Waiting for a slot (and inline mode's work) is offloaded from the event loop."""
+        from .async_utils import offload
+        future = await offload(self.submit, fn, *args, **kwargs)
+        return await asyncio.wrap_future(future)
+
+    def warm(self, timeout=None):
+        """
+        Starts every worker process, so it loads the NLP models before the first
+        real task arrives, and waits until they all answer.
+
+        Returns:
+            float: Seconds it took (0 in inline mode).
+        """
+        if self._executor is None:
+            return 0.0
+        started = time.perf_counter()
+        # Workers are spawned on demand, one per task submitted while none is idle.
+        futures = [self._executor.submit(_ping) for _ in range(self.workers)]
+        concurrent.futures.wait(futures, timeout=timeout)
+        return time.perf_counter() - started
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_nlp_pool = None
+_nlp_pool_lock = threading.Lock()
+
+
+def get_nlp_pool():
+    """Returns the process-wide NLPPool, starting its workers on first use."""
+    global _nlp_pool
+    if _nlp_pool is None:
+        with _nlp_pool_lock:
+            if _nlp_pool is None:
+                _nlp_pool = NLPPool()
+                atexit.register(_nlp_pool.shutdown)
+    return _nlp_pool
+
+
+def set_nlp_pool(pool):
+    """Replaces the process-wide pool (e.g. with NLPPool(workers=0) inside other worker processes)."""
+    global _nlp_pool
+    with _nlp_pool_lock:
+        _nlp_pool = pool
+
+
+def summarize_in_pool(title, text, max_sents=7):
+    """
+    The vectorized summarize() (streaming for very long texts), run on the NLP pool.
+    `text` may be a list of pages, so long contexts are never joined in the worker.
+    """
+    from .telemetry import span
+    with span('summarize'):
+        return get_nlp_pool().run(summarize_text, title, text, max_sents)
+
+
+async def asummarize_in_pool(title, text, max_sents=7):
+    """Async summarize_in_pool()."""
+    from .telemetry import span
+    with span('summarize'):
+        return await get_nlp_pool().arun(summarize_text, title, text, max_sents)
@@ -0,0 +1,266 @@
+"""
+Two-tier cache for raw pages fetched while scraping (DuckDuckGo result pages
+and article bodies).
+
+Entries are keyed by a normalized URL and bodies are stored content-addressed
+(by SHA-256), so syndicated pages that serve byte-identical HTML share storage.
+Each entry keeps the ETag / Last-Modified validators returned by the origin so a
+stale entry can be revalidated with a cheap conditional request instead of a
+full download.
+
+Tiers:
+- MemoryTier: an in-process LRU bounded by entry count and total bytes.
+- SqliteTier: an optional on-disk tier shared by all workers on the host.
+Any object with get/set/delete methods can be plugged in as an extra tier.
+"""
+import contextlib
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# --- Cache Configuration ---
+PAGE_CACHE_TTL = float(os.environ.get("QUICKNEWS_PAGE_CACHE_TTL", "900"))
+PAGE_CACHE_MAX_ENTRIES = int(os.environ.get("QUICKNEWS_PAGE_CACHE_MAX_ENTRIES", "512"))
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("QUICKNEWS_PAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Set QUICKNEWS_PAGE_CACHE_PATH to an empty string to run with the memory tier only.
+PAGE_CACHE_PATH = os.environ.get(
+    "QUICKNEWS_PAGE_CACHE_PATH",
+    str(Path(__file__).resolve().parent.parent / 'page_cache.sqlite3'),
+)
+PAGE_CACHE_DISK_MAX_ENTRIES = int(os.environ.get("QUICKNEWS_PAGE_CACHE_DISK_MAX_ENTRIES", "5000"))
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """
+    Normalizes a URL so trivially different spellings share one cache key:
+    lower-cased scheme and host, default ports and fragments dropped, query
+    parameters sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+def content_hash(body):
+    # Bodies are normally str, but undeclared-charset pages stay as raw bytes.
+    data = body if isinstance(body, bytes) else body.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+class CacheEntry:
+    """A cached page body plus the validators needed to revalidate it."""
+
+    __slots__ = ('url', 'body', 'etag', 'last_modified', 'fetched_at', 'digest', 'size')
+
+    def __init__(self, url, body, etag=None, last_modified=None, fetched_at=None, digest=None):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self.digest = digest or content_hash(body)
+        # Encoded size, which MemoryTier's byte budget counts; len(str) would undercount non-ASCII pages.
+        self.size = len(body) if isinstance(body, bytes) else len(body.encode('utf-8'))
+
+    def is_fresh(self, ttl=PAGE_CACHE_TTL):
+        return (time.time() - self.fetched_at) < ttl
+
+    def can_revalidate(self):
+        return bool(self.etag or self.last_modified)
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class MemoryTier:
+    """Thread-safe in-process LRU bounded by entry count and total body bytes."""
+
+    def __init__(self, max_entries=PAGE_CACHE_MAX_ENTRIES, max_bytes=PAGE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if (old := self._entries.pop(key, None)) is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def delete(self, key):
+        with self._lock:
+            if (old := self._entries.pop(key, None)) is not None:
+                self._bytes -= old.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqliteTier:
+    """
+    On-disk tier backed by a standalone SQLite file. URL keys point at bodies
+    stored once per content hash; least-recently-used keys are pruned past
+    `max_entries` and unreferenced bodies are removed with them.
+    """
+
+    def __init__(self, path=PAGE_CACHE_PATH, max_entries=PAGE_CACHE_DISK_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at);
+                CREATE TABLE IF NOT EXISTS bodies (
+                    digest TEXT PRIMARY KEY,
+                    body TEXT NOT NULL
+                );
+            """)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT p.url, b.body, p.etag, p.last_modified, p.fetched_at, p.digest "
+                    "FROM pages p JOIN bodies b ON b.digest = p.digest WHERE p.key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return CacheEntry(*row)
+        except sqlite3.Error as e:
+            print(f"Page cache read failed for {key}: {e}")
+            return None
+
+    def set(self, key, entry):
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute("INSERT OR IGNORE INTO bodies (digest, body) VALUES (?, ?)", (entry.digest, entry.body))
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages (key, url, digest, etag, last_modified, fetched_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, entry.url, entry.digest, entry.etag, entry.last_modified, entry.fetched_at, time.time()),
+                )
+                self._prune(conn)
+        except sqlite3.Error as e:
+            print(f"Page cache write failed for {key}: {e}")
+
+    def _prune(self, conn):
+        (count,) = conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+        if count <= self.max_entries:
+            return
+        conn.execute(
+            "DELETE FROM pages WHERE key IN (SELECT key FROM pages ORDER BY accessed_at LIMIT ?)",
+            (count - self.max_entries,),
+        )
+        conn.execute("DELETE FROM bodies WHERE digest NOT IN (SELECT digest FROM pages)")
+
+    def delete(self, key):
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+                conn.execute("DELETE FROM bodies WHERE digest NOT IN (SELECT digest FROM pages)")
+        except sqlite3.Error as e:
+            print(f"Page cache delete failed for {key}: {e}")
+
+
+class PageCache:
+    """Looks entries up tier by tier, promoting hits into the faster tiers."""
+
+    def __init__(self, tiers, ttl=PAGE_CACHE_TTL):
+        self.tiers = list(tiers)
+        self.ttl = ttl
+
+    def get(self, url):
+        key = normalize_url(url)
+        for depth, tier in enumerate(self.tiers):
+            if (entry := tier.get(key)) is not None:
+                for faster in self.tiers[:depth]:
+                    faster.set(key, entry)
+                return entry
+        return None
+
+    def set(self, url, entry):
+        key = normalize_url(url)
+        for tier in self.tiers:
+            tier.set(key, entry)
+
+    def delete(self, url):
+        key = normalize_url(url)
+        for tier in self.tiers:
+            tier.delete(key)
+
+    def is_fresh(self, entry):
+        return entry.is_fresh(self.ttl)
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    """Returns the process-wide PageCache built from the environment configuration."""
+    global _page_cache
+    if _page_cache is None:
+        with _page_cache_lock:
+            if _page_cache is None:
+                tiers = [MemoryTier()]
+                if PAGE_CACHE_PATH:
+                    try:
+                        tiers.append(SqliteTier(PAGE_CACHE_PATH))
+                    except sqlite3.Error as e:
+                        print(f"Disk page cache unavailable ({e}); using memory tier only.")
+                _page_cache = PageCache(tiers)
+    return _page_cache
@@ -0,0 +1,262 @@
+"""
+The URL summarization pipeline: download, parse, summarize, score sentiment
+and store an ArticleSummary.
+
+It is shared by the process_article view, the batch endpoint and the
+background job workers, so all of them produce identical rows.
+asummarize_url() is the async entry point used by the ASGI views: the download
+awaits the async fetch engine, parsing and NLP are offloaded, and the database
+steps run through sync_to_async.
+"""
+from urllib.parse import urlparse
+
+import requests
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+
+from .dedup import (canonicalize_url, find_by_url, find_near_duplicate, page_canonical_url,
+                    record_fingerprints, simhash)
+from .async_utils import offload
+from .fetcher import Deadline, SCRAPE_DEADLINE, get_async_fetch_engine, get_fetch_engine
+from .enrichment import store_enrichments
+from .models import ArticleEnrichment, ArticleSummary
+from .nlp_pool import NLPPoolBusy, analyze_article, get_nlp_pool
+from .telemetry import CACHE_LOOKUPS, record_span, span
+
+
+class PipelineError(Exception):
+    """A URL could not be summarized. The message is safe to show to users."""
+    retryable = False
+
+
+class DownloadError(PipelineError):
+    """The page could not be downloaded; usually transient, so worth retrying."""
+    retryable = True
+
+
+class ExtractionError(PipelineError):
+    """The page downloaded but had no readable article content."""
+
+
+class OverloadedError(PipelineError):
+    """The NLP workers had no free capacity; retrying later should succeed."""
+    retryable = True
+
+
+def get_website_name(url):
+    """Extracts a clean, readable website name from a URL."""
+    try:
+        parsed_url = urlparse(url)
+        domain = parsed_url.netloc
+        # Removes 'www.' from the domain for cleaner display
+        return domain[4:] if domain.startswith("www.") else domain
+    except:
+        return "Unknown Source"
+
+
+def article_data(article):
+    """Builds the JSON payload for an ArticleSummary row."""
+    return {
+        'title': article.title,
+        'authors': article.authors,
+        'publish_date': article.publish_date,
+        'summary': article.summary,
+        'top_image': article.top_image,
+        'sentiment': article.sentiment,
+        'url': article.url,
+    }
+
+
+def sentiment_label(polarity):
+    return 'Positive 🙂' if polarity > 0.05 else 'Negative ☹️' if polarity < -0.05 else 'Neutral 😐'
+
+
+def parse_article(url, html):
+    """
+    Parses downloaded HTML with newspaper.
+
+    Raises:
+        ExtractionError: If no readable title/text could be extracted.
+    """
+    from newspaper import Article
+
+    with span('parse'):
+        article = Article(url, fetch_images=False)
+        article.download(input_html=html)
+        article.parse()
+
+    if not article.title or not article.text:
+        raise ExtractionError('Could not extract readable content from the URL.')
+    return article
+
+
+def article_fields(url, article, analysis):
+    """The extract_article() result for a parsed article and its analyze_article() output."""
+    for stage, seconds in analysis['timings'].items():
+        record_span(stage, seconds)
+
+    return {
+        'title': article.title,
+        'authors': ', '.join(article.authors) if article.authors else get_website_name(url),
+        'publish_date': article.publish_date.strftime('%B %d, %Y') if article.publish_date else "N/A",
+        'summary': analysis['summary'],
+        'top_image': article.top_image,
+        'sentiment': sentiment_label(analysis['polarity']),
+        'url': url,
+        'canonical_url': page_canonical_url(url, article.canonical_link),
+        'simhash': simhash(article.text),
+        'features': analysis['features'],
+    }
+
+
+def extract_article(url, deadline=None):
+    """
+    Downloads and analyses one article without touching the database.
+
+    Returns:
+        dict: ArticleSummary field values for the article, plus its
+        'canonical_url' and text 'simhash' (see split_fingerprint) and its
+        text 'features' (see split_features).
+
+    Raises:
+        DownloadError: If the page could not be fetched.
+        ExtractionError: If no readable title/text could be extracted.
+    """
+    # Process with newspaper3k, downloading through the shared fetch engine
+    try:
+        with span('download'):
+            html = get_fetch_engine().fetch_html(url, timeout=7, deadline=deadline or Deadline(SCRAPE_DEADLINE))
+    except requests.RequestException as e:
+        print(f"Failed to download {url}: {e}")
+        raise DownloadError('Could not download the article from the URL.') from e
+    article = parse_article(url, html)
+
+    # Run NLP (summary + sentiment) on the pre-warmed process pool
+    try:
+        analysis = get_nlp_pool().run(analyze_article, article.title, article.text,
+                                      max_sents=article.config.MAX_SUMMARY_SENT)
+    except NLPPoolBusy as e:
+        raise OverloadedError(str(e)) from e
+    return article_fields(url, article, analysis)
+
+
+async def aextract_article(url, deadline=None):
+    """Async extract_article(); nothing in it blocks the event loop."""
+    try:
+        with span('download'):
+            html = await get_async_fetch_engine().fetch_html(
+                url, timeout=7, deadline=deadline or Deadline(SCRAPE_DEADLINE))
+    except requests.RequestException as e:
+        print(f"Failed to download {url}: {e}")
+        raise DownloadError('Could not download the article from the URL.') from e
+    article = await offload(parse_article, url, html)
+
+    try:
+        analysis = await get_nlp_pool().arun(analyze_article, article.title, article.text,
+                                             max_sents=article.config.MAX_SUMMARY_SENT)
+    except NLPPoolBusy as e:
+        raise OverloadedError(str(e)) from e
+    return article_fields(url, article, analysis)
+
+
+def split_features(fields):
+    """Separates extract_article() output into (the remaining fields, text features or None)."""
+    fields = dict(fields)
+    return fields, fields.pop('features', None)
+
+
+def split_fingerprint(fields):
+    """Separates extract_article() output into (model fields, canonical_url, simhash)."""
+    fields = dict(fields)
+    return fields, fields.pop('canonical_url', None), fields.pop('simhash', None)
+
+
+def save_article(fields):
+    """
+    Stores extracted article fields.
+
+    Returns:
+        tuple: (ArticleSummary, created). If another worker saved the same URL
+        first, its row is returned with created=False instead of failing.
+    """
+    db_article = ArticleSummary(**fields)
+    try:
+        with span('db_write'), transaction.atomic():
+            db_article.save()
+    except IntegrityError:
+        if (existing := ArticleSummary.objects.filter(url=fields['url']).first()):
+            return existing, False
+        raise
+    return db_article, True
+
+
+def find_url_variant(url):
+    """
+    Looks `url` up among the known spellings of stored articles.
+
+    Returns:
+        tuple: (ArticleSummary or None, the canonicalized `url`).
+    """
+    requested_canonical = canonicalize_url(url)
+    if (duplicate := find_by_url([url, requested_canonical])):
+        CACHE_LOOKUPS.inc(cache='article', result='canonical')
+        return duplicate, requested_canonical
+    CACHE_LOOKUPS.inc(cache='article', result='miss')
+    return None, requested_canonical
+
+
+def store_summary(url, requested_canonical, extracted):
+    """
+    Saves freshly extracted fields, unless the page turns out to duplicate a
+    stored article (by its rel=canonical or its text).
+
+    Returns:
+        tuple: (ArticleSummary, from_cache).
+    """
+    fields, features = split_features(extracted)
+    fields, page_canonical, fingerprint = split_fingerprint(fields)
+    if (duplicate := find_by_url([page_canonical]) or find_near_duplicate(fingerprint)):
+        print(f"{url} duplicates stored article {duplicate.id}; reusing its summary.")
+        CACHE_LOOKUPS.inc(cache='article', result='near_duplicate')
+        # Remember this spelling so the next request for it skips the download.
+        record_fingerprints(duplicate, [requested_canonical, page_canonical], fingerprint)
+        return duplicate, True
+
+    db_article, created = save_article(fields)
+    if created:
+        record_fingerprints(db_article, [requested_canonical, page_canonical], fingerprint)
+        if features is not None:
+            store_enrichments([(db_article.id, features, fingerprint, ArticleEnrichment.FULL_TEXT)])
+    return db_article, not created
+
+
+def summarize_url(url, deadline=None):
+    """
+    Returns the stored summary for `url`, creating it if needed. Variants of an
+    already summarized URL (tracking parameters, AMP, mobile hosts, the page's
+    rel=canonical) and near-duplicate copies of its text are served from the
+    existing summary instead of being summarized again.
+
+    Returns:
+        tuple: (ArticleSummary, from_cache).
+    """
+    # Check cache first
+    if (cached_article := ArticleSummary.objects.filter(url=url).first()):
+        CACHE_LOOKUPS.inc(cache='article', result='hit')
+        return cached_article, True
+    duplicate, requested_canonical = find_url_variant(url)
+    if duplicate is not None:
+        return duplicate, True
+    return store_summary(url, requested_canonical, extract_article(url, deadline=deadline))
+
+
+async def asummarize_url(url, deadline=None):
+    """Async summarize_url() for the ASGI views."""
+    if (cached_article := await ArticleSummary.objects.filter(url=url).afirst()):
+        CACHE_LOOKUPS.inc(cache='article', result='hit')
+        return cached_article, True
+    duplicate, requested_canonical = await sync_to_async(find_url_variant)(url)
+    if duplicate is not None:
+        return duplicate, True
+    extracted = await aextract_article(url, deadline=deadline)
+    return await sync_to_async(store_summary)(url, requested_canonical, extracted)
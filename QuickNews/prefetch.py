@@ -0,0 +1,223 @@
+"""
+Prefetch crawler: summarizes new articles from feeds and seed queries ahead of demand.
+
+`manage.py run_prefetch` runs it as a daemon. Each pass:
+- reads the configured RSS / Atom feeds (URLs, or local files for tests and
+  offline use) and runs the seed queries through the DuckDuckGo search used by
+  the views, collecting article links;
+- skips links warmed in an earlier run (and ones that failed recently);
+- summarizes the rest through the shared pipeline (asummarize_url), with at
+  most `concurrency` articles in flight and at least `domain_delay` seconds
+  between two downloads from the same site;
+- records the run and every link it tried in PrefetchRun / PrefetchItem.
+
+Feeds and queries come from a JSON file, {"feeds": [...], "queries": [...]},
+at QUICKNEWS_PREFETCH_CONFIG, and/or from the command line.
+"""
+import asyncio
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+from urllib.request import url2pathname
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from .async_utils import offload
+from .dedup import url_hash
+from .fetcher import get_domain, get_fetch_engine
+from .models import PrefetchItem, PrefetchRun
+from .pipeline import PipelineError, asummarize_url
+from .telemetry import registry
+
+# --- Prefetch Configuration ---
+PREFETCH_CONFIG = os.environ.get(
+    "QUICKNEWS_PREFETCH_CONFIG",
+    str(Path(__file__).resolve().parent.parent / 'prefetch.json'),
+)
+PREFETCH_INTERVAL = float(os.environ.get("QUICKNEWS_PREFETCH_INTERVAL", "900"))
+PREFETCH_CONCURRENCY = int(os.environ.get("QUICKNEWS_PREFETCH_CONCURRENCY", "4"))
+PREFETCH_DOMAIN_DELAY = float(os.environ.get("QUICKNEWS_PREFETCH_DOMAIN_DELAY", "5"))
+PREFETCH_MAX_PER_SOURCE = int(os.environ.get("QUICKNEWS_PREFETCH_MAX_PER_SOURCE", "20"))
+# Links that failed are tried again in later runs once this many seconds have passed.
+PREFETCH_RETRY_AFTER = float(os.environ.get("QUICKNEWS_PREFETCH_RETRY_AFTER", "86400"))
+
+PREFETCHED = registry.counter('quicknews_prefetch_total', 'Articles warmed by the prefetch crawler by outcome.', ['outcome'])
+
+
+def load_prefetch_config(path=PREFETCH_CONFIG):
+    """
+    Reads the feeds and seed queries to prefetch.
+
+    Returns:
+        dict: 'feeds' and 'queries' lists (empty when the file does not exist).
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        config = {}
+    return {'feeds': list(config.get('feeds', [])), 'queries': list(config.get('queries', []))}
+
+
+def read_feed(location):
+    """Returns the XML of a feed given as an http(s) URL, a file:// URL or a local path."""
+    parsed = urlparse(location)
+    if parsed.scheme in ('http', 'https'):
+        return get_fetch_engine().fetch_html(location, timeout=10)
+    path = url2pathname(parsed.path) if parsed.scheme == 'file' else location
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+def parse_feed(xml_text, base_url=None):
+    """
+    Extracts the article links of an RSS 2.0, RSS 1.0 (RDF) or Atom feed, in feed order.
+
+    Raises:
+        xml.etree.ElementTree.ParseError: If the feed is not well-formed XML.
+    """
+    links = []
+    for element in ET.fromstring(xml_text).iter():
+        if _local_name(element.tag) not in ('item', 'entry'):
+            continue
+        for child in element:
+            if _local_name(child.tag) != 'link':
+                continue
+            # Atom links carry the URL in href; only the "alternate" one is the article.
+            href = child.get('href') if child.get('href') is not None else (child.text or '').strip()
+            if href and child.get('rel', 'alternate') == 'alternate':
+                links.append(urljoin(base_url, href) if base_url else href)
+                break
+    return list(dict.fromkeys(link for link in links if urlparse(link).scheme in ('http', 'https')))
+
+
+class DomainPacer:
+    """Spaces out downloads from one domain by at least `delay` seconds. Waits instead of refusing."""
+
+    def __init__(self, delay=PREFETCH_DOMAIN_DELAY):
+        self.delay = delay
+        self._next_allowed = {}
+
+    async def wait(self, domain):
+        # Only ever used from one event loop, so reserving the next slot needs no lock.
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next_allowed.get(domain, now))
+        self._next_allowed[domain] = start + self.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+def interleave_domains(candidates):
+    """Reorders (source, url) pairs round-robin by domain, so slots are not all stuck pacing one site."""
+    by_domain = {}
+    for source, url in candidates:
+        by_domain.setdefault(get_domain(url), []).append((source, url))
+    queues = list(by_domain.values())
+    ordered = []
+    while queues:
+        ordered.extend(queue.pop(0) for queue in queues)
+        queues = [queue for queue in queues if queue]
+    return ordered
+
+
+def _already_warmed(urls, retry_after=PREFETCH_RETRY_AFTER):
+    """The subset of `urls` warmed before, or that failed less than `retry_after` seconds ago."""
+    hashes = {url_hash(url): url for url in urls}
+    recent_failure = timezone.now() - timedelta(seconds=retry_after)
+    warmed = set()
+    for digest, outcome, created_at in PrefetchItem.objects.filter(url_hash__in=hashes).values_list(
+            'url_hash', 'outcome', 'created_at'):
+        if outcome != PrefetchItem.FAILED or created_at >= recent_failure:
+            warmed.add(hashes[digest])
+    return warmed
+
+
+class Prefetcher:
+    """Runs prefetch passes over a fixed set of feeds and seed queries."""
+
+    def __init__(self, feeds=(), queries=(), concurrency=PREFETCH_CONCURRENCY, domain_delay=PREFETCH_DOMAIN_DELAY,
+                 max_per_source=PREFETCH_MAX_PER_SOURCE, retry_after=PREFETCH_RETRY_AFTER):
+        self.feeds = list(feeds)
+        self.queries = list(queries)
+        self.concurrency = concurrency
+        self.domain_delay = domain_delay
+        self.max_per_source = max_per_source
+        self.retry_after = retry_after
+
+    async def _discover(self, errors):
+        """(source, url) pairs from every feed and query; unreadable sources are noted in `errors`."""
+        from .views import find_result_urls
+
+        candidates = []
+        for feed in self.feeds:
+            try:
+                links = parse_feed(await offload(read_feed, feed), base_url=feed if '://' in feed else None)
+            except Exception as e:
+                errors.append(f"{feed}: {e}")
+                continue
+            candidates.extend((feed, link) for link in links[:self.max_per_source])
+        for query in self.queries:
+            try:
+                links = await find_result_urls(query, num_pages=self.max_per_source)
+            except Exception as e:
+                errors.append(f"query:{query}: {e}")
+                continue
+            candidates.extend((f"query:{query}", link) for link in links)
+        first_source = {}
+        for source, url in candidates:
+            first_source.setdefault(url, source)
+        return [(source, url) for url, source in first_source.items()]
+
+    async def _warm(self, source, url, slots, pacer):
+        async with slots:
+            await pacer.wait(get_domain(url))
+            started = time.perf_counter()
+            article, error = None, ''
+            try:
+                article, from_cache = await asummarize_url(url)
+                outcome = PrefetchItem.CACHED if from_cache else PrefetchItem.SUMMARIZED
+            except PipelineError as e:
+                outcome, error = PrefetchItem.FAILED, str(e)
+            except Exception as e:
+                outcome, error = PrefetchItem.FAILED, f'An unexpected error occurred: {e}'
+        PREFETCHED.inc(outcome=outcome)
+        print(f"Prefetch [{outcome}] {url}" + (f": {error}" if error else ""))
+        return PrefetchItem(source=source[:2000], url=url, url_hash=url_hash(url), outcome=outcome,
+                            article=article, error=error, duration_ms=round((time.perf_counter() - started) * 1000))
+
+    async def run_once(self):
+        """
+        One prefetch pass.
+
+        Returns:
+            PrefetchRun: The saved run log, with its items.
+        """
+        run = await PrefetchRun.objects.acreate(sources=len(self.feeds) + len(self.queries))
+        errors = []
+        candidates = await self._discover(errors)
+        warmed = await sync_to_async(_already_warmed)([url for _, url in candidates], self.retry_after)
+        candidates = interleave_domains([(source, url) for source, url in candidates if url not in warmed])
+
+        slots, pacer = asyncio.Semaphore(self.concurrency), DomainPacer(self.domain_delay)
+        items = await asyncio.gather(*(self._warm(source, url, slots, pacer) for source, url in candidates))
+        for item in items:
+            item.run = run
+        await PrefetchItem.objects.abulk_create(items)
+
+        run.discovered = len(candidates)
+        run.summarized = sum(item.outcome == PrefetchItem.SUMMARIZED for item in items)
+        run.cached = sum(item.outcome == PrefetchItem.CACHED for item in items)
+        run.failed = sum(item.outcome == PrefetchItem.FAILED for item in items)
+        run.errors = '\n'.join(errors)
+        run.finished_at = timezone.now()
+        await run.asave()
+        return run
@@ -0,0 +1,266 @@
+"""
+Pre-encoded, compressed JSON responses for article reads.
+
+- Every article payload is built by pipeline.article_data() and encoded once:
+  ArticleResponseCache keeps the compact JSON bytes, a strong ETag and the
+  gzip / brotli variants per article id (and per requested URL), so repeated
+  reads of a popular summary cost neither a database query nor a re-encode.
+- post_save / post_delete signals drop an article's entry in this process;
+  entries also expire after QUICKNEWS_ARTICLE_CACHE_TTL seconds so edits made
+  by other processes are picked up.
+- json_response() negotiates Content-Encoding (br, then gzip) from
+  Accept-Encoding, gives each encoding its own strong ETag and answers
+  If-None-Match with 304 Not Modified.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import ArticleSummary
+from .pipeline import article_data
+from .telemetry import CACHE_LOOKUPS
+
+# --- Response Configuration ---
+ARTICLE_CACHE_ENABLED = os.environ.get("QUICKNEWS_ARTICLE_CACHE_ENABLED", "1") == "1"
+ARTICLE_CACHE_TTL = float(os.environ.get("QUICKNEWS_ARTICLE_CACHE_TTL", "300"))
+ARTICLE_CACHE_MAX_ENTRIES = int(os.environ.get("QUICKNEWS_ARTICLE_CACHE_MAX_ENTRIES", "2048"))
+# Bodies smaller than this are sent uncompressed; the headers would cost more than they save.
+COMPRESS_MIN_BYTES = int(os.environ.get("QUICKNEWS_COMPRESS_MIN_BYTES", "512"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_brotli = None
+
+
+def _brotli_module():
+    """The brotli module, or False when it is not installed (it is optional)."""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            _brotli = False
+    return _brotli
+
+
+def encode_json(payload):
+    """Compact UTF-8 JSON, with the same type support as JsonResponse."""
+    return json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def choose_encoding(accept_encoding):
+    """
+    Picks the response Content-Encoding for an Accept-Encoding header.
+
+    Returns:
+        str: 'br', 'gzip' or 'identity'.
+    """
+    accepted = {}
+    for item in (accept_encoding or '').lower().split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding] = quality
+
+    def allowed(coding):
+        return accepted.get(coding, accepted.get('*', 0.0)) > 0
+
+    if allowed('br') and _brotli_module():
+        return 'br'
+    if allowed('gzip'):
+        return 'gzip'
+    return 'identity'
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return _brotli_module().compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+class EncodedBody:
+    """
+    One JSON body with its strong ETag and lazily compressed variants.
+
+    `digest` names the representation in ETags; it defaults to a hash of the body.
+    """
+
+    def __init__(self, body, digest=None):
+        self.body = body
+        self.digest = digest or hashlib.sha256(body).hexdigest()[:32]
+        self._variants = {'identity': body}
+        self._lock = threading.Lock()
+
+    def etag(self, encoding):
+        return f'"{self.digest}"' if encoding == 'identity' else f'"{self.digest}-{encoding}"'
+
+    def variant(self, encoding):
+        with self._lock:
+            if encoding not in self._variants:
+                self._variants[encoding] = compress(self.body, encoding)
+            return self._variants[encoding]
+
+
+def json_response(request, payload, status=200, conditional=False, last_modified=None):
+    """
+    A JSON response for `payload` (a dict or an EncodedBody), compressed as the client accepts.
+
+    Args:
+        conditional (bool): Send a strong ETag and answer a matching If-None-Match
+            (or If-Modified-Since, with `last_modified`) with 304.
+        last_modified (float): Unix timestamp for the Last-Modified header.
+    """
+    encoded = payload if isinstance(payload, EncodedBody) else EncodedBody(encode_json(payload))
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if len(encoded.body) < COMPRESS_MIN_BYTES:
+        encoding = 'identity'
+
+    etag = encoded.etag(encoding) if conditional else None
+    if conditional and status == 200:
+        if (not_modified := get_conditional_response(request, etag=etag, last_modified=last_modified)) is not None:
+            patch_vary_headers(not_modified, ['Accept-Encoding'])
+            return not_modified
+
+    response = HttpResponse(encoded.variant(encoding), status=status, content_type='application/json')
+    if encoding != 'identity':
+        response['Content-Encoding'] = encoding
+    if etag:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+class CachedArticle:
+    """An article's encoded payload and the response bodies built around it."""
+
+    def __init__(self, article_id, data):
+        self.article_id = article_id
+        self.data = data
+        self.stored_at = time.monotonic()
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def body(self, **envelope):
+        """
+        The EncodedBody of `{"success": true, **envelope, "data": <article>}`.
+
+        The article JSON is spliced in as bytes, so it is encoded once per article.
+        """
+        key = tuple(sorted(envelope.items()))
+        with self._lock:
+            if key not in self._bodies:
+                head = encode_json({'success': True, **envelope})[:-1]
+                self._bodies[key] = EncodedBody(head + b',"data":' + self.data + b'}')
+            return self._bodies[key]
+
+
+class ArticleResponseCache:
+    """Thread-safe LRU of CachedArticle by article id, with a secondary index by requested URL."""
+
+    def __init__(self, max_entries=ARTICLE_CACHE_MAX_ENTRIES, ttl=ARTICLE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._urls = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _fresh(self, article_id):
+        entry = self._entries.get(article_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at > self.ttl:
+            del self._entries[article_id]
+            return None
+        self._entries.move_to_end(article_id)
+        return entry
+
+    def get(self, article_id):
+        with self._lock:
+            entry = self._fresh(article_id)
+        CACHE_LOOKUPS.inc(cache='article_response', result='hit' if entry else 'miss')
+        return entry
+
+    def get_by_url(self, url):
+        with self._lock:
+            article_id = self._urls.get(url)
+            entry = self._fresh(article_id) if article_id is not None else None
+            if article_id is not None and entry is None:
+                del self._urls[url]
+        CACHE_LOOKUPS.inc(cache='article_response', result='hit' if entry else 'miss')
+        return entry
+
+    def put(self, article, url=None):
+        """Encodes `article` (an ArticleSummary), stores it and returns its CachedArticle."""
+        entry = CachedArticle(article.id, encode_json(article_data(article)))
+        with self._lock:
+            self._entries[article.id] = entry
+            self._entries.move_to_end(article.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            for key in {url, article.url} - {None}:
+                self._urls[key] = article.id
+                self._urls.move_to_end(key)
+            while len(self._urls) > self.max_entries * 2:
+                self._urls.popitem(last=False)
+        return entry
+
+    def invalidate(self, article_id):
+        with self._lock:
+            self._entries.pop(article_id, None)
+            for url in [url for url, cached_id in self._urls.items() if cached_id == article_id]:
+                del self._urls[url]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._urls.clear()
+
+
+_article_cache = None
+_article_cache_lock = threading.Lock()
+
+
+def get_article_cache():
+    """Returns the process-wide ArticleResponseCache, or None when disabled."""
+    global _article_cache
+    if not ARTICLE_CACHE_ENABLED:
+        return None
+    if _article_cache is None:
+        with _article_cache_lock:
+            if _article_cache is None:
+                _article_cache = ArticleResponseCache()
+    return _article_cache
+
+
+def cached_article(article, url=None):
+    """The CachedArticle for a freshly loaded `article`, stored for later reads when caching is enabled."""
+    cache = get_article_cache()
+    return cache.put(article, url=url) if cache else CachedArticle(article.id, encode_json(article_data(article)))
+
+
+@receiver(post_save, sender=ArticleSummary, dispatch_uid='quicknews_article_cache_save')
+@receiver(post_delete, sender=ArticleSummary, dispatch_uid='quicknews_article_cache_delete')
+def _invalidate_article(sender, instance, **kwargs):
+    if _article_cache is not None:
+        _article_cache.invalidate(instance.id)
@@ -0,0 +1,238 @@
+"""
+Local full-text search over stored article summaries.
+
+An in-process BM25 inverted index over each ArticleSummary's title and summary
+lets the query path answer from (or seed Gemini with) articles we have already
+summarized, without touching the network.
+
+- The index is built lazily on first search, from a snapshot file written by
+  `manage.py rebuild_search_index` when one exists, otherwise from the table.
+- post_save / post_delete signals keep it current for writes in this process.
+  Rows written by other processes (job workers, other web workers) are picked
+  up before each search with one `id > last_indexed_id` query, and rows they
+  deleted are dropped when a hit no longer loads from the database.
+"""
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ArticleSummary
+from .summarizer import stopwords
+
+# --- Search Configuration ---
+SEARCH_INDEX_PATH = os.environ.get(
+    "QUICKNEWS_SEARCH_INDEX_PATH",
+    str(Path(__file__).resolve().parent.parent / 'search_index.json'),
+)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Lower-cased word tokens without stopwords or single characters."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in stopwords]
+
+
+class BM25Index:
+    """
+    An incrementally updatable Okapi BM25 index. Documents are identified by
+    any hashable id and can be added, replaced and removed at any time.
+    """
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # term -> {doc_id: term frequency}
+        self.doc_terms = {}  # doc_id -> Counter of its terms
+        self.doc_lengths = {}
+        self.total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_terms
+
+    def add(self, doc_id, text=None, terms=None):
+        """Indexes `text` (or pre-counted `terms`) under `doc_id`, replacing any earlier version."""
+        terms = Counter(terms if terms is not None else tokenize(text))
+        with self._lock:
+            self.remove(doc_id)
+            self.doc_terms[doc_id] = terms
+            self.doc_lengths[doc_id] = sum(terms.values())
+            self.total_length += self.doc_lengths[doc_id]
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id):
+        with self._lock:
+            terms = self.doc_terms.pop(doc_id, None)
+            if terms is None:
+                return
+            self.total_length -= self.doc_lengths.pop(doc_id)
+            for term in terms:
+                docs = self.postings[term]
+                del docs[doc_id]
+                if not docs:
+                    del self.postings[term]
+
+    def idf(self, term):
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.doc_terms) - df + 0.5) / (df + 0.5))
+
+    def search(self, query, limit=10):
+        """
+        Ranks indexed documents against `query`.
+
+        Returns:
+            list: (doc_id, score, coverage) tuples, best first, where coverage is
+            the fraction of distinct query terms the document contains.
+        """
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return []
+        with self._lock:
+            if not self.doc_terms:
+                return []
+            avg_length = self.total_length / len(self.doc_terms)
+            scores, matched = {}, Counter()
+            for term in query_terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = self.idf(term)
+                for doc_id, tf in docs.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+                    matched[doc_id] += 1
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(doc_id, score, matched[doc_id] / len(query_terms)) for doc_id, score in best]
+
+
+def article_text(title, summary):
+    return f"{title}\n{summary}"
+
+
+class ArticleSearchIndex:
+    """The BM25 index over ArticleSummary rows, kept in step with the database."""
+
+    def __init__(self, snapshot_path=SEARCH_INDEX_PATH):
+        self.snapshot_path = snapshot_path
+        self.bm25 = BM25Index()
+        self.max_id = 0
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self):
+        if self.loaded:
+            return
+        with self._lock:
+            if not self.loaded:
+                if not (self.snapshot_path and self.load_snapshot()):
+                    self.catch_up()
+                self.loaded = True
+
+    def catch_up(self):
+        """Indexes rows created since the last indexed id (e.g. by other processes)."""
+        rows = ArticleSummary.objects.filter(id__gt=self.max_id).order_by('id').values_list('id', 'title', 'summary')
+        for article_id, title, summary in rows.iterator():
+            self.bm25.add(article_id, article_text(title, summary))
+            self.max_id = max(self.max_id, article_id)
+
+    def add_article(self, article):
+        self.bm25.add(article.id, article_text(article.title, article.summary))
+        self.max_id = max(self.max_id, article.id)
+
+    def remove_article(self, article_id):
+        self.bm25.remove(article_id)
+
+    def search(self, query, limit=5):
+        """
+        Returns:
+            list: (ArticleSummary, score, coverage) tuples, best first.
+        """
+        self.ensure_loaded()
+        self.catch_up()
+        hits = self.bm25.search(query, limit=limit)
+        articles = ArticleSummary.objects.in_bulk([doc_id for doc_id, _, _ in hits])
+        results = []
+        for doc_id, score, coverage in hits:
+            if doc_id in articles:
+                results.append((articles[doc_id], score, coverage))
+            else:
+                self.bm25.remove(doc_id)  # Deleted by another process
+        return results
+
+    def rebuild(self):
+        """Re-indexes the whole table from scratch."""
+        with self._lock:
+            self.bm25 = BM25Index()
+            self.max_id = 0
+            self.catch_up()
+            self.loaded = True
+
+    def save_snapshot(self, path=None):
+        path = Path(path or self.snapshot_path)
+        tmp_path = path.with_suffix('.tmp')
+        with self.bm25._lock:
+            data = {'max_id': self.max_id, 'docs': {str(doc_id): terms for doc_id, terms in self.bm25.doc_terms.items()}}
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def load_snapshot(self):
+        """Loads a saved snapshot and indexes anything newer. Returns False if there is none."""
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        for doc_id, terms in data['docs'].items():
+            self.bm25.add(int(doc_id), terms=terms)
+        self.max_id = data['max_id']
+        self.catch_up()
+        return True
+
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """Returns the process-wide ArticleSearchIndex (loaded on first search)."""
+    global _search_index
+    if _search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                _search_index = ArticleSearchIndex()
+    return _search_index
+
+
+def index_articles(articles):
+    """Adds rows written without signals (bulk_create) to a loaded index."""
+    if _search_index is not None and _search_index.loaded:
+        for article in articles:
+            _search_index.add_article(article)
+
+
+@receiver(post_save, sender=ArticleSummary, dispatch_uid='quicknews_search_index_save')
+def _index_saved_article(sender, instance, **kwargs):
+    # An index that is not loaded yet will read the row from the table anyway.
+    index_articles([instance])
+
+
+@receiver(post_delete, sender=ArticleSummary, dispatch_uid='quicknews_search_index_delete')
+def _unindex_deleted_article(sender, instance, **kwargs):
+    if _search_index is not None:
+        _search_index.remove_article(instance.id)
@@ -0,0 +1,156 @@
+"""
+DuckDuckGo search results: query normalization, fast link extraction and a
+query -> ranked URL cache.
+
+- Queries are normalized (Unicode NFKC, case-folded, whitespace collapsed)
+  before they become cache keys or search URLs, so "Climate  Summit" and
+  "climate summit" share one entry, and they are URL-encoded with quote_plus.
+- Result links are pulled from the HTML with one lxml XPath query instead of
+  building a BeautifulSoup tree with the pure-Python html.parser; see
+  `manage.py bench_search` for the comparison on saved result pages.
+  DuckDuckGo's /l/?uddg= redirect links are resolved to their targets.
+- The ranked links of each query are kept in a per-process LRU for
+  QUICKNEWS_SEARCH_CACHE_TTL seconds. Empty result lists (including blocked or
+  captcha pages) are never cached.
+"""
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from urllib.parse import parse_qs, quote_plus, urlsplit
+
+from .fetcher import get_async_fetch_engine
+from .telemetry import CACHE_LOOKUPS, span
+
+# --- Search Configuration ---
+SEARCH_URL = "https://html.duckduckgo.com/html/?q={}"
+SEARCH_CACHE_ENABLED = os.environ.get("QUICKNEWS_SEARCH_CACHE_ENABLED", "1") == "1"
+SEARCH_CACHE_TTL = float(os.environ.get("QUICKNEWS_SEARCH_CACHE_TTL", "600"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("QUICKNEWS_SEARCH_CACHE_MAX_ENTRIES", "1024"))
+# Links cached per query; callers ask for at most a few more than they scrape.
+SEARCH_MAX_RESULTS = 30
+
+_RESULT_URL_XPATH = "//*[contains(concat(' ', normalize-space(@class), ' '), ' result__url ')]/@href"
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_query(query):
+    """The canonical form of a search query, used for cache keys and search URLs."""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFKC', query or '').casefold()).strip()
+
+
+def search_url(query):
+    return SEARCH_URL.format(quote_plus(normalize_query(query)))
+
+
+def extract_result_hrefs(html):
+    """The href of every element with class "result__url", in page order (lxml)."""
+    import lxml.etree
+    import lxml.html
+
+    if not html or not html.strip():
+        return []
+    # lxml rejects str input that carries an XML encoding declaration, so parse bytes.
+    parser = lxml.html.HTMLParser(encoding='utf-8')
+    try:
+        root = lxml.html.document_fromstring(html.encode('utf-8'), parser=parser)
+    except (lxml.etree.ParserError, ValueError):
+        return []
+    return [str(href) for href in root.xpath(_RESULT_URL_XPATH)]
+
+
+def extract_result_hrefs_bs4(html):
+    """extract_result_hrefs() the way the views used to do it: the reference for tests and benchmarks."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    return [link.get('href') for link in soup.select('.result__url') if link.get('href') is not None]
+
+
+def resolve_result_href(href):
+    """The article URL behind a result link; DuckDuckGo redirect links carry it in `uddg`."""
+    if href.startswith('//'):
+        href = 'https:' + href
+    parts = urlsplit(href)
+    if parts.hostname and parts.hostname.endswith('duckduckgo.com') and parts.path.startswith('/l/'):
+        target = parse_qs(parts.query).get('uddg', [''])[0]
+        return target or None
+    return href
+
+
+def ranked_result_urls(html):
+    """The distinct http(s) result URLs of a result page, best first."""
+    urls = (resolve_result_href(href) for href in extract_result_hrefs(html))
+    return list(dict.fromkeys(url for url in urls if url and url.startswith('http')))[:SEARCH_MAX_RESULTS]
+
+
+class SearchResultsCache:
+    """Thread-safe LRU of normalized query -> (ranked URLs, stored_at)."""
+
+    def __init__(self, max_entries=SEARCH_CACHE_MAX_ENTRIES, ttl=SEARCH_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, query):
+        key = normalize_query(query)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and time.monotonic() - item[1] > self.ttl:
+                del self._entries[key]
+                item = None
+            if item is not None:
+                self._entries.move_to_end(key)
+        CACHE_LOOKUPS.inc(cache='search', result='hit' if item else 'miss')
+        return list(item[0]) if item else None
+
+    def set(self, query, urls):
+        if not urls:
+            return
+        key = normalize_query(query)
+        with self._lock:
+            self._entries[key] = (tuple(urls), time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    """Returns the process-wide SearchResultsCache, or None when disabled."""
+    global _search_cache
+    if not SEARCH_CACHE_ENABLED:
+        return None
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = SearchResultsCache()
+    return _search_cache
+
+
+async def search_result_urls(query, num_pages=3, deadline=None):
+    """
+    Up to `num_pages` ranked result URLs for `query`, from the cache or a DuckDuckGo search.
+    Raises requests.RequestException if the search page cannot be fetched.
+    """
+    cache = get_search_cache()
+    if cache is not None and (urls := cache.get(query)) is not None:
+        return urls[:num_pages]
+
+    with span('search'):
+        search_html = await get_async_fetch_engine().fetch_html(search_url(query), timeout=15, deadline=deadline)
+    with span('search_parse'):
+        urls = ranked_result_urls(search_html)
+    if cache is not None:
+        cache.set(query, urls)
+    return urls[:num_pages]
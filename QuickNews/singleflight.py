@@ -0,0 +1,142 @@
+"""
+Single-flight request coalescing.
+
+When many users submit the same URL or query at once, only the first request
+does the scraping / NLP / Gemini work; concurrent duplicates block until it
+finishes and then share its result.
+
+acoalesce() coalesces within one process, for the async views. Followers await
+the leader's result without holding a thread, including across the per-request
+event loops Django creates when async views are served over WSGI. With
+QUICKNEWS_SINGLEFLIGHT_DB_LEASE enabled, the leader additionally takes a
+short-lived WorkLease row in the database, so duplicates arriving on *other*
+workers wait for the lease to be released and then re-run their function,
+which by then normally finds the freshly cached result.
+"""
+import asyncio
+import concurrent.futures
+import hashlib
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import WorkLease
+
+SINGLEFLIGHT_DB_LEASE = os.environ.get("QUICKNEWS_SINGLEFLIGHT_DB_LEASE", "0") == "1"
+LEASE_TTL = float(os.environ.get("QUICKNEWS_SINGLEFLIGHT_LEASE_TTL", "90"))
+LEASE_POLL_INTERVAL = 0.25
+
+
+class _LeaderCancelled(Exception):
+    """Handed to followers when the leader was cancelled, so one of them takes over."""
+
+
+class AsyncSingleFlight:
+    """Runs at most one in-flight call per key; concurrent callers share its outcome."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    async def do(self, key, fn):
+        """
+        Awaits `fn()` unless a call for `key` is already in flight, in which case
+        this awaits that call's outcome instead. If that call's caller is
+        cancelled (e.g. its client disconnected), the waiting callers elect a
+        new leader rather than being cancelled with it.
+
+        Returns:
+            tuple: (result, shared) where shared is True if another caller did the work.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    # A thread-safe future, so followers on any event loop can await it.
+                    call = self._calls[key] = concurrent.futures.Future()
+            if leader:
+                break
+            try:
+                # Shielded: a cancelled follower must not cancel the shared future.
+                return await asyncio.shield(asyncio.wrap_future(call)), True
+            except _LeaderCancelled:
+                continue
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            # Unregister first, so woken followers find no stale call.
+            self._forget(key)
+            call.set_exception(_LeaderCancelled() if isinstance(e, asyncio.CancelledError) else e)
+            raise
+        self._forget(key)
+        call.set_result(result)
+        return result, False
+
+    def _forget(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
+
+
+def _lease_key(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _lease_owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def acquire_lease(key, ttl=LEASE_TTL):
+    """Tries to take the database lease for `key`. Returns the lease, or None if it is held elsewhere."""
+    lease_key = _lease_key(key)
+    now = timezone.now()
+    # Leases left behind by crashed workers are reclaimed once they expire.
+    WorkLease.objects.filter(key=lease_key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            return WorkLease.objects.create(key=lease_key, owner=_lease_owner(), expires_at=now + timedelta(seconds=ttl))
+    except IntegrityError:
+        return None
+
+
+def release_lease(lease):
+    WorkLease.objects.filter(pk=lease.pk, owner=lease.owner).delete()
+
+
+async def arun_with_lease(key, fn, ttl=LEASE_TTL):
+    """
+    Awaits `fn()` while holding the cross-worker lease for `key`. If another
+    worker holds it, waits (polling with asyncio.sleep) until that lease is
+    released or expires first.
+    """
+    deadline = time.monotonic() + ttl
+    while (lease := await sync_to_async(acquire_lease)(key, ttl)) is None and time.monotonic() < deadline:
+        await asyncio.sleep(LEASE_POLL_INTERVAL)
+    try:
+        return await fn()
+    finally:
+        if lease is not None:
+            await sync_to_async(release_lease)(lease)
+
+
+_async_flight = AsyncSingleFlight()
+
+
+async def acoalesce(key, fn):
+    """
+    Process-wide single-flight entry point used by the views for a coroutine
+    function `fn`, optionally backed by the cross-worker database lease.
+
+    Returns:
+        tuple: (result, shared) as returned by AsyncSingleFlight.do.
+    """
+    if SINGLEFLIGHT_DB_LEASE:
+        return await _async_flight.do(key, lambda: arun_with_lease(key, fn))
+    return await _async_flight.do(key, fn)
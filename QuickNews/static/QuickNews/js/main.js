@@ -85,15 +85,16 @@ document.addEventListener('DOMContentLoaded', function () {
             let endpoint;
             let payload;
 
+            // Questions are streamed as server-sent events so the answer renders as it arrives.
             if (isSearchActive) {
                 endpoint = '/search_with_context/';
-                payload = { query: messageText };
+                payload = { query: messageText, stream: true };
             } else if (isUrlInput) {
                 endpoint = '/process-article/';
                 payload = { url: messageText };
             } else {
                 endpoint = '/process-article/';
-                payload = { query: messageText };
+                payload = { query: messageText, stream: true };
             }
 
             const response = await fetch(endpoint, {
@@ -102,6 +103,11 @@ document.addEventListener('DOMContentLoaded', function () {
                 body: JSON.stringify(payload)
             });
 
+            if ((response.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+                await renderStream(response);
+                return;
+            }
+
             const result = await response.json();
             hideTypingIndicator();
 
@@ -127,6 +133,66 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     }
 
+    async function renderStream(response) {
+        // Reads server-sent events from the fetch() body and renders the answer incrementally.
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const statusLabel = document.querySelector('#typing-indicator span');
+        let buffer = '';
+        let answer = '';
+        let messageContent = null;
+
+        const handleEvent = (event, data) => {
+            if (event === 'progress') {
+                if (statusLabel) {
+                    statusLabel.textContent = data.stage === 'scrape'
+                        ? `Reading ${data.source} (${data.done}/${data.total})...`
+                        : data.message;
+                }
+            } else if (event === 'token') {
+                if (!messageContent) {
+                    hideTypingIndicator();
+                    messageContent = addStreamingMessage();
+                }
+                answer += data.text;
+                messageContent.innerHTML = formatContent(answer);
+                messagesContainer.scrollTop = messagesContainer.scrollHeight;
+            } else if (event === 'error') {
+                hideTypingIndicator();
+                addMessage(`❌ **Error:** ${data.error}`, 'assistant');
+            }
+        };
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                });
+                if (data) handleEvent(event, JSON.parse(data));
+            }
+        }
+        hideTypingIndicator();
+    }
+
+    function addStreamingMessage() {
+        const messageRow = document.createElement('div');
+        messageRow.className = 'w-full max-w-3xl mx-auto flex mb-8 justify-start';
+        const messageContent = document.createElement('div');
+        messageContent.className = 'text-gray-300 w-full message-content';
+        messageRow.appendChild(messageContent);
+        messagesContainer.appendChild(messageRow);
+        return messageContent;
+    }
+
     function addMessage(content, sender, useTypewriter = false) {
         const messageRow = document.createElement('div');
         messageRow.className = 'w-full max-w-3xl mx-auto flex mb-8';
@@ -241,27 +307,63 @@ document.addEventListener('DOMContentLoaded', function () {
     }
 
     // --- History Management ---
+    let historyEtag = null;
+
     async function loadHistory() {
         try {
-            const response = await fetch('/get-history/');
+            // Revalidate with the last ETag; a 304 means the sidebar is already up to date.
+            const headers = historyEtag ? { 'If-None-Match': historyEtag } : {};
+            const response = await fetch('/get-history/', { headers, cache: 'no-store' });
+            if (response.status === 304) return;
             const result = await response.json();
             if (!result.success) return;
 
+            historyEtag = response.headers.get('ETag');
             historyContainer.innerHTML = '';
-            const sections = { 'Today': result.data.today, 'Previous 7 Days': result.data.week, 'Older': result.data.older };
-            for (const [title, articles] of Object.entries(sections)) {
-                if (articles.length > 0) {
+            renderHistoryPage(result.data);
+        } catch (error) { console.error('Error loading history:', error); }
+    }
+
+    async function loadMoreHistory(cursor, button) {
+        try {
+            button.disabled = true;
+            const response = await fetch(`/get-history/?cursor=${encodeURIComponent(cursor)}`);
+            const result = await response.json();
+            if (!result.success) { button.disabled = false; return; }
+            button.remove();
+            renderHistoryPage(result.data);
+        } catch (error) {
+            button.disabled = false;
+            console.error('Error loading history:', error);
+        }
+    }
+
+    function renderHistoryPage(data) {
+        const sections = { 'Today': data.today, 'Previous 7 Days': data.week, 'Older': data.older };
+        for (const [title, articles] of Object.entries(sections)) {
+            if (articles.length > 0) {
+                // Later pages continue the section the previous page ended in.
+                let ul = historyContainer.querySelector(`ul[data-section="${title}"]`);
+                if (!ul) {
                     const titleDiv = document.createElement('div');
                     titleDiv.className = 'text-xs font-bold text-gray-500 uppercase tracking-wider mb-2 px-2 mt-4';
                     titleDiv.textContent = title;
                     historyContainer.appendChild(titleDiv);
-                    const ul = document.createElement('ul');
+                    ul = document.createElement('ul');
                     ul.className = 'space-y-1';
-                    articles.forEach(article => ul.appendChild(createHistoryItem(article)));
+                    ul.dataset.section = title;
                     historyContainer.appendChild(ul);
                 }
+                articles.forEach(article => ul.appendChild(createHistoryItem(article)));
             }
-        } catch (error) { console.error('Error loading history:', error); }
+        }
+        if (data.next_cursor) {
+            const moreButton = document.createElement('button');
+            moreButton.className = 'w-full text-xs text-gray-500 hover:text-gray-300 px-2 py-2 mt-2';
+            moreButton.textContent = 'Show more';
+            moreButton.addEventListener('click', () => loadMoreHistory(data.next_cursor, moreButton));
+            historyContainer.appendChild(moreButton);
+        }
     }
 
     function createHistoryItem(article) {
@@ -0,0 +1,405 @@
+"""
+Extractive summarizer used as the local fallback when Gemini is unavailable.
+
+The first half of this module is the original pure-Python implementation
+(score / sbs / dbs / title_score ...), kept unchanged as the reference. The
+second half is the engine actually used by the views: it tokenizes every
+sentence in one regex pass, maps words to integer token ids and computes the
+title, length, position, sbs and dbs features for all sentences at once with
+NumPy. It performs the same floating point operations in the same order as the
+reference, so the rankings (including tie-breaks) are identical.
+
+summarize_stream() gives the same result for text that arrives as chunks (for
+example scraped pages), in bounded memory: see its docstring.
+"""
+import functools
+import heapq
+import math
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+# ==============================================================================
+# --- ORIGINAL TEXT SUMMARIZATION LOGIC (REFERENCE IMPLEMENTATION) ---
+# ==============================================================================
+stopwords = set(['i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', "you're", "you've", "you'll", "you'd", 'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself', 'she', "she's", 'her', 'hers', 'herself', 'it', "it's", 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this', 'that', "that'll", 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against', 'between', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 'don', "don't", 'should', "should've", 'now'])
+ideal = 20.0
+
+def summarize_reference(title='', text='', max_sents=5):
+    """Original pure-Python summarizer, kept as the reference the fast engine must match."""
+    if not text or not title or max_sents <= 0: return []
+    sentences = split_sentences(text)
+    keys = keywords(text)
+    titleWords = split_words(title)
+    if not sentences or not keys or not titleWords: return []
+    ranks = score(sentences, titleWords, keys).most_common(max_sents)
+    # The sorted key now correctly uses summary[0] to sort by the (index, sentence) tuple
+    return [summary[0][1] for summary in sorted(ranks, key=lambda summary: summary[0])]
+
+def score(sentences, titleWords, keywords):
+    senSize = len(sentences)
+    ranks = Counter()
+    for i, s in enumerate(sentences):
+        sentence_words = split_words(s)
+        if not sentence_words: continue
+        titleFeature = title_score(titleWords, sentence_words)
+        sentenceLength = length_score(len(sentence_words))
+        sentencePosition = sentence_position(i + 1, senSize)
+        sbsFeature = sbs(sentence_words, keywords)
+        dbsFeature = dbs(sentence_words, keywords)
+        frequency = (sbsFeature + dbsFeature) / 2.0 * 10.0
+        totalScore = (titleFeature*1.5 + frequency*2.0 + sentenceLength*1.0 + sentencePosition*1.0)/4.0
+        ranks[(i, s)] = totalScore
+    return ranks
+
+def sbs(words, keywords):
+    score = 0.0
+    if not words: return 0
+    for word in words:
+        if word in keywords: score += keywords[word]
+    return (1.0 / math.fabs(len(words)) * score) / 10.0 if words else 0
+
+def dbs(words, keywords):
+    if not words: return 0
+    summ, first, second = 0, [], []
+    for i, word in enumerate(words):
+        if word in keywords:
+            score = keywords[word]
+            if not first: first = [i, score]
+            else:
+                second = first
+                first = [i, score]
+                dif = first[0] - second[0]
+                summ += (first[1] * second[1]) / (dif ** 2)
+    k = len(set(keywords.keys()).intersection(set(words))) + 1
+    return (1 / (k * (k + 1.0)) * summ)
+
+def split_words(text):
+    try:
+        text = re.sub(r'[^\w ]', '', text)
+        return [x.strip('.').lower() for x in text.split()]
+    except (TypeError, AttributeError):
+        return []
+
+def keywords(text):
+    text = split_words(text)
+    if not text: return {}
+    num_words = len(text)
+    text = [x for x in text if x not in stopwords]
+    freq = Counter(text)
+    min_size = min(10, len(freq))
+    keywords_sorted = sorted(freq.items(), key=lambda x: x[1], reverse=True)[:min_size]
+    keywords_dict = dict(keywords_sorted)
+    for k in keywords_dict:
+        articleScore = keywords_dict[k] * 1.0 / num_words
+        keywords_dict[k] = articleScore * 1.5 + 1
+    return keywords_dict
+
+def split_sentences(text):
+    import nltk  # deferred: importing nltk costs ~0.3s of worker start-up
+    try:
+        sentences = nltk.sent_tokenize(text)
+        return [s.replace('\n', ' ').strip() for s in sentences if len(s) > 15]
+    except:
+        return []
+
+def length_score(sentence_len):
+    return 1 - math.fabs(ideal - sentence_len) / ideal
+
+def title_score(title, sentence):
+    title = [x for x in title if x not in stopwords]
+    if not title: return 0
+    count = sum(1.0 for word in sentence if word not in stopwords and word in title)
+    return count / len(title)
+
+def sentence_position(i, size):
+    normalized = i * 1.0 / size
+    if 0 < normalized <= 0.1: return 0.17
+    elif 0.1 < normalized <= 0.2: return 0.23
+    elif 0.2 < normalized <= 0.3: return 0.14
+    elif 0.3 < normalized <= 0.4: return 0.08
+    elif 0.4 < normalized <= 0.5: return 0.05
+    elif 0.5 < normalized <= 0.6: return 0.04
+    elif 0.6 < normalized <= 0.7: return 0.06
+    elif 0.7 < normalized <= 0.8: return 0.04
+    elif 0.8 < normalized <= 0.9: return 0.15
+    else: return 0
+
+# ==============================================================================
+# --- VECTORIZED SUMMARIZATION ENGINE ---
+# ==============================================================================
+
+# Separator placed between sentences so they can be cleaned with one regex pass.
+# It is neither a word character nor whitespace (str.split() would swallow
+# \x1c-\x1f), and the reference cleaning regex removes it from sentences anyway.
+_SENTENCE_SEP = '\x00'
+_CLEAN_RE = re.compile(r'[^\w \x00]')
+_POSITION_BOUNDS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+_POSITION_SCORES = (0.17, 0.23, 0.14, 0.08, 0.05, 0.04, 0.06, 0.04, 0.15)
+
+
+def tokenize_sentences(sentences):
+    """
+    Tokenizes all sentences at once, producing the same words split_words would
+    for each sentence.
+
+    Returns:
+        tuple: (token_ids, sentence_of_token, lengths, vocab) where token_ids and
+        sentence_of_token are flat int arrays, lengths holds the word count of each
+        sentence and vocab maps word -> token id.
+    """
+    joined = _SENTENCE_SEP.join(s.replace(_SENTENCE_SEP, '') for s in sentences)
+    cleaned = _CLEAN_RE.sub('', joined).lower().replace(_SENTENCE_SEP, f' {_SENTENCE_SEP} ')
+    # Separators become standalone tokens, so one split() and one C-level map
+    # assign ids to every word of every sentence.
+    words = cleaned.split()
+    vocab = {word: i for i, word in enumerate(dict.fromkeys(words))}
+    ids = np.fromiter(map(vocab.__getitem__, words), dtype=np.int64, count=len(words))
+    sep_id = vocab.pop(_SENTENCE_SEP, -1)
+    is_sep = ids == sep_id
+    sentence_of_token = np.cumsum(is_sep)[~is_sep]
+    lengths = np.bincount(sentence_of_token, minlength=len(sentences))
+    return ids[~is_sep], sentence_of_token, lengths, vocab
+
+
+def position_scores(indices, total):
+    """Vectorized sentence_position for 0-based sentence indices."""
+    normalized = (indices + 1) * 1.0 / total
+    conditions = [normalized <= bound for bound in _POSITION_BOUNDS]
+    conditions[0] = (normalized > 0) & conditions[0]
+    return np.select(conditions, _POSITION_SCORES, default=0.0)
+
+
+def score_sentences(sentences, title_words, keys, start=0, total=None):
+    """
+    Scores `sentences` exactly as score() would, but for all of them at once.
+
+    Args:
+        sentences (list): Sentences to score.
+        title_words (list): split_words(title).
+        keys (dict): keywords(text) for the whole document.
+        start (int): Index of sentences[0] within the document.
+        total (int): Total sentence count of the document (defaults to len(sentences)).
+
+    Returns:
+        tuple: (scores, valid) float and bool arrays; sentences without any words
+        are not valid and must not be ranked, just as score() skips them.
+    """
+    n = len(sentences)
+    total = n if total is None else total
+    token_ids, sentence_of_token, lengths, vocab = tokenize_sentences(sentences)
+    valid = lengths > 0
+    safe_lengths = np.where(valid, lengths, 1)
+
+    # Per-token keyword weights; 0.0 for non-keywords leaves the sums unchanged.
+    key_weights = np.zeros(len(vocab) + 1)
+    is_key = np.zeros(len(vocab) + 1, dtype=bool)
+    for word, weight in keys.items():
+        if (token := vocab.get(word)) is not None:
+            key_weights[token] = weight
+            is_key[token] = True
+    token_weights = key_weights[token_ids]
+    token_is_key = is_key[token_ids]
+
+    # sbs: sum of keyword weights, normalized by sentence length.
+    sbs_sum = np.bincount(sentence_of_token, weights=token_weights, minlength=n)
+    sbs_scores = (1.0 / safe_lengths * sbs_sum) / 10.0
+
+    # dbs: products of consecutive keyword pairs over their squared distance,
+    # normalized by the number of distinct keywords in the sentence.
+    key_positions = np.flatnonzero(token_is_key)
+    key_sentences = sentence_of_token[key_positions]
+    same_sentence = key_sentences[1:] == key_sentences[:-1]
+    current, previous = key_positions[1:][same_sentence], key_positions[:-1][same_sentence]
+    pair_values = (token_weights[current] * token_weights[previous]) / ((current - previous) ** 2)
+    dbs_sum = np.bincount(sentence_of_token[current], weights=pair_values, minlength=n)
+    key_slot = np.zeros(len(vocab) + 1, dtype=np.int64)
+    key_slot[is_key] = np.arange(int(is_key.sum()))
+    present = np.zeros((n, max(len(keys), 1)), dtype=bool)
+    present[key_sentences, key_slot[token_ids[key_positions]]] = True
+    k = present.sum(axis=1) + 1
+    dbs_scores = 1 / (k * (k + 1.0)) * dbs_sum
+
+    # Title feature: how many sentence words appear in the stopword-free title.
+    title = [x for x in title_words if x not in stopwords]
+    if title:
+        in_title = np.zeros(len(vocab) + 1, dtype=bool)
+        in_title[[vocab[w] for w in set(title) if w in vocab]] = True
+        title_hits = np.bincount(sentence_of_token, weights=in_title[token_ids].astype(float), minlength=n)
+        title_scores = title_hits / len(title)
+    else:
+        title_scores = np.zeros(n)
+
+    length_scores = 1 - np.abs(ideal - lengths) / ideal
+    positions = position_scores(np.arange(start, start + n), total)
+
+    frequency = (sbs_scores + dbs_scores) / 2.0 * 10.0
+    scores = (title_scores*1.5 + frequency*2.0 + length_scores*1.0 + positions*1.0)/4.0
+    return scores, valid
+
+
+def rank_sentences(scores, valid, max_sents, start=0):
+    """
+    Returns the document indices of the `max_sents` best valid sentences in
+    ranking order, breaking ties by position like Counter.most_common does.
+    """
+    candidates = np.flatnonzero(valid)
+    order = np.argsort(-scores[candidates], kind='stable')[:max_sents]
+    return (candidates[order] + start).tolist()
+
+
+def summarize(title='', text='', max_sents=5):
+    """
+    Returns up to `max_sents` sentences of `text` in document order, ranked by
+    relevance to `title`. Drop-in, faster replacement for summarize_reference.
+    """
+    if not text or not title or max_sents <= 0: return []
+    sentences = split_sentences(text)
+    keys = keywords(text)
+    titleWords = split_words(title)
+    if not sentences or not keys or not titleWords: return []
+    scores, valid = score_sentences(sentences, titleWords, keys)
+    return [sentences[i] for i in sorted(rank_sentences(scores, valid, max_sents))]
+
+
+# ==============================================================================
+# --- STREAMING SUMMARIZATION ---
+# ==============================================================================
+
+# Texts longer than this are summarized by summarize_stream() in summarize_text().
+STREAM_MIN_CHARS = int(os.environ.get("QUICKNEWS_STREAM_SUMMARY_MIN_CHARS", "200000"))
+# Chunks are processed in slices of at most this many characters.
+STREAM_SLICE_CHARS = 20000
+_WORD_CLEAN_RE = re.compile(r'[^\w ]')
+
+
+@functools.lru_cache(maxsize=None)
+def _punkt(language='english'):
+    from nltk.tokenize.punkt import PunktTokenizer  # the model nltk.sent_tokenize uses (nltk >= 3.8.2)
+    return PunktTokenizer(language)
+
+
+def _slices(chunks):
+    """Yields `chunks` (a sequence, or a callable returning a fresh iterable) in bounded slices."""
+    for chunk in (chunks() if callable(chunks) else chunks):
+        for start in range(0, len(chunk), STREAM_SLICE_CHARS):
+            yield chunk[start:start + STREAM_SLICE_CHARS]
+
+
+def iter_words(chunks):
+    """Yields split_words(''.join(chunks)) one word at a time."""
+    pending = ''
+    for piece in _slices(chunks):
+        words = (pending + _WORD_CLEAN_RE.sub('', piece)).split(' ')
+        # The last word may continue in the next slice.
+        pending = words.pop()
+        for word in words:
+            if word:
+                yield word.lower()
+    if pending:
+        yield pending.lower()
+
+
+def iter_sentences(chunks):
+    """
+    Yields split_sentences(''.join(chunks)) one sentence at a time.
+
+    The last two sentences of each slice are re-tokenized together with the
+    next slice, so every boundary is decided with the same context it would
+    have in the joined text.
+    """
+    tokenizer = _punkt()
+    pending = ''
+    for piece in _slices(chunks):
+        pending += piece
+        spans = list(tokenizer.span_tokenize(pending))
+        for start, end in spans[:-2]:
+            if end - start > 15:
+                yield pending[start:end].replace('\n', ' ').strip()
+        if len(spans) > 2:
+            pending = pending[spans[-2][0]:]
+    for start, end in tokenizer.span_tokenize(pending):
+        if end - start > 15:
+            yield pending[start:end].replace('\n', ' ').strip()
+
+
+def stream_keywords(chunks):
+    """keywords(''.join(chunks)) from running word counts."""
+    num_words, freq = 0, Counter()
+    for word in iter_words(chunks):
+        num_words += 1
+        if word not in stopwords:
+            freq[word] += 1
+    keywords_sorted = sorted(freq.items(), key=lambda x: x[1], reverse=True)[:min(10, len(freq))]
+    return {word: count * 1.0 / num_words * 1.5 + 1 for word, count in keywords_sorted}
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def summarize_stream(title, chunks, max_sents=5, batch_size=256):
+    """
+    summarize(title, ''.join(chunks), max_sents) without ever holding the whole text.
+
+    Keyword weights and sentence positions depend on the entire text, so the
+    chunks are read twice: once for running word counts and the sentence total,
+    then again to score sentences in batches while keeping only a heap of the
+    `max_sents` best. Memory is bounded by the slice size, the vocabulary and
+    `max_sents` instead of growing with the input, at the cost of tokenizing
+    twice.
+
+    Args:
+        chunks: A sequence of strings, or a callable returning a fresh iterable
+            of them.
+
+    Raises:
+        TypeError: If `chunks` is a one-shot iterator such as a generator,
+            which could not be read twice.
+    """
+    if not callable(chunks) and iter(chunks) is chunks:
+        raise TypeError("summarize_stream() reads its chunks twice: pass a sequence, "
+                        "or a callable returning a fresh generator")
+    if not title or max_sents <= 0: return []
+    titleWords = split_words(title)
+    if not titleWords: return []
+    keys = stream_keywords(chunks)
+    try:
+        total = sum(1 for _ in iter_sentences(chunks))
+    except LookupError:
+        return []  # punkt data not installed, as in split_sentences
+    if not keys or not total: return []
+
+    best, start = [], 0  # min-heap of (score, -index, sentence): ties keep the earlier sentence
+    for batch in _batched(iter_sentences(chunks), batch_size):
+        scores, valid = score_sentences(batch, titleWords, keys, start=start, total=total)
+        for i in rank_sentences(scores, valid, max_sents):
+            item = (scores[i], -(start + i), batch[i])
+            if len(best) < max_sents:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+        start += len(batch)
+    return [sentence for _, _, sentence in sorted(best, key=lambda item: -item[1])]
+
+
+def summarize_text(title='', text='', max_sents=5):
+    """
+    summarize(), switching to summarize_stream() for very long texts.
+
+    `text` may also be a list of pages (e.g. scraped pages); they are joined
+    only when short enough for summarize(), and streamed otherwise.
+    """
+    pages = [text or ''] if isinstance(text, str) else (text or [])
+    if sum(len(page) for page in pages) > STREAM_MIN_CHARS:
+        return summarize_stream(title, pages, max_sents)
+    return summarize(title=title, text=''.join(pages).strip(), max_sents=max_sents)
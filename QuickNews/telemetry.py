@@ -0,0 +1,369 @@
+"""
+Request tracing, metrics and sampled profiling.
+
+- Every request gets an id (X-Request-ID, taken from the client when it is 1-64
+  letters, digits or dashes) and a trace. `span(name)` times a stage of the
+  work; spans are collected on the current request's trace, also from pool
+  threads started with `contextvars.copy_context()`, and observed in the
+  `quicknews_stage_seconds` histogram.
+- A small in-process metrics registry (counters, gauges, histograms) renders
+  the Prometheus text format served at /metrics.
+- TelemetryMiddleware logs one structured line per request, optionally adds a
+  Server-Timing header, and profiles a sample of requests with cProfile. Only
+  one profiler can run per thread, so sampling is skipped while one is active.
+  Streaming bodies are iterated inside the request's trace, and the request is
+  timed and logged when the stream closes (there is no Server-Timing header,
+  since headers go out first; the profile covers the view up to the response).
+"""
+import bisect
+import contextlib
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# --- Telemetry Configuration ---
+SERVER_TIMING = os.environ.get("QUICKNEWS_SERVER_TIMING", "1") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("QUICKNEWS_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.environ.get("QUICKNEWS_PROFILE_DIR", str(Path(__file__).resolve().parent.parent / 'profiles'))
+# Caps the label combinations per metric so per-domain labels cannot grow without bound.
+METRIC_MAX_SERIES = int(os.environ.get("QUICKNEWS_METRIC_MAX_SERIES", "500"))
+
+_REQUEST_ID_RE = re.compile(r'[A-Za-z0-9-]{1,64}')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+OVERFLOW_LABEL = '_other'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        if key not in self._series and len(self._series) >= METRIC_MAX_SERIES:
+            key = tuple(OVERFLOW_LABEL for _ in self.labelnames)
+        return key
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._series.get(tuple(str(labels.get(n, '')) for n in self.labelnames), 0)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._series[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        with self._lock:
+            key = self._key(labels)
+            counts, total = self._series.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._series[key] = (counts, total + value)
+
+    def _render_series(self, key, value):
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', le)])} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Holds the process's metrics. Collectors refresh gauges from other modules just before rendering."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def add_collector(self, fn):
+        with self._lock:
+            self._collectors.append(fn)
+
+    def render(self):
+        """The Prometheus text exposition of every metric."""
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                logger.warning("Metrics collector %s failed: %s", collector.__name__, e)
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for _, metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+# --- Shared metrics ---
+REQUESTS = registry.counter('quicknews_http_requests_total', 'HTTP requests by view and status.', ['view', 'status'])
+REQUEST_SECONDS = registry.histogram('quicknews_http_request_seconds', 'Request latency by view.', ['view'])
+STAGE_SECONDS = registry.histogram('quicknews_stage_seconds', 'Time spent per pipeline stage.', ['stage'])
+CACHE_LOOKUPS = registry.counter('quicknews_cache_lookups_total', 'Cache lookups by cache and result.', ['cache', 'result'])
+FALLBACKS = registry.counter('quicknews_fallbacks_total', 'Answers served by a fallback path.', ['path'])
+SCRAPES = registry.counter('quicknews_scrapes_total', 'Page scrapes by domain and outcome.', ['domain', 'outcome'])
+
+
+class Trace:
+    """The spans recorded while serving one request."""
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.spans = []  # (name, seconds, labels); list.append is thread-safe
+
+    def server_timing(self):
+        """Server-Timing header value: total duration and count per stage name."""
+        totals = {}
+        for name, seconds, _ in self.spans:
+            duration, count = totals.get(name, (0.0, 0))
+            totals[name] = (duration + seconds, count + 1)
+        return ', '.join(f'{name};dur={duration * 1000:.1f};desc="x{count}"'
+                         for name, (duration, count) in totals.items())
+
+
+_current_trace = contextvars.ContextVar('quicknews_trace', default=None)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def current_request_id():
+    trace = _current_trace.get()
+    return trace.request_id if trace is not None else None
+
+
+def record_span(name, seconds, **labels):
+    """Records a stage timing measured elsewhere (e.g. inside a worker process)."""
+    STAGE_SECONDS.observe(seconds, stage=name)
+    if (trace := _current_trace.get()) is not None:
+        trace.spans.append((name, seconds, labels))
+
+
+@contextlib.contextmanager
+def span(name, **labels):
+    """Times the enclosed block as stage `name` of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started, **labels)
+
+
+def run_in_context(fn):
+    """Wraps `fn` so it runs in a copy of the caller's context (for thread pools)."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+# Whether a request is being profiled on this thread (cProfile allows one active profiler per thread).
+_profiling = threading.local()
+
+
+class TelemetryMiddleware:
+    """
+    Assigns request ids, records request metrics and spans, and profiles sampled requests.
+    Works in both sync and async stacks, so async views keep running on the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        request_id = request.headers.get('X-Request-ID', '')
+        if not _REQUEST_ID_RE.fullmatch(request_id):
+            # Client ids go into log lines and profile file names.
+            request_id = uuid.uuid4().hex
+        trace = Trace(request_id)
+        request.request_id = request_id
+
+        profiler = None
+        sampled = (PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE) or (
+            settings.DEBUG and request.headers.get('X-Profile') == '1')
+        if sampled and not getattr(_profiling, 'active', False):
+            profiler = cProfile.Profile()
+            _profiling.active = True
+        return trace, _current_trace.set(trace), profiler
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        trace, token, profiler = self._start(request)
+        try:
+            response = profiler.runcall(self.get_response, request) if profiler else self.get_response(request)
+        finally:
+            if profiler is not None:
+                _profiling.active = False
+            _current_trace.reset(token)
+        return self._finish(request, response, trace, profiler)
+
+    async def __acall__(self, request):
+        trace, token, profiler = self._start(request)
+        # cProfile is per thread: under ASGI the profile also includes other requests
+        # interleaved on the event loop while this one awaits, and those are not sampled.
+        if profiler is not None:
+            profiler.enable()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _profiling.active = False
+            _current_trace.reset(token)
+        return self._finish(request, response, trace, profiler)
+
+    def _finish(self, request, response, trace, profiler):
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unmatched'
+        response['X-Request-ID'] = trace.request_id
+        if profiler is not None:
+            self._dump_profile(profiler, trace.request_id, view)
+        if response.streaming:
+            # The stages keep running while the body is sent, so the request is logged when it closes.
+            stream = self._atraced if response.is_async else self._traced
+            response.streaming_content = stream(response.streaming_content, request, response, trace, view)
+            return response
+
+        duration = time.perf_counter() - trace.started
+        if SERVER_TIMING:
+            timing = trace.server_timing()
+            response['Server-Timing'] = f'total;dur={duration * 1000:.1f}' + (f', {timing}' if timing else '')
+        self._record(request, response, trace, view)
+        return response
+
+    def _traced(self, content, request, response, trace, view):
+        try:
+            iterator = iter(content)
+            while True:
+                token = _current_trace.set(trace)
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    _current_trace.reset(token)
+                yield chunk
+        finally:
+            self._record(request, response, trace, view)
+
+    async def _atraced(self, content, request, response, trace, view):
+        try:
+            iterator = aiter(content)
+            while True:
+                token = _current_trace.set(trace)
+                try:
+                    chunk = await anext(iterator)
+                except StopAsyncIteration:
+                    return
+                finally:
+                    _current_trace.reset(token)
+                yield chunk
+        finally:
+            self._record(request, response, trace, view)
+
+    def _record(self, request, response, trace, view):
+        duration = time.perf_counter() - trace.started
+        REQUESTS.inc(view=view, status=response.status_code)
+        REQUEST_SECONDS.observe(duration, view=view)
+        logger.info(json.dumps({
+            'request_id': trace.request_id,
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'spans': [{'stage': name, 'ms': round(seconds * 1000, 1), **labels}
+                      for name, seconds, labels in trace.spans],
+        }))
+
+    def _dump_profile(self, profiler, request_id, view):
+        directory = Path(PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{view}-{request_id}.prof"
+        profiler.dump_stats(path)
+        logger.info("Wrote cProfile output for request %s to %s", request_id, path)
@@ -1,3 +1,1056 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib.util import find_spec
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import requests
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.utils import timezone
+from django.utils.http import http_date
+
+from . import views
+from .batch import summarize_batch
+from .benchmarks.corpus import load_cases
+from .benchmarks.runner import check_golden, load_golden
+from .benchmarks.search import load_search_pages
+from .benchmarks.startup import measure_startup, parse_importtime
+from .async_utils import offload
+from .context_builder import build_context
+from .dedup import canonicalize_url, page_canonical_url, simhash
+from .domain_health import DomainHealthRegistry, classify_page
+from .enrichment import backfill_enrichment
+from .fetcher import AsyncFetchEngine, Deadline, DeadlineExceeded, FetchEngine, Quorum, get_async_fetch_engine, get_domain
+from .jobs import DomainRateLimiter, claim_next_job, enqueue_summary_job, run_job
+from .llm_cache import AnswerCache, FileBackend, make_cache_key
+from .llm_gateway import CircuitBreaker, CircuitOpenError, GeminiGateway, LLMError
+from .llm_stub import StubGeminiServer
+from .models import ArticleEnrichment, ArticleSummary, PrefetchItem, SummaryJob
+from .nlp_pool import NLPPool, NLPPoolBusy, analyze_article, text_features
+from .page_cache import CacheEntry, MemoryTier, PageCache, SqliteTier
+from .pipeline import DownloadError, ExtractionError, summarize_url
+from .prefetch import DomainPacer, Prefetcher, parse_feed
+from .responses import choose_encoding, get_article_cache
+from .search_index import ArticleSearchIndex
+from .search_results import SearchResultsCache, extract_result_hrefs, extract_result_hrefs_bs4, ranked_result_urls, search_result_urls
+from .singleflight import AsyncSingleFlight, acquire_lease, release_lease
+from .summarizer import summarize, summarize_stream, summarize_text
+from .telemetry import TelemetryMiddleware, Trace, _current_trace, record_span, span
+from .warmup import check_nlp_data
+
+
+class AnswerCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = AnswerCache(FileBackend(self.tmp.name, max_entries=2), ttl=60)
+
+    def test_key_depends_on_model_prompt_and_context(self):
+        key = make_cache_key('m', 'prompt', 'ctx')
+        self.assertEqual(key, make_cache_key('m', 'prompt', 'ctx'))
+        self.assertNotEqual(key, make_cache_key('other', 'prompt', 'ctx'))
+        self.assertNotEqual(key, make_cache_key('m', 'prompt', 'other'))
+
+    def test_hits_misses_and_eviction(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', 'answer a')
+        self.assertEqual(self.cache.get('a'), 'answer a')
+        self.cache.set('b', 'answer b')
+        self.cache.set('c', 'answer c')
+        self.assertEqual(len(list(FileBackend(self.tmp.name).directory.glob('*.json'))), 2)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_expired_entries_miss(self):
+        self.cache.ttl = 0
+        self.cache.set('a', 'answer a')
+        self.assertIsNone(self.cache.get('a'))
+
+    async def test_get_llm_answer_reports_cache_hits(self):
+        with mock.patch.object(views, 'get_answer_cache', return_value=self.cache), \
+                mock.patch.object(views, 'call_gemini_api', return_value='fresh answer') as api:
+            self.assertEqual(await views.get_llm_answer('question'), ('fresh answer', False))
+            self.assertEqual(await views.get_llm_answer('question'), ('fresh answer', True))
+            api.assert_awaited_once()
+
+
+class SingleFlightTests(SimpleTestCase):
+    async def test_async_duplicates_share_one_call(self):
+        flight, calls = AsyncSingleFlight(), []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'result'
+
+        results = await asyncio.gather(flight.do('k', work), flight.do('k', work))
+        self.assertEqual(len(calls), 1)
+        self.assertCountEqual(results, [('result', False), ('result', True)])
+
+    async def test_followers_take_over_when_the_leader_is_cancelled(self):
+        flight, calls = AsyncSingleFlight(), []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'result'
+
+        leader = asyncio.ensure_future(flight.do('k', work))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.ensure_future(flight.do('k', work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(len(calls), 2)
+        self.assertCountEqual(results, [('result', False), ('result', True)])
+
+    async def test_a_cancelled_follower_does_not_cancel_the_others(self):
+        flight = AsyncSingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return 'result'
+
+        leader = asyncio.ensure_future(flight.do('k', work))
+        await asyncio.sleep(0.01)
+        quitter, follower = (asyncio.ensure_future(flight.do('k', work)) for _ in range(2))
+        await asyncio.sleep(0.01)
+        quitter.cancel()
+        self.assertEqual(await leader, ('result', False))
+        self.assertEqual(await follower, ('result', True))
+
+
+class WorkLeaseTests(TestCase):
+    def test_lease_is_exclusive_until_released(self):
+        lease = acquire_lease('url:https://example.com/a')
+        self.assertIsNotNone(lease)
+        self.assertIsNone(acquire_lease('url:https://example.com/a'))
+        release_lease(lease)
+        self.assertIsNotNone(acquire_lease('url:https://example.com/a'))
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+class StreamingSearchTests(SimpleTestCase):
+    async def test_globe_search_streams_progress_then_tokens(self):
+        pages = [('https://a.example/1', 'Page one text.'), ('https://b.example/2', '')]
+        with mock.patch.object(views, 'find_result_urls', return_value=['https://a.example/1', 'https://b.example/2']), \
+                mock.patch.object(views, 'iter_scraped_pages', return_value=_aiter(pages)), \
+                mock.patch.object(views, 'get_answer_cache', return_value=None), \
+                mock.patch.object(views, 'stream_gemini_api', return_value=_aiter(['Rivers ', 'rose.'])):
+            response = await self.async_client.post('/search_with_context/', {'query': 'flood', 'stream': True},
+                                                    content_type='application/json')
+            body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = [block.split('\n')[0] for block in body.strip().split('\n\n')]
+        self.assertEqual(events, ['event: progress'] * 4 + ['event: token'] * 2 + ['event: done'])
+        self.assertIn('"ok": false', body)
+
+
+class GoldenOutputTests(SimpleTestCase):
+    """The fast summarization pipeline must pick exactly the golden sentences."""
+
+    def test_pipeline_matches_golden_outputs(self):
+        failures, skipped = check_golden(load_cases(), load_golden())
+        self.assertEqual(failures, [])
+        if skipped:
+            self.skipTest("; ".join(skipped))
+
+
+class StreamingSummarizerTests(SimpleTestCase):
+    def test_pages_streamed_from_a_callable_match_summarize(self):
+        case = max(load_cases(), key=lambda case: len(case['text']))
+        pages = case['text'].split('\n\n')
+        chunks = lambda: (page + '\n\n' for page in pages)
+        with mock.patch('QuickNews.summarizer.STREAM_SLICE_CHARS', 1234):
+            streamed = summarize_stream(case['title'], chunks, max_sents=7)
+        self.assertEqual(streamed, summarize(case['title'], ''.join(chunks()), max_sents=7))
+        self.assertTrue(streamed)
+
+    def test_long_page_lists_are_streamed_without_joining(self):
+        case = max(load_cases(), key=lambda case: len(case['text']))
+        pages = [page + '\n\n' for page in case['text'].split('\n\n')]
+        with mock.patch('QuickNews.summarizer.STREAM_MIN_CHARS', 1000), \
+                mock.patch('QuickNews.summarizer.summarize_stream', wraps=summarize_stream) as stream:
+            summary = summarize_text(case['title'], pages, max_sents=7)
+        self.assertIs(stream.call_args.args[1], pages)
+        self.assertEqual(summary, summarize(case['title'], ''.join(pages).strip(), max_sents=7))
+
+    def test_missing_punkt_data_gives_an_empty_summary(self):
+        pages = ['The city transit budget grew again this year.']
+        with mock.patch('QuickNews.summarizer._punkt', side_effect=LookupError):
+            self.assertEqual(summarize_stream('City transit budget', pages), [])
+        with mock.patch('QuickNews.summarizer._punkt', side_effect=ImportError), self.assertRaises(ImportError):
+            summarize_stream('City transit budget', pages)
+
+    def test_one_shot_iterators_are_rejected(self):
+        with self.assertRaises(TypeError):
+            summarize_stream('City transit budget', (page for page in ['The city budget.', 'Transit fares.']))
+
+
+class SummaryJobTests(TestCase):
+    def setUp(self):
+        self.article = ArticleSummary.objects.create(
+            title='Stored', summary='Summary.', sentiment='Neutral 😐', url='https://news.example.com/a')
+
+    def test_job_lifecycle_and_result_endpoint(self):
+        response = self.client.post('/jobs/', {'url': 'https://news.example.com/new'}, content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job']['job_id']
+        self.assertEqual(self.client.get(f'/jobs/{job_id}/result/').status_code, 202)
+
+        job = claim_next_job('test-worker')
+        self.assertEqual((job.id, job.status, job.attempts), (job_id, SummaryJob.RUNNING, 1))
+        with mock.patch('QuickNews.jobs.summarize_url', return_value=(self.article, False)):
+            run_job(job)
+
+        result = self.client.get(f'/jobs/{job_id}/result/').json()
+        self.assertTrue(result['success'])
+        self.assertEqual(result['data']['title'], 'Stored')
+
+    def test_transient_failures_retry_and_permanent_failures_stop(self):
+        job = enqueue_summary_job('https://news.example.com/flaky', max_attempts=2)
+        self.assertEqual(enqueue_summary_job('https://news.example.com/flaky').id, job.id)
+        with mock.patch('QuickNews.jobs.summarize_url', side_effect=DownloadError('timeout')):
+            job = run_job(claim_next_job('test-worker'))
+        self.assertEqual(job.status, SummaryJob.QUEUED)
+        self.assertIsNone(claim_next_job('test-worker'))  # backing off
+
+        SummaryJob.objects.filter(id=job.id).update(run_after=job.created_at)
+        with mock.patch('QuickNews.jobs.summarize_url', side_effect=ExtractionError('no text')):
+            job = run_job(claim_next_job('test-worker'))
+        self.assertEqual((job.status, job.attempts), (SummaryJob.FAILED, 2))
+
+    def test_rate_limiter_spaces_out_a_domain(self):
+        limiter = DomainRateLimiter(min_interval=60)
+        self.assertTrue(limiter.try_acquire('a.example'))
+        self.assertFalse(limiter.try_acquire('a.example'))
+        self.assertTrue(limiter.try_acquire('b.example'))
+
+    def test_a_lost_claim_does_not_use_up_the_domain_slot(self):
+        limiter = DomainRateLimiter(min_interval=60)
+        job = enqueue_summary_job('https://a.example/story')
+        with mock.patch('django.db.models.query.QuerySet.update', return_value=0):  # another worker wins
+            self.assertIsNone(claim_next_job('test-worker', rate_limiter=limiter))
+        self.assertEqual(claim_next_job('test-worker', rate_limiter=limiter).id, job.id)
+        self.assertFalse(limiter.try_acquire('a.example'))
+
+
+class BatchSummaryTests(TestCase):
+    def test_batch_mixes_cached_new_and_failed_urls(self):
+        ArticleSummary.objects.create(title='Stored', summary='S.', sentiment='Neutral 😐', url='https://news.example.com/a')
+        fresh = {'title': 'A fresh story about rivers', 'authors': 'x', 'publish_date': 'N/A', 'summary': 'New.',
+                 'top_image': '', 'sentiment': 'Neutral 😐', 'url': 'https://news.example.com/b'}
+
+        async def extract(url, deadline=None):
+            if url.endswith('/c'):
+                raise DownloadError('Could not download the article from the URL.')
+            return dict(fresh)
+
+        urls = ['https://news.example.com/a', 'https://news.example.com/b', 'https://news.example.com/c', 'nope']
+        with mock.patch('QuickNews.batch.aextract_article', extract):
+            results = self.client.post('/process-articles/batch/', {'urls': urls},
+                                       content_type='application/json').json()['data']['results']
+
+        self.assertEqual([r['url'] for r in results], urls)
+        self.assertEqual([r['success'] for r in results], [True, True, False, False])
+        self.assertEqual([r.get('from_cache') for r in results[:2]], [True, False])
+        self.assertEqual(ArticleSummary.objects.get(url=fresh['url']).short_title, 'A fresh story about...')
+
+    def test_new_rows_store_their_full_text_enrichment(self):
+        text = 'Flood waters rose along the river as rain kept falling on the valley towns. ' * 5
+        fresh = {'title': 'River flood', 'authors': 'x', 'publish_date': 'N/A', 'summary': 'New.', 'top_image': '',
+                 'sentiment': 'Neutral 😐', 'url': 'https://news.example.com/flood', 'features': text_features(text)}
+        with mock.patch('QuickNews.batch.aextract_article', mock.AsyncMock(return_value=dict(fresh))):
+            summarize_batch([fresh['url']])
+        enrichment = ArticleSummary.objects.get(url=fresh['url']).enrichment
+        self.assertEqual((enrichment.source, enrichment.word_count), (ArticleEnrichment.FULL_TEXT, 70))
+        self.assertIn('flood', enrichment.article.keywords.values_list('keyword', flat=True))
+
+
+class EnrichmentBackfillTests(TestCase):
+    def test_backfill_enriches_pending_rows_from_their_summaries(self):
+        for i in range(5):
+            ArticleSummary.objects.create(title=f'Story {i}', summary='Markets rallied strongly as inflation cooled. ' * 3,
+                                          sentiment='Positive 🙂', url=f'https://news.example.com/m{i}')
+        done, notes = backfill_enrichment(batch_size=2, processes=0)
+        self.assertEqual((done, notes, ArticleEnrichment.objects.count()), (5, [], 5))
+        enrichment = ArticleEnrichment.objects.first()
+        self.assertEqual(enrichment.source, ArticleEnrichment.SUMMARY)
+        self.assertGreater(enrichment.polarity, 0)
+        self.assertEqual(enrichment.article.keywords.order_by('-weight').first().keyword, 'markets')
+
+        self.assertEqual(backfill_enrichment(processes=0)[0], 0)
+        self.assertEqual(backfill_enrichment(processes=0, force=True, limit=3)[0], 3)
+        self.assertEqual(ArticleEnrichment.objects.count(), 5)
+
+
+RSS_FEED = """<?xml version="1.0"?><rss version="2.0"><channel><title>Wire</title>
+<item><title>One</title><link>https://a.example/one</link></item>
+<item><title>Two</title><link>https://a.example/two</link></item>
+<item><title>Broken</title><link>https://b.example/broken</link></item>
+</channel></rss>"""
+ATOM_FEED = """<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom"><title>Blog</title>
+<entry><title>One again</title><link rel="self" href="https://a.example/feed/1"/><link href="https://a.example/one"/></entry>
+<entry><title>Relative</title><link href="/three"/></entry>
+</feed>"""
+
+
+class PrefetchTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.feeds = []
+        for name, xml in [('wire.xml', RSS_FEED), ('blog.xml', ATOM_FEED)]:
+            path = f"{directory.name}/{name}"
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(xml)
+            self.feeds.append(path)
+
+    def test_parse_feed_reads_rss_and_atom_links(self):
+        self.assertEqual(parse_feed(RSS_FEED), ['https://a.example/one', 'https://a.example/two', 'https://b.example/broken'])
+        self.assertEqual(parse_feed(ATOM_FEED, base_url='https://a.example/feed'), ['https://a.example/one', 'https://a.example/three'])
+
+    def test_local_feeds_are_warmed_once_and_logged(self):
+        async def summarize(url):
+            if 'broken' in url:
+                raise DownloadError('Could not download the article from the URL.')
+            return await ArticleSummary.objects.acreate(title=url, summary='S.', sentiment='Neutral 😐', url=url), False
+
+        prefetcher = Prefetcher(feeds=self.feeds + ['/nonexistent/feed.xml'], domain_delay=0)
+        with mock.patch('QuickNews.prefetch.asummarize_url', summarize):
+            run = async_to_sync(prefetcher.run_once)()
+            again = async_to_sync(prefetcher.run_once)()
+
+        self.assertEqual((run.discovered, run.summarized, run.failed), (3, 2, 1))
+        self.assertIn('/nonexistent/feed.xml', run.errors)
+        self.assertEqual(set(run.items.values_list('url', 'outcome')),
+                         {('https://a.example/one', PrefetchItem.SUMMARIZED), ('https://a.example/two', PrefetchItem.SUMMARIZED),
+                          ('https://b.example/broken', PrefetchItem.FAILED)})
+        self.assertEqual(again.discovered, 0)  # warmed links are skipped, the failure waits for its retry delay
+        self.assertTrue(ArticleSummary.objects.filter(url='https://a.example/two').exists())
+
+    def test_domain_pacer_spaces_out_one_site(self):
+        async def timeline():
+            pacer, loop = DomainPacer(delay=0.05), asyncio.get_running_loop()
+            started = loop.time()
+
+            async def visit(domain):
+                await pacer.wait(domain)
+                return domain, loop.time() - started
+            return await asyncio.gather(visit('a'), visit('a'), visit('b'), visit('a'))
+
+        times = asyncio.run(timeline())
+        self.assertLess(times[2][1], 0.04)
+        self.assertGreaterEqual(times[3][1], 0.095)
+
+
+class SearchResultsTests(SimpleTestCase):
+    def test_lxml_extracts_the_same_links_as_bs4(self):
+        for name, html in load_search_pages().items():
+            hrefs = extract_result_hrefs(html)
+            self.assertEqual(hrefs, extract_result_hrefs_bs4(html), name)
+            self.assertEqual(len(hrefs), 30, name)
+            self.assertFalse(any('fake.example' in href for href in hrefs), name)  # script and comment decoys
+        self.assertEqual(extract_result_hrefs(''), [])
+
+    def test_redirect_links_resolve_to_their_targets(self):
+        urls = ranked_result_urls(load_search_pages()['election_results_redirect'])
+        self.assertEqual(urls[0], 'https://www.aljazeera.com/emissions/negotiators/negotiators-722533')
+        self.assertTrue(all(url.startswith('https://') and 'duckduckgo.com' not in url for url in urls))
+
+    def test_normalized_queries_share_one_cached_search(self):
+        html = load_search_pages()['climate_summit']
+        engine = mock.Mock(fetch_html=mock.AsyncMock(return_value=html))
+        with mock.patch('QuickNews.search_results.get_async_fetch_engine', return_value=engine), \
+                mock.patch('QuickNews.search_results.get_search_cache', return_value=SearchResultsCache()):
+            first = async_to_sync(search_result_urls)('Climate  Summit', num_pages=3)
+            again = async_to_sync(search_result_urls)(' climate summit ', num_pages=5)
+        self.assertEqual(engine.fetch_html.await_count, 1)
+        self.assertIn('q=climate+summit', engine.fetch_html.await_args.args[0])
+        self.assertEqual(again[:3], first)
+        self.assertEqual(len(again), 5)
+
+    def test_empty_results_are_not_cached(self):
+        cache = SearchResultsCache(ttl=60)
+        cache.set('blocked', [])
+        self.assertIsNone(cache.get('blocked'))
+        cache.set('Rivers', ['https://a.example/1'])
+        self.assertEqual(cache.get('RIVERS'), ['https://a.example/1'])
+
+
+class DomainHealthTests(SimpleTestCase):
+    def setUp(self):
+        self.health = DomainHealthRegistry(window=10, min_samples=4, cooldown=60)
+
+    def test_paywalled_and_empty_pages_are_told_apart(self):
+        self.assertEqual(classify_page('<div class="paywall">Subscribe to continue</div>', 'Teaser.'), 'paywall')
+        self.assertEqual(classify_page('<script>{"isAccessibleForFree": "False"}</script>', ''), 'paywall')
+        self.assertEqual(classify_page('<p>Nothing here</p>', ''), 'empty')
+        self.assertEqual(classify_page('<p>paywall</p>', 'x' * 5000), 'ok')
+
+    def test_bad_domains_are_skipped_and_degraded_ones_used_last(self):
+        for outcome in ['timeout', 'error', 'paywall', 'timeout']:
+            self.health.record('bad.example', outcome)
+        for outcome in ['ok', 'error', 'ok', 'empty']:
+            self.health.record('slow.example', outcome)
+        urls = ['https://bad.example/1', 'https://slow.example/2', 'https://a.example/3', 'https://b.example/4']
+        self.assertEqual(self.health.select_urls(urls, 2, get_domain), ['https://a.example/3', 'https://b.example/4'])
+        self.assertEqual(self.health.select_urls(urls, 3, get_domain), urls[1:])
+        self.assertEqual(self.health.status('bad.example'), 'bad')
+
+        # Once the cooldown has passed, a bad domain gets a single probe when links are short.
+        self.health.cooldown = 0
+        self.assertEqual(self.health.select_urls(urls + ['https://bad.example/5'], 5, get_domain), urls)
+        self.health.record('bad.example', 'ok')
+        self.assertEqual(self.health.status('bad.example'), 'unknown')
+
+    def test_timeouts_follow_the_domain_p95_within_bounds(self):
+        self.assertEqual(self.health.timeout_for('fast.example', 10), 10)
+        for seconds in [1.0, 1.2, 1.5, 2.0]:
+            self.health.record_latency('fast.example', seconds)
+            self.health.record_latency('quick.example', seconds / 10)
+        self.assertAlmostEqual(self.health.timeout_for('fast.example', 10), 6.0)
+        self.assertEqual(self.health.timeout_for('quick.example', 10), 3)
+
+    def test_scrape_timeouts_are_recorded_unless_the_request_deadline_ran_out(self):
+        engine = mock.Mock(fetch_html=mock.AsyncMock(side_effect=requests.Timeout('slow')))
+        with mock.patch.object(views, 'get_async_fetch_engine', return_value=engine), \
+                mock.patch.object(views, 'get_domain_health', return_value=self.health):
+            self.assertEqual(async_to_sync(views._scrape_single_url)('https://slow.example/a'), '')
+            expired = Deadline(0)
+            async_to_sync(views._scrape_single_url)('https://other.example/a', deadline=expired)
+            response = self.client.get('/domain-health/?status=unknown')
+
+        self.assertEqual(self.health.snapshot('slow.example')[0]['outcomes'], {'timeout': 1})
+        self.assertEqual(self.health.snapshot('other.example'), [])
+        self.assertEqual([row['domain'] for row in response.json()['data']['domains']], ['slow.example'])
+
+
+class NLPPoolTests(SimpleTestCase):
+    def test_inline_pool_analyzes_articles(self):
+        case = load_cases()[0]
+        result = NLPPool(workers=0).run(analyze_article, case['title'], case['text'])
+        self.assertTrue(result['summary'])
+        self.assertIsInstance(result['polarity'], float)
+        self.assertEqual(result['features']['polarity'], result['polarity'])
+
+    def test_warm_starts_every_worker_before_the_first_task(self):
+        pool = NLPPool(workers=2)
+        self.addCleanup(pool.shutdown)
+        self.assertGreater(pool.warm(timeout=60), 0)
+        self.assertEqual(len(pool._executor._processes), 2)
+        self.assertEqual(NLPPool(workers=0).warm(), 0)
+
+    def test_full_pool_applies_backpressure(self):
+        pool = NLPPool(workers=0, max_pending=1, queue_timeout=0)
+        pool._slots.acquire()
+        with self.assertRaises(NLPPoolBusy):
+            pool.submit(len, 'x')
+        pool._slots.release()
+        self.assertEqual(pool.run(len, 'x'), 1)
+
+
+class HistoryTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.ids = []
+        for i, age in enumerate([0, 0, 3, 30]):
+            self.ids.append(ArticleSummary.objects.create(title=f'Story number {i} about rivers', summary='S.', sentiment='Neutral 😐',
+                                          url=f'https://news.example.com/{i}', created_at=now - timedelta(days=age, minutes=i)).id)
+
+    def test_pages_are_bucketed_and_chained_by_cursor(self):
+        first = self.client.get('/get-history/?limit=2').json()['data']
+        self.assertEqual([a['id'] for a in first['today']], self.ids[:2])
+        second = self.client.get(f"/get-history/?limit=2&cursor={first['next_cursor']}").json()['data']
+        self.assertEqual(([a['id'] for a in second['week']], [a['id'] for a in second['older']]), ([self.ids[2]], [self.ids[3]]))
+        self.assertIsNone(second['next_cursor'])
+
+    def test_unchanged_history_revalidates_with_304(self):
+        etag = self.client.get('/get-history/')['ETag']
+        self.assertEqual(self.client.get('/get-history/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        ArticleSummary.objects.get(id=self.ids[1]).delete()
+        self.assertEqual(self.client.get('/get-history/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deletes_are_not_hidden_by_if_modified_since(self):
+        first = self.client.get('/get-history/')
+        self.assertNotIn('Last-Modified', first)
+        ArticleSummary.objects.get(id=self.ids[2]).delete()
+        since = http_date(time.time() + 60)
+        response = self.client.get('/get-history/', HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(self.ids[2], [a['id'] for a in response.json()['data']['week']])
+
+
+class ArticleResponseTests(TestCase):
+    def setUp(self):
+        get_article_cache().clear()
+        self.article = ArticleSummary.objects.create(title='Reef survey', summary='Coral cover recovered. ' * 60,
+                                                     sentiment='Positive 🙂', url='https://news.example.com/reef')
+        self.path = f'/get-article/{self.article.id}/'
+
+    def test_repeated_reads_skip_the_database(self):
+        first = self.client.get(self.path)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.path)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second.json()['data']['title'], 'Reef survey')
+
+    def test_gzip_is_negotiated_with_its_own_strong_etag(self):
+        response = self.client.get(self.path, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].endswith('-gzip"'))
+        self.assertIn(b'Reef survey', gzip.decompress(response.content))
+
+        revalidated = self.client.get(self.path, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(self.client.get(self.path, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    @skipUnless(find_spec('brotli'), "brotli is optional")
+    def test_brotli_is_preferred_when_installed(self):
+        import brotli
+        response = self.client.get(self.path, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn(b'Reef survey', brotli.decompress(response.content))
+
+    def test_accept_encoding_preferences(self):
+        self.assertEqual(choose_encoding('gzip;q=0, identity'), 'identity')
+        self.assertEqual(choose_encoding('br;q=0, gzip'), 'gzip')
+        self.assertEqual(choose_encoding(None), 'identity')
+
+    def test_saves_and_deletes_invalidate_the_cached_payload(self):
+        etag = self.client.get(self.path)['ETag']
+        self.article.summary = 'Bleaching returned. ' * 60
+        self.article.save()
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Bleaching', response.json()['data']['summary'])
+
+        self.client.delete(f'/delete-article/{self.article.id}/')
+        self.assertFalse(self.client.get(self.path).json()['success'])
+
+    def test_url_hits_are_served_from_the_cache(self):
+        self.client.get(self.path)
+        with self.assertNumQueries(0):
+            result = self.client.post('/process-article/', {'query': self.article.url}, content_type='application/json').json()
+        self.assertEqual((result['type'], result['from_cache'], result['data']['url']), ('article', True, self.article.url))
+
+
+class DedupTests(TestCase):
+    def test_canonicalize_url_strips_tracking_amp_and_mobile_variants(self):
+        for variant in ['https://m.news.example.com/world/story/amp/?utm_source=tw&fbclid=1',
+                        'https://news.example.com/amp/world/story',
+                        'HTTPS://News.Example.com/world/story.amp#comments']:
+            self.assertEqual(canonicalize_url(variant), 'https://news.example.com/world/story')
+        self.assertEqual(canonicalize_url('https://news.example.com/story?id=5&utm_medium=x'),
+                         'https://news.example.com/story?id=5')
+        for param in ('ref=2', 'src=rss-world', 'share=1'):  # may select the content, so they stay
+            self.assertEqual(canonicalize_url(f'https://news.example.com/story?{param}'),
+                             f'https://news.example.com/story?{param}')
+        self.assertEqual(page_canonical_url('https://news.example.com/a', 'https://news.example.com/'),
+                         'https://news.example.com/a')
+
+    def test_variants_and_syndicated_copies_reuse_the_stored_summary(self):
+        case = load_cases()[0]
+        fields = {'title': case['title'], 'authors': '', 'publish_date': 'N/A', 'summary': 'S.', 'top_image': '',
+                  'sentiment': 'Neutral 😐', 'url': 'https://news.example.com/story?utm_source=feed',
+                  'canonical_url': 'https://news.example.com/story', 'simhash': simhash(case['text'])}
+        with mock.patch('QuickNews.pipeline.extract_article', return_value=fields) as extract:
+            original, from_cache = summarize_url(fields['url'])
+            self.assertFalse(from_cache)
+            self.assertEqual(summarize_url('https://m.news.example.com/story/amp/'), (original, True))
+            extract.assert_called_once()
+
+        copy = dict(fields, url='https://wire.example.org/copy', canonical_url='https://wire.example.org/copy',
+                    simhash=simhash(case['text'] + ' Reporting by the wire desk.'))
+        with mock.patch('QuickNews.pipeline.extract_article', return_value=copy):
+            self.assertEqual(summarize_url(copy['url']), (original, True))
+        self.assertEqual(summarize_url('https://wire.example.org/copy?utm_campaign=home'), (original, True))
+        self.assertEqual(ArticleSummary.objects.count(), 1)
+
+
+class LocalSearchTests(TestCase):
+    def setUp(self):
+        self.index = ArticleSearchIndex(snapshot_path='')
+        patcher = mock.patch('QuickNews.search_index._search_index', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for case in load_cases()[:4]:
+            ArticleSummary.objects.create(title=case['title'], summary=case['text'][:600], sentiment='Neutral 😐',
+                                          url=f"https://news.example.com/{case['name']}")
+
+    def test_index_follows_saves_and_deletes(self):
+        self.assertEqual(views.get_search_index().search('central bank interest rates')[0][0].url, 'https://news.example.com/rate_decision')
+        ArticleSummary.objects.create(title='Bank rates cut again', summary='The central bank cut interest rates.',
+                                      sentiment='Neutral 😐', url='https://news.example.com/cut')
+        self.assertEqual(len(self.index.bm25), 5)
+        ArticleSummary.objects.get(url='https://news.example.com/cut').delete()
+        self.assertEqual(len(self.index.bm25), 4)
+
+    def test_queries_are_answered_from_stored_summaries_first(self):
+        with mock.patch.object(views, 'LOCAL_ANSWER_MODE', 'answer'), \
+                mock.patch.object(views, 'asummarize_in_pool', side_effect=lambda title, text, max_sents: summarize(title, text, max_sents)), \
+                mock.patch.object(views, 'get_llm_answer') as llm:
+            result = self.client.post('/process-article/', {'query': 'deep sea species seamount'},
+                                      content_type='application/json').json()
+        llm.assert_not_called()
+        self.assertEqual(result['source'], 'local')
+        self.assertFalse(result['from_cache'])
+        self.assertEqual(result['data']['sources'][0]['url'], 'https://news.example.com/ocean_survey')
+
+
+class ContextBuilderTests(SimpleTestCase):
+    def test_relevant_passages_are_packed_into_the_budget_once(self):
+        articles = {case['name']: case['text'] for case in load_cases() if case['kind'] == 'article'}
+        context = "".join(f"\n\n--- Content from https://{name}.example/{copy} ---\n{text}"
+                          for copy in range(2) for name, text in articles.items())
+
+        packed, stats = build_context('central bank interest rates inflation', context, token_budget=600)
+
+        self.assertLessEqual(stats['output_tokens'], 600)
+        self.assertGreater(stats['duplicates_dropped'], 0)
+        self.assertIn('--- Content from https://rate_decision.example/', packed)
+        self.assertNotIn('rate_decision.example/1', packed)  # the second copy adds nothing
+        self.assertEqual(stats['trimmed_tokens'], stats['input_tokens'] - stats['output_tokens'])
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    """Serves /page with validators (304 when they match) and /slow after a short delay."""
+
+    protocol_version = 'HTTP/1.1'
+    etag = '"v1"'
+    last_modified = 'Wed, 14 Oct 2026 08:00:00 GMT'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, dict(self.headers)))
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        try:
+            if self.path == '/slow':
+                time.sleep(0.2)
+            if self.headers.get('If-None-Match') == self.etag or self.headers.get('If-Modified-Since') == self.last_modified:
+                self.send_response(304)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = 'Café prices rose again.'.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', self.etag)
+            self.send_header('Last-Modified', self.last_modified)
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+class PageServerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _PageHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests, self.server.active, self.server.peak = [], 0, 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+
+
+class PageCacheTests(PageServerTestCase):
+    def test_memory_tier_evicts_least_recently_used_by_bytes(self):
+        tier = MemoryTier(max_entries=10, max_bytes=20)
+        tier.set('a', CacheEntry('a', 'é' * 4))  # 4 characters, 8 bytes
+        tier.set('b', CacheEntry('b', 'é' * 4))
+        tier.get('a')
+        tier.set('c', CacheEntry('c', 'é' * 4))
+        self.assertIsNone(tier.get('b'))
+        self.assertIsNotNone(tier.get('a'))
+        self.assertEqual(len(tier), 2)
+        tier.set('huge', CacheEntry('huge', 'é' * 11))  # 22 bytes: larger than the whole budget
+        self.assertIsNone(tier.get('huge'))
+
+    def test_entries_expire_after_the_ttl(self):
+        cache = PageCache([MemoryTier()], ttl=60)
+        cache.set('https://a.example/story', CacheEntry('https://a.example/story', 'old', fetched_at=time.time() - 61))
+        cache.set('https://a.example/new', CacheEntry('https://a.example/new', 'new'))
+        self.assertFalse(cache.is_fresh(cache.get('https://a.example/story')))
+        self.assertTrue(cache.is_fresh(cache.get('https://A.example/new')))
+
+    def test_sqlite_tier_round_trip_and_promotion(self):
+        with tempfile.TemporaryDirectory() as directory:
+            disk = SqliteTier(f'{directory}/pages.sqlite3', max_entries=2)
+            disk.set('a', CacheEntry('https://a.example/', 'Café', etag='"e1"', last_modified='yesterday'))
+            entry = disk.get('a')
+            self.assertEqual((entry.url, entry.body, entry.etag, entry.last_modified),
+                             ('https://a.example/', 'Café', '"e1"', 'yesterday'))
+            self.assertEqual(entry.size, 5)
+
+            for key in ('b', 'c'):
+                disk.set(key, CacheEntry(key, key))
+            self.assertIsNone(disk.get('a'))  # pruned beyond max_entries
+            disk.delete('b')
+            self.assertIsNone(disk.get('b'))
+
+            memory = MemoryTier()
+            cache = PageCache([memory, disk])
+            disk.set(cache_key := 'https://b.example/', CacheEntry(cache_key, 'page'))
+            self.assertEqual(cache.get(cache_key).body, 'page')
+            self.assertEqual(memory.get(cache_key).body, 'page')
+
+    def test_sqlite_errors_are_not_raised_to_callers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = PageCache([MemoryTier(), SqliteTier(f'{directory}/pages.sqlite3')])
+            cache.set('https://a.example/', CacheEntry('https://a.example/', 'page'))
+            with mock.patch('sqlite3.connect', side_effect=sqlite3.OperationalError('database is locked')), \
+                    mock.patch('builtins.print'):
+                cache.delete('https://a.example/')
+                self.assertIsNone(cache.get('https://a.example/'))
+
+    def test_stale_entries_are_revalidated_with_a_conditional_request(self):
+        url = f'{self.base_url}/page'
+        cache = PageCache([MemoryTier()], ttl=60)
+        engine = FetchEngine()
+        with mock.patch('QuickNews.fetcher.get_page_cache', return_value=cache):
+            self.assertEqual(engine.fetch_html(url), 'Café prices rose again.')
+            self.assertEqual(engine.fetch_html(url), 'Café prices rose again.')  # fresh: served from the cache
+            self.assertEqual(len(self.server.requests), 1)
+
+            cache.get(url).fetched_at = time.time() - 61
+            self.assertEqual(engine.fetch_html(url), 'Café prices rose again.')
+        self.assertEqual(len(self.server.requests), 2)
+        headers = self.server.requests[1][1]
+        self.assertEqual(headers['If-None-Match'], '"v1"')
+        self.assertEqual(headers['If-Modified-Since'], _PageHandler.last_modified)
+        self.assertTrue(cache.is_fresh(cache.get(url)))  # the 304 refreshed the entry
+
+
+class FetchEngineTests(PageServerTestCase):
+    def fetch_concurrently(self, engine, count):
+        threads = [threading.Thread(target=engine.get, args=(f'{self.base_url}/slow',)) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.server.requests), count)
+
+    def test_per_domain_limit_caps_concurrent_requests(self):
+        self.fetch_concurrently(FetchEngine(global_limit=8, per_domain_limit=2), 6)
+        self.assertEqual(self.server.peak, 2)
+
+    def test_global_limit_caps_concurrent_requests(self):
+        self.fetch_concurrently(FetchEngine(global_limit=1, per_domain_limit=4), 3)
+        self.assertEqual(self.server.peak, 1)
+
+    async def test_async_engine_honours_the_per_domain_limit(self):
+        engine = AsyncFetchEngine(per_domain_limit=2)
+        try:
+            responses = await asyncio.gather(*(engine.get(f'{self.base_url}/slow') for _ in range(5)))
+        finally:
+            await engine.client.aclose()
+        self.assertEqual([r.status_code for r in responses], [200] * 5)
+        self.assertEqual(self.server.peak, 2)
+
+    def test_deadline_expires_while_waiting_for_a_slot(self):
+        deadline = Deadline(0.05)
+        time.sleep(0.06)
+        self.assertTrue(deadline.expired())
+        with self.assertRaises(DeadlineExceeded):
+            deadline.clamp(10)
+
+        engine = FetchEngine(per_domain_limit=1)
+        busy = threading.Thread(target=engine.get, args=(f'{self.base_url}/slow',))
+        busy.start()
+        while not self.server.active:
+            time.sleep(0.01)
+        started = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            engine.get(f'{self.base_url}/page', deadline=Deadline(0.05))
+        self.assertLess(time.monotonic() - started, 0.15)
+        busy.join()
+        self.assertEqual([path for path, _ in self.server.requests], ['/slow'])
+
+    def test_idle_domain_semaphores_are_evicted(self):
+        engine = FetchEngine(max_domains=2)
+        busy = engine._claim_domain('busy.example')
+        for domain in ('a.example', 'b.example', 'c.example'):
+            engine._claim_domain(domain)
+            engine._release_domain(domain)
+        self.assertEqual(list(engine._domain_slots), ['busy.example', 'c.example'])
+        self.assertIs(engine._claim_domain('busy.example'), busy)
+
+
+class ScrapeQuorumTests(SimpleTestCase):
+    async def test_stops_waiting_for_stragglers_once_quorum_is_met(self):
+        async def scrape(url):
+            await asyncio.sleep(5 if 'slow' in url else 0)
+            return '' if 'broken' in url else f'text of {url}'
+
+        quorum = Quorum(min_results=2, soft_deadline=5)
+        urls = ['https://a.example/1', 'https://broken.example/2', 'https://slow.example/3', 'https://b.example/4']
+        started = time.monotonic()
+        pages = [page async for page in get_async_fetch_engine().map_as_completed(
+            scrape, urls, deadline=Deadline(5), quorum=quorum)]
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(len(pages), 3)
+        self.assertCountEqual(quorum.report()['contributors'], ['https://a.example/1', 'https://b.example/4'])
+        self.assertEqual(quorum.report()['failed'], ['https://broken.example/2'])
+
+    async def test_soft_deadline_returns_with_what_has_arrived(self):
+        async def scrape(url):
+            await asyncio.sleep(5 if 'slow' in url else 0)
+            return 'text'
+
+        quorum = Quorum(min_results=3, soft_deadline=0.2)
+        pages = [page async for page in get_async_fetch_engine().map_as_completed(
+            scrape, ['https://a.example/', 'https://slow.example/'], deadline=Deadline(5), quorum=quorum)]
+        self.assertEqual(pages, [('https://a.example/', 'text')])
+        self.assertEqual(quorum.report()['reason'], 'soft deadline')
+
+    async def test_async_engine_cancels_stragglers(self):
+        cancelled = []
+
+        async def scrape(url):
+            try:
+                await asyncio.sleep(5 if 'slow' in url else 0)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+            return f'text of {url}'
+
+        quorum = Quorum(min_results=2, soft_deadline=5)
+        urls = ['https://a.example/1', 'https://slow.example/2', 'https://b.example/3']
+        pages = [page async for page in get_async_fetch_engine().map_as_completed(
+            scrape, urls, deadline=Deadline(5), quorum=quorum)]
+        await asyncio.sleep(0)
+
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(cancelled, ['https://slow.example/2'])
+
+
+class LLMGatewayTests(SimpleTestCase):
+    def setUp(self):
+        self.stub = StubGeminiServer(answer='Rivers rose overnight.').start()
+        self.addCleanup(self.stub.stop)
+        patcher = mock.patch('QuickNews.llm_gateway.LLM_BACKOFF_BASE', 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def gateway(self, **kwargs):
+        kwargs.setdefault('hedge_after', 0)
+        return GeminiGateway(api_key='test-key', model='gemini-test', base_url=self.stub.base_url, **kwargs)
+
+    def payload(self, text='Why did the river flood?'):
+        return {'contents': [{'parts': [{'text': text}]}]}
+
+    async def test_transient_failures_are_retried(self):
+        self.stub.enqueue(status=503)
+        self.stub.enqueue(status=429, headers={'Retry-After': '0'})
+        result = await self.gateway().agenerate(self.payload())
+        self.assertEqual(result['candidates'][0]['content']['parts'][0]['text'], 'Rivers rose overnight.')
+        self.assertEqual(len(self.stub.requests), 3)
+
+    async def test_circuit_breaker_fails_fast_while_open(self):
+        gateway = self.gateway(max_retries=0, breaker=CircuitBreaker(threshold=2, reset_after=60))
+        for _ in range(2):
+            self.stub.enqueue(status=500)
+            with self.assertRaises(LLMError):
+                await gateway.agenerate(self.payload())
+        with self.assertRaises(CircuitOpenError):
+            await gateway.agenerate(self.payload())
+        self.assertEqual(len(self.stub.requests), 2)
+
+    async def test_a_failed_call_counts_once_against_the_breaker(self):
+        breaker = CircuitBreaker(threshold=2, reset_after=60)
+        for _ in range(4):
+            self.stub.enqueue(status=503)
+        with self.assertRaisesRegex(LLMError, 'gave up after 4 attempt'):
+            await self.gateway(max_retries=3, breaker=breaker).agenerate(self.payload())
+        self.assertEqual((breaker.failures, breaker.state), (1, CircuitBreaker.CLOSED))
+
+    async def test_a_failed_trial_gives_up_with_the_real_error(self):
+        breaker = self.half_open_breaker()
+        self.stub.enqueue(status=503)
+        with self.assertRaisesRegex(LLMError, 'HTTP 503') as raised:
+            await self.gateway(breaker=breaker).agenerate(self.payload())
+        self.assertNotIsInstance(raised.exception, CircuitOpenError)
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    async def test_views_answer_and_stream_through_the_gateway(self):
+        self.stub.enqueue(status=503)
+        with mock.patch('QuickNews.llm_gateway._gateway', self.gateway()):
+            self.assertEqual(await views.call_gemini_api('Why did the river flood?'), 'Rivers rose overnight.')
+            self.assertEqual(''.join([text async for text in views.stream_gemini_api('Why?')]), 'Rivers rose overnight.')
+        self.assertEqual(len(self.stub.requests), 3)
+
+    def half_open_breaker(self):
+        breaker = CircuitBreaker(threshold=1, reset_after=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        return breaker
+
+    async def test_throttled_trial_keeps_the_breaker_open_but_released(self):
+        breaker = self.half_open_breaker()
+        self.stub.enqueue(status=429, headers={'Retry-After': '0'})
+        with self.assertRaisesRegex(LLMError, 'HTTP 429') as raised:
+            await self.gateway(breaker=breaker).agenerate(self.payload())
+        self.assertNotIsInstance(raised.exception, CircuitOpenError)
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        await asyncio.sleep(0.06)
+        self.assertEqual(breaker.admit(), (True, True))
+
+    async def test_cancelled_trial_is_released(self):
+        breaker = self.half_open_breaker()
+        self.stub.enqueue(delay=2, answer='slow')
+        task = asyncio.ensure_future(self.gateway(breaker=breaker).agenerate(self.payload()))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(breaker.admit(), (True, True))
+
+    async def test_cancelling_a_call_before_it_is_hedged_cancels_the_request(self):
+        gateway, cancelled = self.gateway(hedge_after=5), []
+
+        async def slow_call(payload, have_token=False):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(payload)
+                raise
+
+        with mock.patch.object(gateway, '_agenerate_once', slow_call):
+            task = asyncio.ensure_future(gateway.agenerate(self.payload()))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            await asyncio.sleep(0)
+        self.assertEqual(cancelled, [self.payload()])
+
+    async def test_async_calls_are_hedged(self):
+        self.stub.enqueue(delay=2, answer='slow')
+        started = time.monotonic()
+        result = await self.gateway(hedge_after=0.1).agenerate(self.payload())
+        self.assertEqual(result['candidates'][0]['content']['parts'][0]['text'], 'Rivers rose overnight.')
+        self.assertLess(time.monotonic() - started, 1.5)
+
+
+class TelemetryTests(TestCase):
+    async def test_spans_from_pool_threads_reach_the_request_trace(self):
+        trace = Trace('req-1')
+        token = _current_trace.set(trace)
+        try:
+            with span('outer'):
+                await offload(record_span, 'scrape', 0.25)
+        finally:
+            _current_trace.reset(token)
+        self.assertEqual([name for name, _, _ in trace.spans], ['scrape', 'outer'])
+        self.assertIn('scrape;dur=250.0', trace.server_timing())
+
+    def test_requests_get_ids_timing_headers_and_metrics(self):
+        with self.assertLogs('QuickNews.telemetry', 'INFO'):
+            response = self.client.get('/get-history/', HTTP_X_REQUEST_ID='abc123')
+        self.assertEqual(response['X-Request-ID'], 'abc123')
+        self.assertTrue(response['Server-Timing'].startswith('total;dur='))
+
+        with self.assertLogs('QuickNews.telemetry', 'INFO'):
+            body = self.client.get('/metrics').content.decode()
+        self.assertIn('quicknews_http_requests_total{view="get_history",status="200"}', body)
+        self.assertIn('# TYPE quicknews_stage_seconds histogram', body)
+
+    def test_unsafe_client_request_ids_are_replaced(self):
+        with self.assertLogs('QuickNews.telemetry', 'INFO'):
+            response = self.client.get('/get-history/', HTTP_X_REQUEST_ID='../../tmp/evil')
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    async def test_overlapping_requests_are_not_profiled_twice(self):
+        release = asyncio.Event()
+
+        async def view(request):
+            await release.wait()
+            return HttpResponse('ok')
+
+        middleware = TelemetryMiddleware(view)
+        incoming = [RequestFactory().get('/slow/', HTTP_X_REQUEST_ID=f'req-{i}') for i in range(2)]
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('QuickNews.telemetry.PROFILE_SAMPLE_RATE', 1.0), \
+                mock.patch('QuickNews.telemetry.PROFILE_DIR', directory), \
+                self.assertLogs('QuickNews.telemetry', 'INFO'):
+            calls = [asyncio.ensure_future(middleware(request)) for request in incoming]
+            await asyncio.sleep(0.05)
+            release.set()
+            responses = await asyncio.gather(*calls)
+            profiles = os.listdir(directory)
+        self.assertEqual([r.status_code for r in responses], [200, 200])
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].endswith('-unmatched-req-0.prof'))
+
+    async def test_streamed_responses_are_traced_and_logged_when_they_close(self):
+        async def events():
+            with span('answer'):
+                await asyncio.sleep(0.05)
+                yield 'event: done\n\n'
+
+        async def view(request):
+            return StreamingHttpResponse(events(), content_type='text/event-stream')
+
+        response = await TelemetryMiddleware(view)(RequestFactory().get('/stream/', HTTP_X_REQUEST_ID='req-stream'))
+        self.assertEqual(response['X-Request-ID'], 'req-stream')
+        with self.assertLogs('QuickNews.telemetry', 'INFO') as logs:
+            body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(body, b'event: done\n\n')
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual([stage['stage'] for stage in line['spans']], ['answer'])
+        self.assertGreaterEqual(line['duration_ms'], 50)
+
+    def test_metrics_token_is_enforced(self):
+        with mock.patch('QuickNews.views.METRICS_TOKEN', 'secret'), self.assertLogs('QuickNews.telemetry', 'INFO'):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+
+class StartupTests(SimpleTestCase):
+    def test_url_conf_imports_no_heavy_nlp_or_http_modules(self):
+        self.assertEqual(measure_startup()['heavy_loaded'], [])
+
+    def test_parse_importtime_sums_top_level_imports(self):
+        stderr = ("import time: self [us] | cumulative | imported package\n"
+                  "import time:       100 |        100 |   numpy.core\n"
+                  "import time:        50 |        150 | numpy\n"
+                  "import time:        30 |         30 | QuickNews\n")
+        total, packages = parse_importtime(stderr)
+        self.assertEqual(total, 180)
+        self.assertEqual(packages, {'numpy': 150, 'QuickNews': 30})
+
+    def test_missing_nlp_data_is_reported_without_downloading(self):
+        with mock.patch('nltk.data.find', side_effect=LookupError), mock.patch('nltk.download') as download:
+            results = check_nlp_data()
+        self.assertFalse(any(r['found'] for r in results))
+        download.assert_not_called()
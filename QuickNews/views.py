@@ -1,33 +1,60 @@
-from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from .models import ArticleSummary
-import nltk
-from collections import Counter
-from urllib.parse import urlparse
-from textblob import TextBlob
-from newspaper import Article, ArticleException
+from .models import ArticleSummary, SummaryJob
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
-import validators
 import requests
+import asyncio
 import json
-import re
-import math
 import os
-import concurrent.futures
+import functools
+import base64
+import hashlib
+from django.db.models import Q
+from django.utils import timezone
+from .async_utils import offload
+from .domain_health import SCRAPE_TIMEOUT, classify_page, get_domain_health
+from .fetcher import Deadline, Quorum, SCRAPE_DEADLINE, get_async_fetch_engine, get_domain
+from .llm_cache import get_answer_cache, make_cache_key
+from .llm_gateway import LLMError, get_llm_gateway
+from .context_builder import build_context, context_metrics
+from .batch import BATCH_MAX_URLS, asummarize_batch
+from .jobs import enqueue_summary_job, job_status
+from .pipeline import PipelineError, asummarize_url, get_website_name
+from .responses import EncodedBody, cached_article, encode_json, get_article_cache, json_response
+from .search_index import get_search_index
+from .search_results import search_result_urls
+from .singleflight import acoalesce
+from .telemetry import CACHE_LOOKUPS, FALLBACKS, SCRAPES, registry, span
+from .nlp_pool import asummarize_in_pool
 
 # --- Gemini API Key Configuration ---
 # IMPORTANT: For the new LLM features to work, you must set the GEMINI_API_KEY 
 # in your environment variables where the server is running.
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-
-# --- NLTK Data Download ---
-# Ensures the necessary sentence tokenizer is available for the fallback summarizer.
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+GEMINI_MODEL = "gemini-2.0-flash"
+SAFETY_BLOCK_MESSAGE = "My apologies, but I cannot process that request as it violates safety policies."
+
+# --- Scrape Quorum Configuration ---
+# Web searches fetch a few extra result links and stop as soon as enough pages or text have arrived.
+SCRAPE_OVERFETCH = int(os.environ.get("QUICKNEWS_SCRAPE_OVERFETCH", "2"))
+SCRAPE_QUORUM_CHARS = int(os.environ.get("QUICKNEWS_SCRAPE_QUORUM_CHARS", "20000"))
+SCRAPE_SOFT_DEADLINE = float(os.environ.get("QUICKNEWS_SCRAPE_SOFT_DEADLINE", "6"))
+# Extra result links searched for, to stand in for links on skipped or degraded domains.
+SCRAPE_SPARE_RESULTS = int(os.environ.get("QUICKNEWS_SCRAPE_SPARE_RESULTS", "4"))
+
+# --- Local Retrieval Configuration ---
+# Queries that match stored summaries well enough are answered from them first.
+LOCAL_SEARCH_ENABLED = os.environ.get("QUICKNEWS_LOCAL_SEARCH_ENABLED", "1") == "1"
+LOCAL_SEARCH_LIMIT = int(os.environ.get("QUICKNEWS_LOCAL_SEARCH_LIMIT", "3"))
+LOCAL_MIN_SCORE = float(os.environ.get("QUICKNEWS_LOCAL_MIN_SCORE", "2.0"))
+LOCAL_MIN_COVERAGE = float(os.environ.get("QUICKNEWS_LOCAL_MIN_COVERAGE", "0.6"))
+# "seed": give the stored summaries to Gemini as context; "answer": summarize them locally, no network.
+LOCAL_ANSWER_MODE = os.environ.get("QUICKNEWS_LOCAL_ANSWER_MODE", "seed")
+
+# newspaper, bs4 and validators are imported where they are used, so workers boot
+# without loading them; NLP data is verified by `manage.py warm_nlp`, never downloaded here.
 
 # --- Main Page View ---
 def index(request):
@@ -38,17 +65,16 @@ def index(request):
 # --- NEW ARCHITECTURE HELPER FUNCTIONS ---
 # ==============================================================================
 
-def get_website_name(url):
-    """Extracts a clean, readable website name from a URL."""
-    try:
-        parsed_url = urlparse(url)
-        domain = parsed_url.netloc
-        # Removes 'www.' from the domain for cleaner display
-        return domain[4:] if domain.startswith("www.") else domain
-    except:
-        return "Unknown Source"
+def frame_prompt(prompt, context=None):
+    """Builds the exact text sent to Gemini, framing the question around the context if any."""
+    if context:
+        return (
+            f"Using ONLY the provided text below as context, please provide a clear and comprehensive answer to the following question but don't explicitly say like according to provided text: '{prompt}'\n\n"
+            f"---CONTEXT---\n{context}"
+        )
+    return prompt
 
-def call_gemini_api(prompt, context=None):
+async def call_gemini_api(prompt, context=None):
     """
     Handles all calls to the Google Gemini LLM.
 
@@ -64,56 +90,205 @@ def call_gemini_api(prompt, context=None):
     Returns:
         str: The text answer from the LLM, or None if the API call fails.
     """
-    if not GEMINI_API_KEY:
+    gateway = get_llm_gateway(GEMINI_API_KEY, GEMINI_MODEL)
+    if not gateway.enabled:
         print("CRITICAL: GEMINI_API_KEY environment variable not set. LLM calls are disabled.")
         return None
 
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
-    
     # Dynamically frame the prompt based on whether context is available.
-    if context:
-        full_prompt = (
-            f"Using ONLY the provided text below as context, please provide a clear and comprehensive answer to the following question but don't explicitly say like according to provided text: '{prompt}'\n\n"
-            f"---CONTEXT---\n{context}"
-        )
-    else:
-        full_prompt = prompt
+    full_prompt = frame_prompt(prompt, context)
     
     payload = {"contents": [{"parts": [{"text": full_prompt}]}]}
-    headers = {'Content-Type': 'application/json'}
 
     try:
-        # Increased timeout for potentially larger context payloads from web scraping.
-        response = requests.post(api_url, json=payload, headers=headers, timeout=60)
-        response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-        result = response.json()
+        # The gateway pools connections, rate limits, retries transient failures and hedges slow calls.
+        with span('gemini'):
+            result = await gateway.agenerate(payload)
 
         # The API can block a prompt for safety reasons. We handle that gracefully.
         if result.get('promptFeedback', {}).get('blockReason'):
             print(f"Prompt blocked by API. Reason: {result['promptFeedback']['blockReason']}")
-            return "My apologies, but I cannot process that request as it violates safety policies."
+            return SAFETY_BLOCK_MESSAGE
         
         # Safely access the response text to avoid errors if the structure is unexpected.
         return result['candidates'][0]['content']['parts'][0]['text'].strip()
-    except (requests.RequestException, KeyError, IndexError, json.JSONDecodeError) as e:
+    except (LLMError, KeyError, IndexError) as e:
         print(f"Error during Gemini API call: {e}")
         return None
 
-def _scrape_single_url(url):
-    """Helper function to download and parse a single URL. Designed to run in a thread."""
+async def stream_gemini_api(prompt, context=None):
+    """
+    Streaming variant of call_gemini_api built on Gemini's streamGenerateContent.
+
+    Yields:
+        str: Text fragments of the answer as the model produces them. The generator
+        simply stops (after logging) if the API call fails, so callers can tell a
+        failed call from a successful one by whether anything was yielded.
+    """
+    gateway = get_llm_gateway(GEMINI_API_KEY, GEMINI_MODEL)
+    if not gateway.enabled:
+        print("CRITICAL: GEMINI_API_KEY environment variable not set. LLM calls are disabled.")
+        return
+
+    payload = {"contents": [{"parts": [{"text": frame_prompt(prompt, context)}]}]}
+
     try:
-        # The newspaper library can be slow, so a shorter timeout is better for concurrency.
-        article = Article(url, fetch_images=False, request_timeout=10)
-        article.download()
-        article.parse()
+        async for chunk in gateway.astream(payload):
+            if chunk.get('promptFeedback', {}).get('blockReason'):
+                print(f"Prompt blocked by API. Reason: {chunk['promptFeedback']['blockReason']}")
+                yield SAFETY_BLOCK_MESSAGE
+                return
+            for part in chunk.get('candidates', [{}])[0].get('content', {}).get('parts', []):
+                if part.get('text'):
+                    yield part['text']
+    except (LLMError, KeyError, IndexError) as e:
+        print(f"Error during streaming Gemini API call: {e}")
+
+def budget_context(prompt, context):
+    """Trims `context` to the passages most relevant to `prompt` that fit the token budget."""
+    if not context:
+        return context
+    with span('context'):
+        packed, stats = build_context(prompt, context)
+    print(f"Context packed: {stats['selected']}/{stats['passages']} passages, "
+          f"{stats['output_tokens']}/{stats['input_tokens']} tokens ({stats['duplicates_dropped']} duplicates dropped).")
+    return packed
+
+async def get_llm_answer(prompt, context=None):
+    """
+    Memoized front door for call_gemini_api.
+
+    Context is first trimmed to a relevance-ranked token budget. Answers are
+    cached on a hash of the model, the framed prompt and that context, so
+    repeats of trending questions skip the API round trip entirely.
+
+    Returns:
+        tuple: (answer or None, from_cache) where from_cache is True on a cache hit.
+    """
+    # Packing is CPU work and the cache may live on disk, so both run off the event loop.
+    context = await offload(budget_context, prompt, context)
+    cache = get_answer_cache()
+    key = make_cache_key(GEMINI_MODEL, frame_prompt(prompt, context), context)
+    if cache is not None and (cached_answer := await offload(cache.get, key)) is not None:
+        CACHE_LOOKUPS.inc(cache='llm', result='hit')
+        return cached_answer, True
+    CACHE_LOOKUPS.inc(cache='llm', result='miss')
+
+    answer = await call_gemini_api(prompt, context=context)
+    # Failures and safety blocks are not cached so they can be retried.
+    if cache is not None and answer and answer != SAFETY_BLOCK_MESSAGE:
+        await offload(cache.set, key, answer)
+    return answer, False
+
+def _parse_page_text(url, html):
+    """Extracts the article text from downloaded HTML (CPU-bound; run through offload)."""
+    from newspaper import Article
+    article = Article(url, fetch_images=False, request_timeout=10)
+    article.download(input_html=html)
+    article.parse()
+    return article.text
+
+async def _scrape_single_url(url, deadline=None):
+    """Helper coroutine to download and parse a single URL. Designed to run concurrently on the async fetch engine."""
+    outcome = 'empty'
+    domain, health = get_domain(url), get_domain_health()
+    try:
+        with span('scrape'):
+            # Domains that answer quickly get a timeout fitted to their usual response time.
+            timeout = health.timeout_for(domain) if health is not None else SCRAPE_TIMEOUT
+            html = await get_async_fetch_engine().fetch_html(url, timeout=timeout, deadline=deadline)
+            text = await offload(_parse_page_text, url, html)
         
-        if article.text:
-            return f"\n\n--- Content from {url} ---\n" + article.text
+        outcome = classify_page(html, text)
+        if text:
+            return f"\n\n--- Content from {url} ---\n" + text
+    except asyncio.CancelledError:
+        # The quorum was met without this page.
+        outcome = 'cancelled'
+        raise
+    except requests.Timeout as e:
+        outcome = 'timeout'
+        print(f"Skipping URL {url} after a timeout: {str(e)}")
     except Exception as e:
+        outcome = 'error'
         print(f"Skipping URL {url} due to scraping error: {str(e)}")
+    finally:
+        SCRAPES.inc(domain=get_website_name(url), outcome=outcome)
+        # Pages abandoned for the quorum, or cut short by the request's own deadline, say nothing about the site.
+        cut_short = outcome == 'timeout' and deadline is not None and deadline.expired()
+        if health is not None and outcome != 'cancelled' and not cut_short:
+            health.record(domain, outcome)
     return "" # Return empty string on failure to avoid breaking the process
 
-def search_and_scrape_urls(query, num_pages=3):
+async def find_result_urls(query, num_pages=3, deadline=None):
+    """
+    Runs the DuckDuckGo search for `query` and returns up to `num_pages` result URLs.
+    Raises requests.RequestException if the search page cannot be fetched.
+    """
+    # Ranked links are cached per normalized query; see search_results.
+    return await search_result_urls(query, num_pages, deadline=deadline)
+
+async def find_scrape_urls(query, count, deadline=None):
+    """
+    The `count` result URLs worth scraping for `query`: links to chronically
+    failing domains are skipped and slow or flaky ones are used last.
+    """
+    health = get_domain_health()
+    if health is None:
+        return await find_result_urls(query, count, deadline=deadline)
+    urls = await find_result_urls(query, count + SCRAPE_SPARE_RESULTS, deadline=deadline)
+    return health.select_urls(urls, count, get_domain)
+
+def scrape_quorum(num_pages):
+    """Early-exit policy for scraping `num_pages` pages out of an over-fetched candidate list."""
+    return Quorum(min_results=num_pages, min_size=SCRAPE_QUORUM_CHARS, soft_deadline=SCRAPE_SOFT_DEADLINE)
+
+async def iter_scraped_pages(urls, deadline=None, quorum=None):
+    """
+    Scrapes `urls` concurrently and yields (url, text) pairs as each page finishes.
+    Pages that fail to scrape yield an empty string. With a quorum, stops as
+    soon as it is satisfied and cancels the slower pages.
+    """
+    # OPTIMIZATION: Pages are downloaded concurrently on the event loop's fetch engine,
+    # which reuses pooled keep-alive connections and enforces per-domain limits.
+    scrape = functools.partial(_scrape_single_url, deadline=deadline)
+    async for item in get_async_fetch_engine().map_as_completed(scrape, urls, deadline=deadline, quorum=quorum):
+        yield item
+
+async def search_and_scrape(query, num_pages=3):
+    """
+    Searches DuckDuckGo, then CONCURRENTLY scrapes the top results until
+    `num_pages` of them (or enough text) have arrived.
+
+    Extra candidate links are fetched to hedge against failures, and slow
+    pages are abandoned once the quorum or its soft deadline is met.
+
+    Returns:
+        tuple: (list of page texts or None, quorum report dict naming the contributing pages).
+        The pages are kept apart so the local summarizer can stream them; join_pages()
+        builds the consolidated context.
+    """
+    quorum = scrape_quorum(num_pages)
+    try:
+        # Every fetch made for this search shares one overall deadline.
+        deadline = Deadline(SCRAPE_DEADLINE)
+        urls_to_process = await find_scrape_urls(query, num_pages + SCRAPE_OVERFETCH, deadline=deadline)
+
+        if not urls_to_process:
+            return None, quorum.report()
+
+        texts = [text async for _, text in iter_scraped_pages(urls_to_process, deadline=deadline, quorum=quorum) if text]
+
+        report = quorum.report()
+        print(f"Scraped {len(report['contributors'])}/{len(urls_to_process)} pages in {report['elapsed']}s "
+              f"({report['reason']}): {', '.join(report['contributors'])}")
+        return (texts or None), report
+        
+    except requests.RequestException as e:
+        print(f"Error during web search phase: {str(e)}")
+        return None, quorum.report()
+
+async def search_and_scrape_urls(query, num_pages=3):
     """
     Searches DuckDuckGo, then CONCURRENTLY scrapes the full text content from top results.
 
@@ -125,50 +300,131 @@ def search_and_scrape_urls(query, num_pages=3):
         num_pages (int): The number of top search results to scrape.
 
     Returns:
-        str: A single string containing all the extracted text, or None on failure.
+        list: The extracted text of each page, or None on failure.
     """
-    try:
-        search_url = f"https://html.duckduckgo.com/html/?q={query}"
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-        
-        search_response = requests.get(search_url, headers=headers, timeout=15)
-        search_response.raise_for_status()
-        
-        soup = BeautifulSoup(search_response.text, 'html.parser')
-        links = soup.select('.result__url')
-        urls_to_process = [link.get('href') for link in links[:num_pages] if link.get('href') and link.get('href').startswith('http')]
+    return (await search_and_scrape(query, num_pages))[0]
 
-        if not urls_to_process:
-            return None
-
-        # OPTIMIZATION: Use a ThreadPoolExecutor to download and parse pages in parallel,
-        # which is much faster than doing it sequentially.
-        texts = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=num_pages) as executor:
-            # Map the scraping function to the list of URLs
-            future_to_url = {executor.submit(_scrape_single_url, url): url for url in urls_to_process}
-            for future in concurrent.futures.as_completed(future_to_url):
-                result = future.result()
-                if result:
-                    texts.append(result)
-        
-        combined_text = "".join(texts)
-        return combined_text.strip() if combined_text else None
-        
-    except requests.RequestException as e:
-        print(f"Error during web search phase: {str(e)}")
+def join_pages(pages):
+    """The consolidated context of scraped pages."""
+    return "".join(pages).strip()
+
+def find_local_articles(query):
+    """Stored articles that match `query` closely enough to answer it from."""
+    if not LOCAL_SEARCH_ENABLED:
+        return []
+    return [article for article, score, coverage in get_search_index().search(query, limit=LOCAL_SEARCH_LIMIT)
+            if score >= LOCAL_MIN_SCORE and coverage >= LOCAL_MIN_COVERAGE]
+
+def build_local_context(articles):
+    """Formats stored summaries as LLM context, in the same shape as scraped pages."""
+    return "".join(f"\n\n--- Summary of {article.title} ({article.url}) ---\n{article.summary}" for article in articles).strip()
+
+def local_sources(articles):
+    return [{'id': article.id, 'title': article.title, 'url': article.url} for article in articles]
+
+async def summarize_local_articles(query, articles):
+    """Answers from stored summaries alone, citing them. Returns None if nothing could be extracted."""
+    summary = " ".join(await asummarize_in_pool(title=query, text="\n\n".join(a.summary for a in articles), max_sents=7))
+    if not summary:
         return None
+    citations = ", ".join(f"[{article.title}]({article.url})" for article in articles)
+    return f"{summary}\n\nFrom previously summarized articles: {citations}"
 
 # ==============================================================================
 # --- CORE VIEW LOGIC ---
 # ==============================================================================
 
+async def _process_url(url):
+    """
+    Summarizes a single article URL (Path 1 of process_article).
+
+    Returns:
+        EncodedBody or dict: The encoded response body, or the error payload.
+    """
+    try:
+        article, from_cache = await asummarize_url(url)
+    except PipelineError as e:
+        return {'success': False, 'error': str(e)}
+    return cached_article(article, url=url).body(type='article', from_cache=from_cache)
+
+async def _answer_query(query):
+    """
+    Answers a free-text query (Path 2 of process_article) with the LLM-first,
+    scrape-and-summarize fallback strategy.
+
+    Returns:
+        dict: The JSON response payload.
+    """
+    # Local Method: Answer from (or ground the LLM in) articles we have already summarized.
+    # The index may catch up with new rows and hydrates its hits, so it runs through the ORM thread.
+    if (local_articles := await sync_to_async(find_local_articles)(query)):
+        sources = local_sources(local_articles)
+        if LOCAL_ANSWER_MODE == 'seed':
+            llm_answer, from_cache = await get_llm_answer(prompt=query, context=build_local_context(local_articles))
+            if llm_answer:
+                return {'success': True, 'type': 'search', 'from_cache': from_cache, 'source': 'local',
+                        'data': {'answer': llm_answer, 'sources': sources}}
+        FALLBACKS.inc(path='local_summary')
+        if (local_answer := await summarize_local_articles(query, local_articles)):
+            return {'success': True, 'type': 'search', 'from_cache': False, 'source': 'local',
+                    'data': {'answer': local_answer, 'sources': sources}}
+
+    # Primary Method: Ask the LLM directly for a fast, intelligent answer.
+    llm_answer, from_cache = await get_llm_answer(prompt=query)
+    if llm_answer:
+        return {'success': True, 'type': 'search', 'from_cache': from_cache, 'data': {'answer': llm_answer}}
+    
+    # Fallback Method: If LLM fails, use the original web scraping and summarization logic.
+    print("LLM-first approach failed. Falling back to legacy web search summarization.")
+    FALLBACKS.inc(path='query_scrape')
+    if (pages := await search_and_scrape_urls(query, num_pages=3)):
+         # Use the original summarizer on the scraped text
+         if (summary := " ".join(await asummarize_in_pool(title=query, text=pages, max_sents=7))):
+             return {'success': True, 'type': 'search', 'from_cache': False, 'data': {'answer': summary}}
+
+    return {'success': False, 'error': 'I could not find an answer for your query. Please try rephrasing or using the Globe Search.'}
+
+async def _answer_with_context(query):
+    """
+    Scrape-first answer used by the "Search with Globe" button.
+
+    Returns:
+        dict: The JSON response payload.
+    """
+    # Step 1 & 2: Deeper Web Search (5 pages) & Consolidate Information
+    pages, scrape_report = await search_and_scrape(query, num_pages=5)
+    if not pages:
+        return {'success': False, 'error': 'I found search results, but failed to extract readable content from them.'}
+
+    # Step 3: LLM-Powered Analysis using the scraped context
+    final_answer, from_cache = await get_llm_answer(prompt=query, context=join_pages(pages))
+    
+    # Step 4: Fallback to local summarization if LLM fails
+    if not final_answer:
+        print("Globe search LLM call failed. Falling back to local summarization.")
+        FALLBACKS.inc(path='globe_summary')
+        final_answer = " ".join(await asummarize_in_pool(title=query, text=pages, max_sents=7))
+        
+        # If both LLM and local summarizer fail, then return an error
+        if not final_answer:
+            return {'success': False, 'error': 'I gathered fresh information but could not generate a final answer. The AI service may be temporarily unavailable.'}
+
+    return {'success': True, 'type': 'search', 'from_cache': from_cache,
+            'data': {'answer': final_answer, 'sources': scrape_report['contributors']}}
+
 @csrf_exempt
-def process_article(request):
+async def process_article(request):
     """
     Handles the main input bar. It intelligently routes requests based on input type.
     - Path 1: If input is a URL, it processes the article directly.
     - Path 2: If input is a query, it uses the LLM-first with fallback architecture.
+      Queries sent with {"stream": true} are answered as server-sent events.
+
+    Identical URLs or queries that arrive while one is already being processed are
+    coalesced: only the first request does the work and the others share its result.
+
+    This is an async view: under ASGI, waiting on downloads and Gemini holds no
+    worker thread, so one worker keeps many requests in flight.
     """
     if request.method != 'POST':
         return JsonResponse({'success': False, 'error': 'Invalid request method'})
@@ -180,93 +436,35 @@ def process_article(request):
             return JsonResponse({'success': False, 'error': 'Please enter a query or URL.'})
 
         # --- LOGIC PATH 1: Input is a URL (Original Functionality) ---
+        import validators
         if validators.url(input_str):
-            url = input_str
-            # Check cache first
-            if (cached_article := ArticleSummary.objects.filter(url=url).first()):
-                # FIX: Manually create dictionary instead of calling a non-existent .to_dict() method.
-                article_data = {
-                    'title': cached_article.title,
-                    'authors': cached_article.authors,
-                    'publish_date': cached_article.publish_date,
-                    'summary': cached_article.summary,
-                    'top_image': cached_article.top_image,
-                    'sentiment': cached_article.sentiment,
-                    'url': cached_article.url,
-                }
-                return JsonResponse({'success': True, 'type': 'article', 'from_cache': True, 'data': article_data})
-            
-            # Process with newspaper3k if not in cache
-            article = Article(url, fetch_images=False)
-            article.download()
-            article.parse()
-            
-            if not article.title or not article.text:
-                return JsonResponse({'success': False, 'error': 'Could not extract readable content from the URL.'})
-
-            # Run NLP to get the summary
-            article.nlp()
-            summary = article.summary
-
-            # FIX: Fallback to custom summarizer if newspaper3k fails
-            if not summary or len(summary) < 50:
-                print("Newspaper3k summary was insufficient. Falling back to custom summarizer.")
-                summary = " ".join(summarize(title=article.title, text=article.text, max_sents=7))
-
-            analysis = TextBlob(article.text)
-            sentiment = 'Positive 🙂' if analysis.sentiment.polarity > 0.05 else 'Negative ☹️' if analysis.sentiment.polarity < -0.05 else 'Neutral 😐'
-            
-            db_article = ArticleSummary(
-                title=article.title,
-                authors=', '.join(article.authors) if article.authors else get_website_name(url),
-                publish_date=article.publish_date.strftime('%B %d, %Y') if article.publish_date else "N/A",
-                summary=summary,
-                top_image=article.top_image,
-                sentiment=sentiment,
-                url=url
-            )
-            db_article.save()
-            
-            # FIX: Manually create dictionary for the new article.
-            new_article_data = {
-                'title': db_article.title,
-                'authors': db_article.authors,
-                'publish_date': db_article.publish_date,
-                'summary': db_article.summary,
-                'top_image': db_article.top_image,
-                'sentiment': db_article.sentiment,
-                'url': db_article.url,
-            }
-            return JsonResponse({'success': True, 'type': 'article', 'from_cache': False, 'data': new_article_data})
+            # Summaries already encoded for this URL are sent without touching the database.
+            if (cache := get_article_cache()) and (entry := cache.get_by_url(input_str)):
+                return json_response(request, entry.body(type='article', from_cache=True))
+            result, _ = await acoalesce(f"url:{input_str}", lambda: _process_url(input_str))
 
         # --- LOGIC PATH 2: Input is a Standard Query (LLM-First with Fallback) ---
+        elif data.get('stream'):
+            return _sse_response(_guard_stream(_stream_query(input_str), 'process_article'))
         else:
-            query = input_str
-            # Primary Method: Ask the LLM directly for a fast, intelligent answer.
-            if (llm_answer := call_gemini_api(prompt=query)):
-                return JsonResponse({'success': True, 'type': 'search', 'data': {'answer': llm_answer}})
-            
-            # Fallback Method: If LLM fails, use the original web scraping and summarization logic.
-            print("LLM-first approach failed. Falling back to legacy web search summarization.")
-            if (context := search_and_scrape_urls(query, num_pages=3)):
-                 # Use the original summarizer on the scraped text
-                 if (summary := " ".join(summarize(title=query, text=context, max_sents=7))):
-                     return JsonResponse({'success': True, 'type': 'search', 'data': {'answer': summary}})
-
-            return JsonResponse({'success': False, 'error': 'I could not find an answer for your query. Please try rephrasing or using the Globe Search.'})
+            result, _ = await acoalesce(f"query:{input_str}", lambda: _answer_query(input_str))
+
+        return json_response(request, result)
         
     except Exception as e:
         print(f"CRITICAL ERROR in process_article: {e}")
         return JsonResponse({'success': False, 'error': f'An unexpected server error occurred: {str(e)}'})
 
 @csrf_exempt
-def search_with_context(request):
+async def search_with_context(request):
     """
     Handles the "Search with Globe" button. This follows the scrape-first model.
     - Step 1: Performs a DEEPER web search (top 5 pages).
     - Step 2: Consolidates all text into a rich context.
     - Step 3: Asks the LLM to answer the user's query based on that fresh context.
     - Step 4 (NEW): If LLM fails, fall back to local summarizer.
+
+    Send {"stream": true} to receive the answer as server-sent events instead.
     """
     if request.method != 'POST':
         return JsonResponse({'success': False, 'error': 'Invalid request method'})
@@ -276,181 +474,373 @@ def search_with_context(request):
         if not query:
             return JsonResponse({'success': False, 'error': 'Search query cannot be empty.'})
 
-        # Step 1 & 2: Deeper Web Search (5 pages) & Consolidate Information
-        context_text = search_and_scrape_urls(query, num_pages=5)
-        if not context_text:
-            return JsonResponse({'success': False, 'error': 'I found search results, but failed to extract readable content from them.'})
-
-        # Step 3: LLM-Powered Analysis using the scraped context
-        final_answer = call_gemini_api(prompt=query, context=context_text)
-        
-        # Step 4: Fallback to local summarization if LLM fails
-        if not final_answer:
-            print("Globe search LLM call failed. Falling back to local summarization.")
-            final_answer = " ".join(summarize(title=query, text=context_text, max_sents=7))
-            
-            # If both LLM and local summarizer fail, then return an error
-            if not final_answer:
-                return JsonResponse({'success': False, 'error': 'I gathered fresh information but could not generate a final answer. The AI service may be temporarily unavailable.'})
+        # Streaming mode sends progress events and the answer as it is produced.
+        if data.get('stream'):
+            return _sse_response(_guard_stream(_stream_with_context(query), 'search_with_context'))
 
-        return JsonResponse({'success': True, 'type': 'search', 'data': {'answer': final_answer}})
+        result, _ = await acoalesce(f"globe:{query}", lambda: _answer_with_context(query))
+        return JsonResponse(result)
 
     except Exception as e:
         print(f"CRITICAL ERROR in search_with_context: {e}")
         return JsonResponse({'success': False, 'error': f'An unexpected server error occurred: {str(e)}'})
 
+@csrf_exempt
+async def process_articles_batch(request):
+    """
+    Summarizes many URLs in one request: {"urls": [...]}. Already summarized
+    URLs are answered from the database and the rest are processed concurrently.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
+    try:
+        data = json.loads(request.body)
+        urls = data.get('urls')
+        if not isinstance(urls, list) or not urls:
+            return JsonResponse({'success': False, 'error': 'Please provide a non-empty list of URLs.'})
+        if len(urls) > BATCH_MAX_URLS:
+            return JsonResponse({'success': False, 'error': f'A batch can contain at most {BATCH_MAX_URLS} URLs.'})
+
+        results = await asummarize_batch([str(url) for url in urls])
+        return JsonResponse({'success': True, 'type': 'batch', 'data': {'results': results}})
+    except Exception as e:
+        print(f"CRITICAL ERROR in process_articles_batch: {e}")
+        return JsonResponse({'success': False, 'error': f'An unexpected server error occurred: {str(e)}'})
+
 # ==============================================================================
-# --- HISTORY AND ARTICLE MANAGEMENT (UNCHANGED) ---
+# --- BACKGROUND SUMMARIZATION JOBS ---
 # ==============================================================================
 
-def get_history(request):
+@csrf_exempt
+def submit_summary_job(request):
+    """
+    Queues a URL for background summarization and returns the job id at once.
+    Already summarized URLs are answered immediately from the database.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
     try:
-        today = datetime.now().date()
+        data = json.loads(request.body)
+        url = data.get('url', '').strip()
+        import validators
+        if not validators.url(url):
+            return JsonResponse({'success': False, 'error': 'Please provide a valid article URL.'})
+
+        if (cache := get_article_cache()) and (entry := cache.get_by_url(url)):
+            return json_response(request, entry.body(type='article', from_cache=True))
+        if (stored := ArticleSummary.objects.filter(url=url).first()):
+            return json_response(request, cached_article(stored, url=url).body(type='article', from_cache=True))
+
+        job = enqueue_summary_job(url)
+        return JsonResponse({'success': True, 'type': 'job', 'job': job_status(job)}, status=202)
+    except Exception as e:
+        print(f"CRITICAL ERROR in submit_summary_job: {e}")
+        return JsonResponse({'success': False, 'error': f'An unexpected server error occurred: {str(e)}'})
+
+def get_job_status(request, job_id):
+    try:
+        job = get_object_or_404(SummaryJob, id=job_id)
+        return JsonResponse({'success': True, 'job': job_status(job)})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+def get_job_result(request, job_id):
+    """Returns the summarized article once the job has succeeded (202 while it is still pending)."""
+    try:
+        job = get_object_or_404(SummaryJob.objects.select_related('article'), id=job_id)
+        if job.status == SummaryJob.SUCCEEDED and job.article:
+            return json_response(request, cached_article(job.article).body(type='article', from_cache=job.from_cache))
+        if job.status == SummaryJob.FAILED or job.status == SummaryJob.SUCCEEDED:
+            return JsonResponse({'success': False, 'error': job.error or 'The summarized article is no longer available.', 'job': job_status(job)})
+        return JsonResponse({'success': False, 'pending': True, 'job': job_status(job)}, status=202)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+# ==============================================================================
+# --- STREAMING RESPONSES (SERVER-SENT EVENTS) ---
+# ==============================================================================
+
+def _sse(event, data):
+    """Formats one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _sse_response(events):
+    # `events` is an async generator; under ASGI every event is flushed as soon as it is produced.
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stops nginx from buffering the stream.
+    return response
+
+class _Outcome:
+    """Carries a streaming helper's result to its caller, since async generators cannot return values."""
+    value = None
+
+async def _stream_scraped_context(query, num_pages, outcome):
+    """
+    Runs the search and scrape steps, emitting a progress event per page.
+    The scraped page texts (or None) are left in `outcome.value`.
+    """
+    yield _sse('progress', {'stage': 'search', 'message': 'Searching the web...'})
+    deadline = Deadline(SCRAPE_DEADLINE)
+    try:
+        urls = await find_scrape_urls(query, num_pages + SCRAPE_OVERFETCH, deadline=deadline)
+    except requests.RequestException as e:
+        print(f"Error during web search phase: {str(e)}")
+        urls = []
+
+    texts = []
+    quorum = scrape_quorum(num_pages)
+    done = 0
+    async for url, text in iter_scraped_pages(urls, deadline=deadline, quorum=quorum):
+        done += 1
+        if text:
+            texts.append(text)
+        yield _sse('progress', {
+            'stage': 'scrape', 'url': url, 'source': get_website_name(url),
+            'ok': bool(text), 'done': done, 'total': len(urls),
+        })
+    report = quorum.report()
+    print(f"Scraped {len(report['contributors'])}/{len(urls)} pages in {report['elapsed']}s "
+          f"({report['reason']}): {', '.join(report['contributors'])}")
+    outcome.value = texts or None
+
+async def _stream_summary(title, pages, outcome):
+    """Streams the local fallback summary of `pages` sentence by sentence. Sets `outcome.value` to True if anything was sent."""
+    sentences = await asummarize_in_pool(title=title, text=pages, max_sents=7)
+    for i, sentence in enumerate(sentences):
+        yield _sse('token', {'text': sentence if i == 0 else f" {sentence}"})
+    outcome.value = bool(sentences)
+
+async def _stream_llm_answer(query, outcome, context=None):
+    """
+    Streams a Gemini answer token by token. Cached answers are sent in one piece,
+    and completed streams are written back to the answer cache.
+    Sets `outcome.value` to True if an answer was sent.
+    """
+    context = await offload(budget_context, query, context)
+    cache = get_answer_cache()
+    key = make_cache_key(GEMINI_MODEL, frame_prompt(query, context), context)
+    if cache is not None and (cached_answer := await offload(cache.get, key)) is not None:
+        CACHE_LOOKUPS.inc(cache='llm', result='hit')
+        yield _sse('token', {'text': cached_answer})
+        yield _sse('done', {'from_cache': True, 'source': 'llm'})
+        outcome.value = True
+        return
+    CACHE_LOOKUPS.inc(cache='llm', result='miss')
+
+    parts = []
+    async for text in stream_gemini_api(query, context=context):
+        parts.append(text)
+        yield _sse('token', {'text': text})
+    answer = "".join(parts).strip()
+    if not answer:
+        outcome.value = False
+        return
+    if cache is not None and answer != SAFETY_BLOCK_MESSAGE:
+        await offload(cache.set, key, answer)
+    yield _sse('done', {'from_cache': False, 'source': 'llm'})
+    outcome.value = True
+
+async def _stream_query(query):
+    """Streaming counterpart of _answer_query (stored summaries, then LLM, then scrape and summarize)."""
+    answered = _Outcome()
+    if (local_articles := await sync_to_async(find_local_articles)(query)):
+        yield _sse('progress', {'stage': 'local', 'message': f'Found {len(local_articles)} related article(s) already summarized...',
+                                'sources': local_sources(local_articles)})
+        if LOCAL_ANSWER_MODE == 'seed':
+            async for event in _stream_llm_answer(query, answered, context=build_local_context(local_articles)):
+                yield event
+            if answered.value:
+                return
+        FALLBACKS.inc(path='local_summary')
+        if (local_answer := await summarize_local_articles(query, local_articles)):
+            yield _sse('token', {'text': local_answer})
+            yield _sse('done', {'from_cache': False, 'source': 'local'})
+            return
+
+    async for event in _stream_llm_answer(query, answered):
+        yield event
+    if answered.value:
+        return
+
+    print("LLM-first approach failed. Falling back to legacy web search summarization.")
+    FALLBACKS.inc(path='query_scrape')
+    context = _Outcome()
+    async for event in _stream_scraped_context(query, 3, context):
+        yield event
+    if context.value:
+        async for event in _stream_summary(query, context.value, answered):
+            yield event
+        if answered.value:
+            yield _sse('done', {'from_cache': False, 'source': 'summary'})
+            return
+    yield _sse('error', {'error': 'I could not find an answer for your query. Please try rephrasing or using the Globe Search.'})
+
+async def _stream_with_context(query):
+    """Streaming counterpart of _answer_with_context (scrape first, then LLM or summary)."""
+    context = _Outcome()
+    async for event in _stream_scraped_context(query, 5, context):
+        yield event
+    if not context.value:
+        yield _sse('error', {'error': 'I found search results, but failed to extract readable content from them.'})
+        return
+
+    yield _sse('progress', {'stage': 'answer', 'message': 'Writing the answer...'})
+    answered = _Outcome()
+    async for event in _stream_llm_answer(query, answered, context=join_pages(context.value)):
+        yield event
+    if answered.value:
+        return
+
+    print("Globe search LLM call failed. Falling back to local summarization.")
+    FALLBACKS.inc(path='globe_summary')
+    async for event in _stream_summary(query, context.value, answered):
+        yield event
+    if answered.value:
+        yield _sse('done', {'from_cache': False, 'source': 'summary'})
+        return
+    yield _sse('error', {'error': 'I gathered fresh information but could not generate a final answer. The AI service may be temporarily unavailable.'})
+
+async def _guard_stream(events, view_name):
+    """Turns unexpected exceptions inside a stream into a final error event."""
+    try:
+        async for event in events:
+            yield event
+    except Exception as e:
+        print(f"CRITICAL ERROR in {view_name} stream: {e}")
+        yield _sse('error', {'error': f'An unexpected server error occurred: {str(e)}'})
+
+# ==============================================================================
+# --- METRICS ---
+# ==============================================================================
+
+# When set, /metrics requires "Authorization: Bearer <token>".
+METRICS_TOKEN = os.environ.get("QUICKNEWS_METRICS_TOKEN", "")
+
+ANSWER_CACHE_STATS = registry.gauge('quicknews_answer_cache', 'LLM answer cache counters (hits, misses, hit_rate).', ['stat'])
+CONTEXT_STATS = registry.gauge('quicknews_context_builder', 'Cumulative context trimming counters.', ['stat'])
+
+def _collect_view_metrics():
+    if (cache := get_answer_cache()) is not None:
+        for stat, value in cache.stats().items():
+            ANSWER_CACHE_STATS.set(value, stat=stat)
+    for stat, value in context_metrics().items():
+        CONTEXT_STATS.set(value, stat=stat)
+
+registry.add_collector(_collect_view_metrics)
+
+def metrics(request):
+    """Prometheus scrape endpoint for this process's counters, gauges and stage histograms."""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def domain_health(request):
+    """
+    This process's health record of every scraped domain, worst first.
+    Filter with ?domain=<host> or ?status=healthy|degraded|bad|unknown.
+    """
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return JsonResponse({'success': False, 'error': 'Unauthorized'}, status=401)
+    health = get_domain_health()
+    if health is None:
+        return JsonResponse({'success': False, 'error': 'Domain health tracking is disabled.'}, status=404)
+    domains = health.snapshot(domain=request.GET.get('domain') or None)
+    if (status := request.GET.get('status')):
+        domains = [row for row in domains if row['status'] == status]
+    return JsonResponse({'success': True, 'data': {'domains': domains}})
+
+# ==============================================================================
+# --- HISTORY AND ARTICLE MANAGEMENT ---
+# ==============================================================================
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+def encode_history_cursor(created_at, article_id):
+    """Opaque keyset cursor pointing just past the (created_at, id) of the last row sent."""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{article_id}".encode()).decode()
+
+def decode_history_cursor(cursor):
+    created_at, article_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(created_at), int(article_id)
+
+async def get_history(request):
+    """
+    Returns one page of the history sidebar, bucketed into today / previous 7
+    days / older. Only the columns the sidebar shows are read, in a single
+    indexed query; pass ?cursor=<next_cursor> for the following page.
+
+    Responses carry an ETag, so an unchanged sidebar refresh is answered with
+    304 Not Modified. There is no Last-Modified: the newest row's date does not
+    change when rows are deleted or the day buckets roll over.
+    """
+    try:
+        try:
+            limit = min(max(int(request.GET.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+            cursor = request.GET.get('cursor')
+            rows = ArticleSummary.objects.order_by('-created_at', '-id')
+            if cursor:
+                cursor_created_at, cursor_id = decode_history_cursor(cursor)
+                rows = rows.filter(Q(created_at__lt=cursor_created_at) | Q(created_at=cursor_created_at, id__lt=cursor_id))
+        except (ValueError, UnicodeDecodeError):
+            return JsonResponse({'success': False, 'error': 'Invalid history cursor or limit.'}, status=400)
+
+        # Fetch one extra row to know whether another page exists.
+        rows = [row async for row in rows.values('id', 'short_title', 'created_at')[:limit + 1]]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        today = timezone.localdate()
         week_ago = today - timedelta(days=7)
-        
-        today_articles = ArticleSummary.objects.filter(created_at__date=today).order_by('-created_at')
-        week_articles = ArticleSummary.objects.filter(created_at__date__lt=today, created_at__date__gte=week_ago).order_by('-created_at')
-        older_articles = ArticleSummary.objects.filter(created_at__date__lt=week_ago).order_by('-created_at')
-        
-        def format_articles(articles, date_format):
-            return [{'id': a.id, 'short_title': a.short_title, 'created_at': a.created_at.strftime(date_format)} for a in articles]
-
-        return JsonResponse({'success': True, 'data': {
-            'today': format_articles(today_articles, '%H:%M'),
-            'week': format_articles(week_articles, '%b %d'),
-            'older': format_articles(older_articles, '%b %d, %Y')
-        }})
+        buckets = {'today': [], 'week': [], 'older': []}
+        for row in rows:
+            created_at = timezone.localtime(row['created_at'])
+            if created_at.date() == today:
+                bucket, date_format = 'today', '%H:%M'
+            elif created_at.date() >= week_ago:
+                bucket, date_format = 'week', '%b %d'
+            else:
+                bucket, date_format = 'older', '%b %d, %Y'
+            buckets[bucket].append({'id': row['id'], 'short_title': row['short_title'],
+                                    'created_at': created_at.strftime(date_format)})
+
+        next_cursor = encode_history_cursor(rows[-1]['created_at'], rows[-1]['id']) if has_more else None
+
+        # The page's identity: its rows, the bucket boundaries (which move at midnight) and the page position.
+        version = hashlib.sha256(json.dumps(
+            [today.isoformat(), cursor, limit, next_cursor] + [[r['id'], r['short_title']] for r in rows]
+        ).encode()).hexdigest()[:32]
+
+        body = EncodedBody(encode_json({'success': True, 'data': {**buckets, 'next_cursor': next_cursor}}), digest=version)
+        response = json_response(request, body, conditional=True)
+        # Let clients keep the page but always revalidate it.
+        response['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
-def get_article(request, article_id):
+async def get_article(request, article_id):
+    """
+    Returns one stored summary. Encoded payloads are cached per article, so
+    repeated reads skip the database; a strong ETag allows 304 revalidation.
+    """
     try:
-        article = get_object_or_404(ArticleSummary, id=article_id)
-        # FIX: Manually create dictionary here as well.
-        article_data = {
-            'title': article.title,
-            'authors': article.authors,
-            'publish_date': article.publish_date,
-            'summary': article.summary,
-            'top_image': article.top_image,
-            'sentiment': article.sentiment,
-            'url': article.url,
-        }
-        return JsonResponse({'success': True, 'data': article_data})
+        if not (cache := get_article_cache()) or not (entry := cache.get(article_id)):
+            entry = cached_article(await aget_object_or_404(ArticleSummary, id=article_id))
+        response = json_response(request, entry.body(), conditional=True)
+        response['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
 @csrf_exempt
-def delete_article(request, article_id):
+async def delete_article(request, article_id):
     if request.method == 'DELETE':
         try:
-            article = get_object_or_404(ArticleSummary, id=article_id)
-            article.delete()
+            article = await aget_object_or_404(ArticleSummary, id=article_id)
+            await article.adelete()
             return JsonResponse({'success': True, 'message': 'Article deleted.'})
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)})
     return JsonResponse({'success': False, 'error': 'Invalid request method.'})
-
-# ==============================================================================
-# --- ORIGINAL TEXT SUMMARIZATION LOGIC (KEPT FOR FALLBACK) ---
-# ==============================================================================
-stopwords = set(['i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', "you're", "you've", "you'll", "you'd", 'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself', 'she', "she's", 'her', 'hers', 'herself', 'it', "it's", 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this', 'that', "that'll", 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against', 'between', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 'don', "don't", 'should', "should've", 'now'])
-ideal = 20.0
-
-def summarize(title='', text='', max_sents=5):
-    if not text or not title or max_sents <= 0: return []
-    sentences = split_sentences(text)
-    keys = keywords(text)
-    titleWords = split_words(title)
-    if not sentences or not keys or not titleWords: return []
-    ranks = score(sentences, titleWords, keys).most_common(max_sents)
-    # The sorted key now correctly uses summary[0] to sort by the (index, sentence) tuple
-    return [summary[0][1] for summary in sorted(ranks, key=lambda summary: summary[0])]
-
-def score(sentences, titleWords, keywords):
-    senSize = len(sentences)
-    ranks = Counter()
-    for i, s in enumerate(sentences):
-        sentence_words = split_words(s)
-        if not sentence_words: continue
-        titleFeature = title_score(titleWords, sentence_words)
-        sentenceLength = length_score(len(sentence_words))
-        sentencePosition = sentence_position(i + 1, senSize)
-        sbsFeature = sbs(sentence_words, keywords)
-        dbsFeature = dbs(sentence_words, keywords)
-        frequency = (sbsFeature + dbsFeature) / 2.0 * 10.0
-        totalScore = (titleFeature*1.5 + frequency*2.0 + sentenceLength*1.0 + sentencePosition*1.0)/4.0
-        ranks[(i, s)] = totalScore
-    return ranks
-
-def sbs(words, keywords):
-    score = 0.0
-    if not words: return 0
-    for word in words:
-        if word in keywords: score += keywords[word]
-    return (1.0 / math.fabs(len(words)) * score) / 10.0 if words else 0
-
-def dbs(words, keywords):
-    if not words: return 0
-    summ, first, second = 0, [], []
-    for i, word in enumerate(words):
-        if word in keywords:
-            score = keywords[word]
-            if not first: first = [i, score]
-            else:
-                second = first
-                first = [i, score]
-                dif = first[0] - second[0]
-                summ += (first[1] * second[1]) / (dif ** 2)
-    k = len(set(keywords.keys()).intersection(set(words))) + 1
-    return (1 / (k * (k + 1.0)) * summ)
-
-def split_words(text):
-    try:
-        text = re.sub(r'[^\w ]', '', text)
-        return [x.strip('.').lower() for x in text.split()]
-    except (TypeError, AttributeError):
-        return []
-
-def keywords(text):
-    text = split_words(text)
-    if not text: return {}
-    num_words = len(text)
-    text = [x for x in text if x not in stopwords]
-    freq = Counter(text)
-    min_size = min(10, len(freq))
-    keywords_sorted = sorted(freq.items(), key=lambda x: x[1], reverse=True)[:min_size]
-    keywords_dict = dict(keywords_sorted)
-    for k in keywords_dict:
-        articleScore = keywords_dict[k] * 1.0 / num_words
-        keywords_dict[k] = articleScore * 1.5 + 1
-    return keywords_dict
-
-def split_sentences(text):
-    try:
-        sentences = nltk.sent_tokenize(text)
-        return [s.replace('\n', ' ').strip() for s in sentences if len(s) > 15]
-    except:
-        return []
-
-def length_score(sentence_len):
-    return 1 - math.fabs(ideal - sentence_len) / ideal
-
-def title_score(title, sentence):
-    title = [x for x in title if x not in stopwords]
-    if not title: return 0
-    count = sum(1.0 for word in sentence if word not in stopwords and word in title)
-    return count / len(title)
-
-def sentence_position(i, size):
-    normalized = i * 1.0 / size
-    if 0 < normalized <= 0.1: return 0.17
-    elif 0.1 < normalized <= 0.2: return 0.23
-    elif 0.2 < normalized <= 0.3: return 0.14
-    elif 0.3 < normalized <= 0.4: return 0.08
-    elif 0.4 < normalized <= 0.5: return 0.05
-    elif 0.5 < normalized <= 0.6: return 0.04
-    elif 0.6 < normalized <= 0.7: return 0.06
-    elif 0.7 < normalized <= 0.8: return 0.04
-    elif 0.8 < normalized <= 0.9: return 0.15
-    else: return 0
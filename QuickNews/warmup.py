@@ -0,0 +1,95 @@
+"""
+One-time NLP warmup and offline checks of the local NLP data.
+
+The views import nltk, newspaper, textblob, bs4, lxml, validators and httpx
+only where they are used, so a worker boots without paying for them. A
+deployment that would rather pay up front runs `python manage.py warm_nlp`
+once per image (it verifies the punkt data and fails if anything is missing)
+and can set QUICKNEWS_WARMUP=1 to load the modules and start the NLP pool's
+worker processes on a background thread as each web worker starts. Nothing
+here touches the network unless asked to download.
+"""
+import importlib
+import os
+import threading
+import time
+
+WARMUP_ON_START = os.environ.get("QUICKNEWS_WARMUP", "0") == "1"
+
+# Modules the request path imports lazily, in the order they are warmed.
+HEAVY_MODULES = ('nltk', 'textblob', 'newspaper', 'bs4', 'lxml', 'validators', 'httpx')
+
+# (nltk resource, nltk package): punkt_tab backs nltk.sent_tokenize, the punkt
+# pickle backs newspaper's summarizer.
+NLP_RESOURCES = (
+    ('tokenizers/punkt_tab/english/', 'punkt_tab'),
+    ('tokenizers/punkt/english.pickle', 'punkt'),
+)
+
+
+def check_nlp_data(download=False):
+    """
+    Looks up every NLTK resource the summarizers need on the local search path.
+
+    Args:
+        download (bool): Fetch missing packages with nltk.download() and look again.
+
+    Returns:
+        list: One dict per resource with 'resource', 'package', 'found' and 'detail'
+        (the path found, or why it is missing).
+    """
+    import nltk
+
+    results = []
+    for resource, package in NLP_RESOURCES:
+        try:
+            detail, found = str(nltk.data.find(resource)), True
+        except LookupError:
+            detail, found = f"not found on {nltk.data.path}", False
+            if download and nltk.download(package, quiet=True):
+                try:
+                    detail, found = str(nltk.data.find(resource)), True
+                except LookupError:
+                    detail = f"downloaded '{package}' but {resource} is still missing"
+        results.append({'resource': resource, 'package': package, 'found': found, 'detail': detail})
+    return results
+
+
+def warm_up():
+    """
+    Imports the heavy modules and starts the NLP pool's workers, which load the
+    models. With QUICKNEWS_NLP_WORKERS=0 the models are loaded in this process,
+    which then runs the NLP itself.
+
+    Returns:
+        dict: Seconds per imported module ('imports') and for loading the models ('models').
+    """
+    from .nlp_pool import get_nlp_pool, warm_worker
+
+    imports = {}
+    for name in HEAVY_MODULES:
+        started = time.perf_counter()
+        importlib.import_module(name)
+        imports[name] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pool = get_nlp_pool()
+    if pool.workers > 0:
+        pool.warm()
+    else:
+        warm_worker()
+    return {'imports': imports, 'models': time.perf_counter() - started}
+
+
+def start_background_warmup():
+    """Runs warm_up() on a daemon thread so the first request does not pay for it."""
+    def run():
+        try:
+            timings = warm_up()
+            print(f"NLP warmup finished in {sum(timings['imports'].values()) + timings['models']:.2f}s.")
+        except Exception as e:
+            print(f"NLP warmup failed: {e}")
+
+    thread = threading.Thread(target=run, name='quicknews-warmup', daemon=True)
+    thread.start()
+    return thread